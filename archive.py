@@ -0,0 +1,233 @@
+"""Cold-storage archive: compressed, date-partitioned segment files for aged log rows."""
+
+import copy
+import gzip
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from database import EAT_OFFSET
+
+# Positions of the user id / display name in each table's row (database.LOG_COLUMNS)
+USER_COLUMNS = {"troll_log": (4, 5), "activity_log": (6, 7)}
+
+
+def _eat_day(ts: int) -> str:
+    return (datetime.fromtimestamp(ts / 1000, timezone.utc) + EAT_OFFSET).date().isoformat()
+
+
+class LogArchive:
+    """
+    Append-only store of log rows, one gzip segment per table and EAT day.
+
+    Layout: {root}/{table}/{YYYY}/{YYYY-MM-DD}.ndjson.gz holds one JSON array per
+    row in database.LOG_COLUMNS order; {root}/{table}/index.json records each
+    segment's byte length, row count, id/ts bounds, per-type counts and per-user
+    counts ([user_id, user_name, rows] entries). An append
+    writes a new gzip member to the day's file, fsyncs it, then replaces the index
+    atomically. Bytes past a segment's indexed length (a crash between the two
+    steps) are never read and are truncated by the next append.
+
+    Readers pick segments from the index by time range, type, user and id bounds,
+    so a query only decompresses the days it can match. All methods block; call them
+    through asyncio.to_thread.
+    """
+
+    def __init__(self, root: str = "archive"):
+        self.root = root
+        self._lock = threading.Lock()
+        self._indexes: dict[str, dict] = {}
+
+    def _index(self, table: str) -> dict:
+        # Callers hold self._lock. Indexes are replaced, never mutated, so a
+        # reference taken under the lock stays consistent after it's released.
+        index = self._indexes.get(table)
+        if index is None:
+            try:
+                with open(os.path.join(self.root, table, "index.json")) as f:
+                    index = json.load(f)
+            except FileNotFoundError:
+                index = {"last_id": 0, "segments": {}}
+            self._indexes[table] = index
+        return index
+
+    def _write_index(self, table: str, index: dict):
+        path = os.path.join(self.root, table, "index.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._indexes[table] = index
+
+    def last_id(self, table: str) -> int:
+        """Highest log id archived for a table (0 when empty)."""
+        with self._lock:
+            return self._index(table)["last_id"]
+
+    def append(self, table: str, rows: list) -> int:
+        """Archive rows (ascending id); rows at or below last_id are skipped. Returns rows written."""
+        with self._lock:
+            index = copy.deepcopy(self._index(table))
+            rows = [r for r in rows if r[0] > index["last_id"]]
+            if not rows:
+                return 0
+            by_day: dict[str, list] = {}
+            for row in rows:
+                by_day.setdefault(_eat_day(row[1]), []).append(row)
+
+            id_col, name_col = USER_COLUMNS[table]
+            for day, day_rows in by_day.items():
+                seg = index["segments"].setdefault(day, {
+                    "file": f"{day[:4]}/{day}.ndjson.gz", "bytes": 0, "rows": 0,
+                    "min_id": day_rows[0][0], "max_id": 0, "min_ts": day_rows[0][1], "max_ts": 0, "types": {},
+                    "users": [],
+                })
+                data = "".join(json.dumps(list(r), separators=(",", ":")) + "\n" for r in day_rows)
+                member = gzip.compress(data.encode())
+                path = os.path.join(self.root, table, seg["file"])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "ab") as f:
+                    f.truncate(seg["bytes"])
+                    f.write(member)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                seg["bytes"] += len(member)
+                seg["rows"] += len(day_rows)
+                seg["min_id"] = min(seg["min_id"], day_rows[0][0])
+                seg["max_id"] = max(seg["max_id"], day_rows[-1][0])
+                seg["min_ts"] = min(seg["min_ts"], min(r[1] for r in day_rows))
+                seg["max_ts"] = max(seg["max_ts"], max(r[1] for r in day_rows))
+                for row in day_rows:
+                    seg["types"][row[2]] = seg["types"].get(row[2], 0) + 1
+                users = {(uid, name): n for uid, name, n in seg["users"]}
+                for row in day_rows:
+                    key = (row[id_col], row[name_col])
+                    users[key] = users.get(key, 0) + 1
+                seg["users"] = [[uid, name, n] for (uid, name), n in users.items()]
+
+            index["last_id"] = rows[-1][0]
+            self._write_index(table, index)
+            return len(rows)
+
+    @staticmethod
+    def _user_matcher(user):
+        """(user_id, user_name) -> bool for a `user` filter (None when unfiltered)."""
+        if user is None:
+            return None
+        user_id = int(user) if user.isdigit() else None
+        name_part = user.casefold()
+
+        def match(row_user_id, row_user_name) -> bool:
+            return (user_id is not None and row_user_id == user_id) or name_part in (row_user_name or "").casefold()
+        return match
+
+    @staticmethod
+    def _user_rows(seg: dict, user_match) -> int:
+        """Rows in a segment matching a user filter, from the index."""
+        return sum(n for uid, name, n in seg["users"] if user_match(uid, name))
+
+    def _segments(self, table, since, until, log_type, user, after_id, before_id, newest_first) -> list:
+        """Segments that can hold matching rows, in read order."""
+        with self._lock:
+            segments = list(self._index(table)["segments"].values())
+        user_match = self._user_matcher(user)
+        picked = [
+            seg for seg in segments
+            if (since is None or seg["max_ts"] >= since)
+            and (until is None or seg["min_ts"] < until)
+            and (after_id is None or seg["max_id"] > after_id)
+            and (before_id is None or seg["min_id"] < before_id)
+            and (log_type is None or log_type in seg["types"])
+            and (user_match is None or self._user_rows(seg, user_match) != 0)
+        ]
+        picked.sort(key=lambda seg: seg["min_id"], reverse=newest_first)
+        return picked
+
+    def _load(self, table: str, seg: dict) -> list:
+        with open(os.path.join(self.root, table, seg["file"]), "rb") as f:
+            data = gzip.decompress(f.read(seg["bytes"]))
+        return [tuple(json.loads(line)) for line in data.splitlines()]
+
+    @classmethod
+    def _matcher(cls, table, since, until, log_type, user, after_id, before_id):
+        id_col, name_col = USER_COLUMNS[table]
+        user_match = cls._user_matcher(user)
+
+        def match(row) -> bool:
+            return (
+                (since is None or row[1] >= since)
+                and (until is None or row[1] < until)
+                and (log_type is None or row[2] == log_type)
+                and (after_id is None or row[0] > after_id)
+                and (before_id is None or row[0] < before_id)
+                and (user_match is None or user_match(row[id_col], row[name_col]))
+            )
+        return match
+
+    def read(
+        self, table: str, limit: int, newest_first: bool = True, *, since=None, until=None,
+        log_type=None, user=None, after_id=None, before_id=None,
+    ) -> list:
+        """
+        Up to `limit` archived rows matching the filters, ordered by id.
+
+        The filters mirror /api/logs/*: `since`/`until` are epoch ms, `log_type` the
+        troll or event type, `user` a user id or a display-name substring (digits
+        match either).
+        """
+        match = self._matcher(table, since, until, log_type, user, after_id, before_id)
+        rows = []
+        for seg in self._segments(table, since, until, log_type, user, after_id, before_id, newest_first):
+            hits = [r for r in self._load(table, seg) if match(r)]
+            if newest_first:
+                hits.reverse()
+            rows.extend(hits)
+            if len(rows) >= limit:
+                break
+        return rows[:limit]
+
+    def count(
+        self, table: str, limit: int | None = None, *, since=None, until=None,
+        log_type=None, user=None, after_id=None, before_id=None,
+    ) -> int:
+        """Matching archived rows (stops early once `limit` is reached)."""
+        match = self._matcher(table, since, until, log_type, user, after_id, before_id)
+        user_match = self._user_matcher(user)
+        total = 0
+        for seg in self._segments(table, since, until, log_type, user, after_id, before_id, True):
+            covered = (
+                (since is None or seg["min_ts"] >= since)
+                and (until is None or seg["max_ts"] < until)
+                and (after_id is None or seg["min_id"] > after_id)
+                and (before_id is None or seg["max_id"] < before_id)
+            )
+            # The whole segment is in range: the index has the answer unless
+            # both a type and a user are asked for (it only counts each separately)
+            if covered and user_match is None:
+                total += seg["types"].get(log_type, 0) if log_type is not None else seg["rows"]
+            elif covered and log_type is None:
+                total += self._user_rows(seg, user_match)
+            else:
+                total += sum(1 for r in self._load(table, seg) if match(r))
+            if limit is not None and total >= limit:
+                break
+        return total
+
+    def summary(self) -> dict:
+        """Per-table segment, row and byte totals (from the indexes)."""
+        result = {}
+        for table in USER_COLUMNS:
+            with self._lock:
+                index = self._index(table)
+            segments = index["segments"].values()
+            result[table] = {
+                "segments": len(segments),
+                "rows": sum(seg["rows"] for seg in segments),
+                "bytes": sum(seg["bytes"] for seg in segments),
+                "last_id": index["last_id"],
+            }
+        return result
@@ -0,0 +1,128 @@
+"""
+Write-throughput benchmark for the SQLite PRAGMA profiles in database.py.
+
+Replays a bot-like mix of log_troll / log_activity / increment_stat calls
+through BotLogger against a fresh database per profile, and reports log rows
+written per second and commit latency percentiles.
+
+    python benchmarks/bench_db_profiles.py [--events 20000] [--batch 50] [--direct] [--dir PATH]
+
+Write-behind mode (the bot's) commits every --batch calls; --direct commits each
+log call on its own. fsync cost depends on the disk, so point --dir at the disk
+bot.db lives on (the default temp dir may be tmpfs, which hides it).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import PRAGMA_PROFILES, apply_profile, init_db  # noqa: E402
+from logger import BotLogger  # noqa: E402
+
+# (call, weight): most traffic is counter bumps, then activity, then trolls
+MIX = [("increment_stat", 0.55), ("log_activity", 0.25), ("log_troll", 0.20)]
+TROLL_TYPES = [
+    "gn_police", "cap_alarm", "k_energy", "hype_detector", "rage_detector", "lag_defender", "flex_police", "this_you",
+]
+STAT_KEYS = ["gn_callouts", "cap_alarms", "k_energy_fires", "hype_detections", "rage_detections"]
+
+
+def _workload(events: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    users = [SimpleNamespace(id=10**17 + i, display_name=f"user{i}") for i in range(200)]
+    channels = [SimpleNamespace(id=10**17 + 5000 + i, name=f"channel-{i}") for i in range(20)]
+    calls, weights = zip(*MIX)
+    plan = []
+    for kind in rng.choices(calls, weights, k=events):
+        if kind == "increment_stat":
+            plan.append((kind, (rng.choice(STAT_KEYS),), {}))
+        elif kind == "log_activity":
+            plan.append((kind, ("greeting", "Sent morning greeting"), {
+                "channel": rng.choice(channels), "user": rng.choice(users),
+            }))
+        else:
+            troll = rng.choice(TROLL_TYPES)
+            plan.append((kind, (troll, troll.replace("_", " ").title()), {
+                "target_user": rng.choice(users), "channel": rng.choice(channels),
+                "details": {"quoted": "no cap fr fr"},
+            }))
+    return plan
+
+
+async def _run(profile: str, plan: list, batch: int, direct: bool, directory: str) -> dict:
+    path = os.path.join(directory, f"bench-{profile}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db = await init_db(path)
+    # Applied directly: init_db lets $DB_PROFILE override its argument, which would bench one profile N times
+    await apply_profile(db, profile)
+    async with db.execute("PRAGMA synchronous") as cursor:
+        synchronous = (await cursor.fetchone())[0]
+    logger = BotLogger(db, write_behind=not direct)
+
+    latencies = []
+    rows = 0
+    started = time.perf_counter()
+    for i, (kind, args, kwargs) in enumerate(plan, 1):
+        t = time.perf_counter()
+        await getattr(logger, kind)(*args, **kwargs)
+        if kind != "increment_stat":
+            rows += 1
+            if direct:
+                latencies.append(time.perf_counter() - t)
+        if i % batch == 0:
+            t = time.perf_counter()
+            await logger.flush()
+            latencies.append(time.perf_counter() - t)
+    await logger.flush()
+    elapsed = time.perf_counter() - started
+    await db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    ms = sorted(x * 1000 for x in latencies) or [0.0]
+    return {
+        "profile": profile,
+        "synchronous": synchronous,
+        "rows_per_sec": rows / elapsed,
+        "p50_ms": statistics.median(ms),
+        "p99_ms": ms[min(len(ms) - 1, int(len(ms) * 0.99))],
+        "max_ms": ms[-1],
+        "commits": len(latencies),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare SQLite PRAGMA profiles under a bot-like write load")
+    parser.add_argument("--events", type=int, default=20000, help="logger calls to replay")
+    parser.add_argument("--batch", type=int, default=50, help="calls between flushes (write-behind commit size)")
+    parser.add_argument("--direct", action="store_true", help="commit every log call (no write-behind queue)")
+    parser.add_argument("--dir", default=None, help="directory for the scratch databases")
+    parser.add_argument("--profiles", nargs="+", default=list(PRAGMA_PROFILES), choices=list(PRAGMA_PROFILES))
+    args = parser.parse_args()
+
+    plan = _workload(args.events)
+    mode = "direct" if args.direct else f"write-behind, {args.batch} calls/commit"
+    print(f"{args.events} calls ({mode})\n")
+    print(f"{'profile':<10} {'rows/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'commits':>8}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for profile in args.profiles:
+            r = await _run(profile, plan, args.batch, args.direct, directory)
+            print(
+                f"{r['profile']:<10} {r['rows_per_sec']:>10,.0f} {r['p50_ms']:>8.2f} "
+                f"{r['p99_ms']:>8.2f} {r['max_ms']:>8.2f} {r['commits']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Per-message cost of phrase detection: matcher.detect() vs the per-detector scans it replaced.
+
+Builds a seeded corpus of chat-like messages (mostly misses, some detector
+phrases, a few long essays) and times both approaches over it, after checking
+that they agree on every message.
+
+    python benchmarks/bench_matcher.py [--messages 20000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import messages  # noqa: E402
+from matcher import detect  # noqa: E402
+
+FILLER = [
+    "bro", "that", "was", "crazy", "who", "is", "on", "tonight", "lol", "ngl", "the", "ranked", "queue",
+    "is", "cooked", "fr", "anyone", "want", "to", "run", "it", "back", "gg", "wp", "my", "team", "again",
+]
+
+
+def legacy_detect(content: str) -> set:
+    """on_message's phrase checks before matcher.py, one scan per detector."""
+    found = set()
+    lower = content.lower().strip()
+    if any(lower == p or lower.startswith(p + " ") or lower.endswith(" " + p) for p in messages.gn_phrases):
+        found.add("gn")
+    lower = content.lower()
+    if any(p in lower for p in messages.loss_phrases):
+        found.add("excuse")
+    lower = content.lower()
+    if any(p in lower for p in messages.cap_phrases):
+        found.add("cap")
+    lower = content.lower()
+    if any(p in lower for p in messages.flex_phrases):
+        found.add("flex")
+    lower = content.lower()
+    if "lag" in lower.split():
+        found.add("lag")
+    return found
+
+
+def _corpus(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    phrases = (messages.gn_phrases + messages.loss_phrases + messages.cap_phrases
+               + messages.flex_phrases + messages.lag_words)
+    corpus = []
+    for _ in range(count):
+        words = rng.choices(FILLER, k=rng.choice([2, 4, 8, 12, 20, 150]))
+        if rng.random() < 0.2:
+            words.insert(rng.randint(0, len(words)), rng.choice(phrases))
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def _time(func, corpus: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in corpus:
+            func(text)
+        best = min(best, time.perf_counter() - started)
+    return best / len(corpus) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare phrase detection cost per message")
+    parser.add_argument("--messages", type=int, default=20000, help="corpus size")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs (best is reported)")
+    args = parser.parse_args()
+
+    corpus = _corpus(args.messages)
+    mismatches = sum(detect(text) != legacy_detect(text) for text in corpus)
+    if mismatches:
+        print(f"WARNING: {mismatches} messages detected differently")
+
+    legacy_us = _time(legacy_detect, corpus, args.repeat)
+    matcher_us = _time(detect, corpus, args.repeat)
+    print(f"{args.messages} messages, avg {sum(map(len, corpus)) / len(corpus):.0f} chars\n")
+    print(f"{'approach':<10} {'us/msg':>8}")
+    print(f"{'legacy':<10} {legacy_us:>8.2f}")
+    print(f"{'matcher':<10} {matcher_us:>8.2f}  ({legacy_us / matcher_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
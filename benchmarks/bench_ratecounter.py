@@ -0,0 +1,80 @@
+"""
+Per-message cost of the hype detector's rate check: ChannelRates vs the deque scan it replaced.
+
+Feeds a seeded stream of messages spread over a few channels through both and
+reports the cost of recording a message and reading its window count.
+
+    python benchmarks/bench_ratecounter.py [--messages 50000] [--channels 5] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ratecounter import ChannelRates  # noqa: E402
+
+EAT = pytz.timezone("Africa/Nairobi")
+WINDOW_SEC = 60
+
+
+def legacy_run(stream: list) -> None:
+    """The global 200-entry deque with a datetime scan per message."""
+    recent = deque(maxlen=200)
+    start = datetime.now(EAT)
+    for offset, _channel in stream:
+        now = start + timedelta(seconds=offset)
+        recent.append(now)
+        sum(1 for t in recent if (now - t).total_seconds() < WINDOW_SEC)
+
+
+def counter_run(stream: list) -> None:
+    rates = ChannelRates(WINDOW_SEC)
+    for offset, channel in stream:
+        rates.add(channel, now=offset).count(now=offset)
+
+
+def _stream(count: int, channels: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    offset = 0.0
+    stream = []
+    for _ in range(count):
+        offset += rng.expovariate(3.0)  # ~3 messages/sec across the server
+        stream.append((offset, rng.randrange(channels)))
+    return stream
+
+
+def _time(func, stream: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(stream)
+        best = min(best, time.perf_counter() - started)
+    return best / len(stream) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare hype detector rate tracking cost per message")
+    parser.add_argument("--messages", type=int, default=50000, help="messages in the stream")
+    parser.add_argument("--channels", type=int, default=5, help="channels the messages are spread over")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs (best is reported)")
+    args = parser.parse_args()
+
+    stream = _stream(args.messages, args.channels)
+    legacy_us = _time(legacy_run, stream, args.repeat)
+    counter_us = _time(counter_run, stream, args.repeat)
+    print(f"{args.messages} messages over {args.channels} channels, {WINDOW_SEC}s window\n")
+    print(f"{'approach':<10} {'us/msg':>8}")
+    print(f"{'deque':<10} {legacy_us:>8.2f}")
+    print(f"{'ring':<10} {counter_us:>8.2f}  ({legacy_us / counter_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,32 @@ import discord
 import pytz
 from discord.ext import commands
 
+
+class Bot(commands.Bot):
+    accepting_events = True
+    shutdown = None  # ShutdownCoordinator, set in on_ready (main.py)
+
+    def dispatch(self, event_name, /, *args, **kwargs):
+        """Drop events once shutdown has started, so no handler begins new work."""
+        if not self.accepting_events:
+            return
+        super().dispatch(event_name, *args, **kwargs)
+
+    async def close(self):
+        """Run the shutdown pipeline (or at least flush buffered logs) before disconnecting."""
+        if self.shutdown is not None:
+            await self.shutdown.run()
+        elif logger is not None:
+            await logger.close()
+        await super().close()
+
+
 intents = discord.Intents.all()
-client = commands.Bot(command_prefix="$", intents=intents)
+client = Bot(command_prefix="$", intents=intents)
 
 # Populated in on_ready (main.py)
 config = None   # BotConfig
 logger = None   # BotLogger
+archive = None  # LogArchive
 
 EAT = pytz.timezone("Africa/Nairobi")  # GMT+3
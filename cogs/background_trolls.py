@@ -9,7 +9,7 @@ import discord
 from discord.ext import commands, tasks
 
 import bot as shared
-from helpers import get_online_members, get_channel_by_key, pick_member
+from helpers import get_online_members, get_channel_by_key, interruptible_sleep, pick_member
 from messages import (
     jumpscare_messages, funny_nicknames, wrong_channel_messages,
     fake_mod_reasons, drama_templates, conspiracy_templates,
@@ -319,7 +319,7 @@ class BackgroundTrolls(commands.Cog):
     async def troll_loop(self):
         """Periodic troll events -- runs at random intervals."""
         if not shared.config.get("feature.troll_loop.enabled", True):
-            await asyncio.sleep(60)
+            await shared.config.wait_for_change("feature.troll_loop.", timeout=60)
             return
         if not self.bot.guilds:
             return
@@ -332,6 +332,11 @@ class BackgroundTrolls(commands.Cog):
             troll_fn, troll_name = random.choice(enabled)
             await troll_fn(guild)
 
+        # A troll_loop setting change redraws the wait from the new range
+        await interruptible_sleep(self._next_wait_sec, "feature.troll_loop.")
+
+    def _next_wait_sec(self) -> float:
+        """Random wait before the next troll, in seconds."""
         # Weekend/Friday: more frequent, otherwise longer
         day = datetime.now(shared.EAT).weekday()
         if day in (4, 5, 6):
@@ -343,8 +348,7 @@ class BackgroundTrolls(commands.Cog):
         # Clamp to sane range (5 min to 24 hours)
         min_h = max(5 / 60, min(min_h, 24.0))
         max_h = max(min_h, min(max_h, 24.0))
-        wait_hours = random.uniform(min_h, max_h)
-        await asyncio.sleep(wait_hours * 3600)
+        return random.uniform(min_h, max_h) * 3600
 
     @troll_loop.before_loop
     async def before_troll_loop(self):
@@ -0,0 +1,163 @@
+"""Scheduled online backups of bot.db: stepped SQLite backup, integrity check, compression, rotation."""
+
+import asyncio
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from discord.ext import commands, tasks
+
+import bot as shared
+from database import database_path
+
+BACKUP_DIR = "backups"
+# Pause between backup steps, so the copy doesn't hog the disk the writer shares
+STEP_PAUSE_SEC = 0.005
+
+
+def _backup_files(directory: str) -> list[str]:
+    """Finished backups in a directory, newest first (names sort by time)."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        (n for n in names if n.startswith("bot-") and (n.endswith(".db") or n.endswith(".db.gz"))),
+        reverse=True,
+    )
+
+
+def _snapshot(src_path: str, dest_path: str, step_pages: int) -> tuple[int, str]:
+    """
+    Copy a live database with SQLite's online backup API; returns (pages, integrity result).
+
+    Runs in a worker thread. The source is a separate read-only connection holding
+    one read transaction, which pins a single WAL snapshot: the copy is
+    consistent, never restarts because of concurrent commits, and never blocks
+    the writer (sqlite3 releases the GIL during each step).
+    """
+    src = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True)
+    dst = sqlite3.connect(dest_path)
+    try:
+        src.execute("BEGIN")
+        src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        src.backup(dst, pages=step_pages, sleep=STEP_PAUSE_SEC)
+        src.rollback()
+        dst.execute("PRAGMA journal_mode = DELETE")  # a standalone file, not a WAL database
+        pages = dst.execute("PRAGMA page_count").fetchone()[0]
+        problems = [row[0] for row in dst.execute("PRAGMA integrity_check") if row[0] != "ok"]
+    finally:
+        dst.close()
+        src.close()
+    return pages, "ok" if not problems else f"{len(problems)} problem(s): {problems[0]}"
+
+
+def _compress(path: str) -> str:
+    """gzip a file next to itself (streamed, constant memory) and remove the original."""
+    partial = path + ".gz.partial"
+    with open(path, "rb") as src, gzip.open(partial, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(partial, path + ".gz")
+    os.remove(path)
+    return path + ".gz"
+
+
+class Backup(commands.Cog):
+    def __init__(self, bot, directory: str = BACKUP_DIR):
+        self.bot = bot
+        self.directory = directory
+        self.last_report = None
+        self.backup_loop.start()
+
+    async def cog_unload(self):
+        self.backup_loop.cancel()
+
+    def _due(self) -> bool:
+        """True when the newest backup on disk is older than the interval (restarts don't reset it)."""
+        files = _backup_files(self.directory)
+        if not files:
+            return True
+        age = time.time() - os.path.getmtime(os.path.join(self.directory, files[0]))
+        return age >= shared.config.get("backup.interval_hours", 24) * 3600
+
+    def _rotate(self) -> list[str]:
+        keep = max(1, shared.config.get("backup.keep", 7))
+        removed = _backup_files(self.directory)[keep:]
+        for name in removed:
+            os.remove(os.path.join(self.directory, name))
+        return removed
+
+    async def _run_backup(self, force: bool = False) -> dict | None:
+        """Single backup pass — extracted for testability."""
+        if not shared.config.get("backup.enabled", True):
+            return None
+        if shared.logger is None:
+            return None
+        if not force and not self._due():
+            return None
+        async with shared.logger.transaction() as db:
+            src_path = await database_path(db)
+        if not src_path:
+            return None
+
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"bot-{now:%Y%m%d-%H%M%S}.db")
+        partial = path + ".partial"
+        step_pages = max(1, shared.config.get("backup.step_pages", 1024))
+        try:
+            pages, integrity = await asyncio.to_thread(_snapshot, src_path, partial, step_pages)
+            if integrity != "ok":
+                raise RuntimeError(f"integrity check failed: {integrity}")
+            os.replace(partial, path)
+            if shared.config.get("backup.compress", True):
+                path = await asyncio.to_thread(_compress, path)
+        except Exception as e:
+            if os.path.exists(partial):
+                os.remove(partial)
+            self.last_report = {"ran_at": now.isoformat(), "error": str(e)}
+            try:
+                await shared.logger.log_activity("backup_failed", f"Backup failed: {e}")
+            except Exception:
+                pass
+            return self.last_report
+
+        removed = await asyncio.to_thread(self._rotate)
+        self.last_report = {
+            "ran_at": now.isoformat(),
+            "file": os.path.basename(path),
+            "bytes": os.path.getsize(path),
+            "pages": pages,
+            "integrity": integrity,
+            "rotated_out": removed,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        try:
+            await shared.logger.log_activity(
+                "backup", f"Backed up bot.db to {self.last_report['file']}",
+                metadata={"bytes": self.last_report["bytes"], "pages": pages},
+            )
+        except Exception:
+            pass
+        return self.last_report
+
+    @tasks.loop(count=1)
+    async def backup_loop(self):
+        while True:
+            try:
+                await self._run_backup()
+            except Exception as e:
+                print(f"[backup] Pass failed: {e}")
+            await asyncio.sleep(15 * 60)  # cheap check; _due() decides from the newest file
+
+    @backup_loop.before_loop
+    async def before_backup_loop(self):
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot):
+    await bot.add_cog(Backup(bot))
@@ -0,0 +1,141 @@
+"""SQLite maintenance: WAL checkpoints, planner statistics, incremental vacuum, integrity checks."""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+
+import aiosqlite
+from discord.ext import commands, tasks
+
+import bot as shared
+from database import database_path, incremental_vacuum
+
+
+class DbMaintenance(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.sizes = None   # WAL/page/freelist sizes from the last pass
+        self.jobs = {}      # job name -> {"ran_at", "duration_ms", "result"}
+        self._last_run = {}  # job name -> time.monotonic() of its last run
+        self.maintenance_loop.start()
+
+    async def cog_unload(self):
+        self.maintenance_loop.cancel()
+
+    async def _db_sizes(self) -> dict:
+        async with shared.logger.transaction() as db:
+            values = {}
+            for pragma in ("page_size", "page_count", "freelist_count"):
+                async with db.execute(f"PRAGMA {pragma}") as cur:
+                    values[pragma] = (await cur.fetchone())[0]
+            path = await database_path(db)
+        wal = path + "-wal" if path else ""
+        return {
+            "path": path,
+            "db_bytes": values["page_size"] * values["page_count"],
+            "wal_bytes": os.path.getsize(wal) if wal and os.path.exists(wal) else 0,
+            **values,
+        }
+
+    async def _checkpoint(self) -> str:
+        """PASSIVE checkpoint (never waits on readers); TRUNCATE the file once it's all copied back."""
+        async with shared.logger.transaction() as db:
+            async with db.execute("PRAGMA wal_checkpoint(PASSIVE)") as cur:
+                busy, log_frames, done = await cur.fetchone()
+            if busy or done < log_frames:
+                return f"partial: {done}/{log_frames} frames (readers active)"
+            async with db.execute("PRAGMA wal_checkpoint(TRUNCATE)") as cur:
+                busy, _, _ = await cur.fetchone()
+        return f"{done} frames, {'not truncated (busy)' if busy else 'truncated'}"
+
+    async def _optimize(self) -> str:
+        async with shared.logger.transaction() as db:
+            async with db.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'") as cur:
+                has_stats = await cur.fetchone() is not None
+            if not has_stats:
+                await db.execute("ANALYZE")  # first run: give the planner statistics to start from
+                return "analyzed"
+            await db.execute("PRAGMA optimize")  # re-analyzes only tables whose stats are stale
+        return "optimized"
+
+    async def _vacuum(self) -> str:
+        return f"{await incremental_vacuum(shared.logger.transaction)} bytes reclaimed"
+
+    async def _integrity(self, path: str) -> str:
+        # On its own read-only connection: a full read of the file must not hold the writer
+        async with aiosqlite.connect(f"file:{path}?mode=ro", uri=True) as db:
+            async with db.execute("PRAGMA quick_check") as cur:
+                problems = [row[0] for row in await cur.fetchall() if row[0] != "ok"]
+        if not problems:
+            return "ok"
+        try:
+            await shared.logger.log_activity(
+                "db_integrity", f"Integrity check found {len(problems)} problem(s)",
+                metadata={"problems": problems[:20]},
+            )
+        except Exception:
+            pass
+        return f"{len(problems)} problem(s): {problems[0]}"
+
+    def _due(self, job: str, interval_sec: float) -> bool:
+        last = self._last_run.get(job)
+        return last is None or time.monotonic() - last >= interval_sec
+
+    async def _run_job(self, job: str, func, *args):
+        started = time.perf_counter()
+        try:
+            result = await func(*args)
+        except Exception as e:
+            result = f"failed: {e}"
+        self._last_run[job] = time.monotonic()
+        self.jobs[job] = {
+            "ran_at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "result": result,
+        }
+
+    async def _run_maintenance(self) -> dict | None:
+        """Single maintenance pass — extracted for testability. Runs only the jobs that are due."""
+        if not shared.config.get("maintenance.enabled", True):
+            return None
+        if shared.logger is None:
+            return None
+        cfg = shared.config
+        sizes = await self._db_sizes()
+
+        if self._due("optimize", cfg.get("maintenance.optimize_interval_hours", 6) * 3600):
+            await self._run_job("optimize", self._optimize)
+        if sizes["freelist_count"] >= cfg.get("maintenance.vacuum_freelist_pages", 1024):
+            await self._run_job("vacuum", self._vacuum)
+        if sizes["path"] and self._due("integrity", cfg.get("maintenance.integrity_interval_hours", 24) * 3600):
+            await self._run_job("integrity", self._integrity, sizes["path"])
+        # Last, so it also folds in what the jobs above wrote
+        if sizes["wal_bytes"] >= cfg.get("maintenance.wal_checkpoint_mb", 64) * 1024 * 1024:
+            await self._run_job("checkpoint", self._checkpoint)
+
+        self.sizes = await self._db_sizes()  # after the jobs, so the panel shows their effect
+        return self.report()
+
+    def report(self) -> dict:
+        sizes = dict(self.sizes or {})
+        sizes.pop("path", None)
+        return {"sizes": sizes, "jobs": self.jobs}
+
+    @tasks.loop(count=1)
+    async def maintenance_loop(self):
+        while True:
+            try:
+                await self._run_maintenance()
+            except Exception as e:
+                print(f"[maintenance] Pass failed: {e}")
+            check_interval = shared.config.get("maintenance.check_interval_min", 10) if shared.config else 10
+            await asyncio.sleep(check_interval * 60)
+
+    @maintenance_loop.before_loop
+    async def before_maintenance_loop(self):
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot):
+    await bot.add_cog(DbMaintenance(bot))
@@ -1,13 +1,12 @@
 """Dead chat reviver task loop."""
 
-import asyncio
 import random
 from datetime import datetime
 
 from discord.ext import commands, tasks
 
 import bot as shared
-from helpers import get_channel_by_key, is_late_night
+from helpers import get_channel_by_key, interruptible_sleep, is_late_night
 from messages import hot_takes, late_night_messages
 
 
@@ -54,8 +53,9 @@ class DeadChat(commands.Cog):
     @tasks.loop(count=1)
     async def dead_chat_loop(self):
         while True:
-            check_interval = shared.config.get("feature.dead_chat.check_interval_min", 30) if shared.config else 30
-            await asyncio.sleep(check_interval * 60)
+            await interruptible_sleep(
+                lambda: shared.config.get("feature.dead_chat.check_interval_min", 30) * 60, "feature.dead_chat.",
+            )
             await self._check_dead_chat()
 
     @dead_chat_loop.before_loop
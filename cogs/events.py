@@ -8,7 +8,7 @@ import discord
 from discord.ext import commands, tasks
 
 import bot as shared
-from helpers import get_excluded_channels, get_online_members, get_channel_by_key
+from helpers import get_online_members, get_channel_by_key
 from messages import funny_nicknames, fake_rules, welcome_messages, typing_callout_messages
 
 
@@ -197,7 +197,7 @@ class Events(commands.Cog):
             return
         if not shared.config.get("feature.typing_callout.enabled", True):
             return
-        if channel.id in get_excluded_channels():
+        if channel.id in shared.config.snapshot.excluded:
             return
 
         key = (channel.id, user.id)
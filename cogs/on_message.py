@@ -1,41 +1,244 @@
 """Main on_message handler: GN police, keyword detectors, per-message trolls, late night."""
 
-import asyncio
 import random
-import traceback
-from collections import deque
 from datetime import datetime, timedelta
 
 import discord
 from discord.ext import commands
 
 import bot as shared
-from helpers import get_excluded_channels, is_late_night
+from detectors import Detector, DetectorPipeline, MessageContext, MessageFeatures
+from executor import ActionExecutor, React, Reply, Send, Typing
+from helpers import is_late_night
+from ratecounter import ChannelRates
 from messages import (
-    gn_phrases, gn_callouts, hype_detector_messages,
+    gn_callouts, hype_detector_messages,
     cursed_emojis, fake_typing_messages, take_judgements,
     essay_responses, k_responses, late_night_messages,
     rage_responses, excuse_responses, cap_responses,
     flex_responses, lag_responses,
 )
 
+K_WORDS = frozenset({"k", "ok", "okay", "kk"})
+
+PER_MESSAGE_TROLL_NAMES = {
+    1: "Random L", 2: "Skull React", 3: "Emoji Roulette", 4: "Slow Clap",
+    5: "Fake Typing", 6: "Question Mark", 7: "Nobody Asked", 8: "Cap React",
+    9: "Sus React", 10: "Disagree React", 11: "Read Receipt", 12: "Countdown",
+    13: "Take Judgement",
+}
+
+
+def _weekend(ctx) -> bool:
+    return ctx.now.weekday() in (4, 5, 6)
+
+
+def _reply_with(responses, mention: bool = False):
+    """A respond() that replies with a random line (formatted with {user} when mention is set)."""
+    async def respond(ctx, details):
+        text = random.choice(responses)
+        if mention:
+            text = text.format(user=ctx.message.author.mention)
+        await ctx.message.reply(text, mention_author=False)
+    return respond
+
+
+# --- GN Police: call out users still chatting after saying goodnight ---
+
+def _gn_callout_match(ctx):
+    said_gn_at = ctx.cog.gn_watchlist.get(ctx.message.author.id)
+    if said_gn_at is None:
+        return None
+    mins = int((ctx.now - said_gn_at).total_seconds() / 60)
+    if mins > ctx.cfg.gn_police.max_minutes:
+        del ctx.cog.gn_watchlist[ctx.message.author.id]
+        return None
+    if mins < ctx.cfg.gn_police.min_minutes:
+        return None
+    return {"minutes": mins}
+
+
+async def _gn_callout(ctx, details):
+    author = ctx.message.author
+    await ctx.message.channel.send(random.choice(gn_callouts).format(user=author.mention, mins=details["minutes"]))
+    ctx.cog.gn_watchlist.pop(author.id, None)
+
+
+# --- Keyword triggers ---
+
+def _rage_match(ctx) -> bool:
+    features, rage = ctx.features, ctx.cfg.rage_detector
+    if features.exclamations >= rage.exclaim_threshold:
+        return True
+    return features.length >= rage.min_length and features.caps_ratio > rage.caps_threshold
+
+
+# --- Hype Detector: a burst of messages in one channel ---
+
+def _hype_match(ctx):
+    cog, hype, now = ctx.cog, ctx.cfg.hype_detector, ctx.now
+    cog.message_rates.configure(max(1, hype.time_window_sec))  # a 0s window would count nothing
+    recent_count = cog.message_rates.add(ctx.message.channel.id).count()
+    if recent_count < hype.threshold_messages:
+        return None
+    if cog.hype_cooldown_until is not None and now <= cog.hype_cooldown_until:
+        return None
+    return {"message_count": recent_count}
+
+
+async def _hype(ctx, details):
+    await ctx.message.channel.send(random.choice(hype_detector_messages))
+    ctx.cog.hype_cooldown_until = ctx.now + timedelta(minutes=ctx.cfg.hype_detector.cooldown_min)
+
+
+# --- Essay / K energy ---
+
+def _essay_match(ctx):
+    length = ctx.features.length
+    return {"length": length} if length > ctx.cfg.essay_detector.threshold_chars else None
+
+
+# --- Per-message trolls ---
+
+def _per_message_troll_plan(message, troll_type: int) -> list:
+    """The steps for one per-message troll."""
+    if troll_type == 1:
+        return [React(message, ("\U0001f1f1",))]  # Random L
+    if troll_type == 2:
+        return [React(message, ("\U0001f480",))]  # Skull react
+    if troll_type == 3:
+        return [React(message, tuple(random.choice(cursed_emojis)))]  # Emoji roulette
+    if troll_type == 4:
+        # Slow clap
+        clap_emojis = ["\U0001f44f", "\U0001f44f\U0001f3fb", "\U0001f44f\U0001f3fc", "\U0001f44f\U0001f3fd", "\U0001f44f\U0001f3fe", "\U0001f44f\U0001f3ff"]
+        return [React(message, tuple(clap_emojis[:random.randint(3, 5)]), gap=2)]
+    if troll_type == 5:
+        # Fake typing
+        steps = [Typing(message.channel, random.randint(3, 8))]
+        reply = random.choice(fake_typing_messages)
+        if reply:
+            steps.append(Send(message.channel, reply))
+        return steps
+    if troll_type == 6:
+        return [Reply(message, "?")]
+    if troll_type == 7:
+        return [Reply(message, "nobody asked")]
+    if troll_type == 8:
+        return [React(message, ("\U0001f9e2",))]  # Cap
+    if troll_type == 9:
+        return [React(message, ("\U0001f4ee",))]  # Sus
+    if troll_type == 10:
+        return [React(message, ("\U0001f44e",))]  # Disagree
+    if troll_type == 11:
+        return [React(message, ("\U0001f440",))]  # Read receipt
+    if troll_type == 12:
+        # Countdown -- 3, 2, 1... nothing
+        return [React(message, ("3\ufe0f\u20e3", "2\ufe0f\u20e3", "1\ufe0f\u20e3"), gap=2)]
+    if troll_type == 13:
+        return [Reply(message, random.choice(take_judgements))]  # L/W take
+    return []
+
+
+async def _per_message_troll(ctx, details):
+    # Handed to the executor: slow claps, countdowns and fake typing take seconds
+    troll_type = random.randint(1, 13)
+    name = PER_MESSAGE_TROLL_NAMES.get(troll_type, f"Type {troll_type}")
+    steps = _per_message_troll_plan(ctx.message, troll_type)
+    if not ctx.cog.executor.submit(name, steps, key=ctx.message.channel.id):
+        return False
+    return f"msg_troll_{troll_type}", name
+
+
+# --- Late night bonus ---
+
+async def _late_night_bonus(ctx, details):
+    await ctx.message.channel.send(random.choice(late_night_messages))
+
+
+# Every detector, in the order they run. Only one detector per group responds to a message.
+DETECTORS = [
+    Detector(
+        "gn_police", "GN Police", "gn_police", _gn_callout_match, _gn_callout, "gn_callouts",
+        priority=10, needs_content=False, in_excluded=True,
+    ),
+    Detector(
+        "rage_detector", "Rage Detector", "rage_detector", _rage_match, _reply_with(rage_responses, mention=True),
+        "rage_detections", priority=20, group="keyword",
+    ),
+    Detector(
+        "excuse_generator", "Excuse Generator", "excuse_generator", lambda ctx: "excuse" in ctx.features.phrases,
+        _reply_with(excuse_responses), "excuse_generations", priority=21, group="keyword",
+    ),
+    Detector(
+        "cap_alarm", "Cap Alarm", "cap_alarm", lambda ctx: "cap" in ctx.features.phrases,
+        _reply_with(cap_responses), "cap_alarms", priority=22, group="keyword",
+    ),
+    Detector(
+        "flex_police", "Flex Police", "flex_police", lambda ctx: "flex" in ctx.features.phrases,
+        _reply_with(flex_responses), "flex_polices", priority=23, group="keyword",
+    ),
+    Detector(
+        "lag_defender", "Lag Defender", "lag_defender", lambda ctx: "lag" in ctx.features.phrases,
+        _reply_with(lag_responses), "lag_defenses", priority=24, group="keyword",
+    ),
+    Detector(
+        "hype_detector", "Hype Detector", "hype_detector", _hype_match, _hype, "hype_detections",
+        priority=30, needs_content=False, targets_author=False,
+        chance=lambda ctx, s: s.weekend_chance if _weekend(ctx) else s.weekday_chance,
+    ),
+    Detector(
+        "essay_detector", "Essay Detector", "essay_detector", _essay_match, _reply_with(essay_responses),
+        "essay_detections", priority=40, group="troll",
+    ),
+    Detector(
+        "k_energy", "K Energy", "k_energy", lambda ctx: ctx.features.stripped in K_WORDS,
+        _reply_with(k_responses), "k_energy_fires", priority=41, group="troll",
+    ),
+    Detector(
+        "per_message_trolls", "Per-Message Troll", "per_message_trolls", lambda ctx: True, _per_message_troll,
+        "per_message_trolls", priority=42, group="troll", needs_content=False,
+        chance=lambda ctx, s: s.weekend_chance if _weekend(ctx) else s.weekday_chance,
+    ),
+    Detector(
+        "late_night_bonus", "Late Night Bonus", "late_night", lambda ctx: is_late_night(), _late_night_bonus,
+        "late_night_bonuses", priority=50, needs_content=False, targets_author=False,
+        chance=lambda ctx, s: s.bonus_chance,
+    ),
+]
+
 
 class OnMessage(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.gn_watchlist = {}                  # {user_id: datetime}
-        self.recent_message_times = deque(maxlen=200)
+        self.message_rates = ChannelRates(60)  # per-channel message rate, window from the hype settings
         self.hype_cooldown_until = None
+        self.pipeline = DetectorPipeline(DETECTORS)
+        self.executor = ActionExecutor()
+
+    async def cog_unload(self):
+        await self.executor.close()
 
     def _cleanup_gn_watchlist(self):
         """Remove expired GN watchlist entries."""
-        max_mins = shared.config.get("feature.gn_police.max_minutes", 180) if shared.config else 180
+        max_mins = shared.config.snapshot.gn_police.max_minutes if shared.config else 180
         now = datetime.now(shared.EAT)
         expired = [uid for uid, t in self.gn_watchlist.items()
                    if (now - t).total_seconds() / 60 > max_mins]
         for uid in expired:
             del self.gn_watchlist[uid]
 
+    def _cache_message(self, message, features, chance: float):
+        """Silently cache a message for the "this you?" background troll."""
+        bg_trolls_cog = self.bot.get_cog("BackgroundTrolls")
+        if features.length > 10 and random.random() < chance:
+            if bg_trolls_cog:
+                # Cap per-user entries to prevent one active user dominating the cache
+                max_per_user = 5
+                user_count = sum(1 for uid, _, _ in bg_trolls_cog.message_cache if uid == message.author.id)
+                if user_count < max_per_user:
+                    bg_trolls_cog.message_cache.append((message.author.id, message.content, message.channel.id))
+
     @commands.Cog.listener()
     async def on_message(self, message):
         if message.author == self.bot.user:
@@ -44,12 +247,9 @@ class OnMessage(commands.Cog):
         # Skip DMs and modmail (handled by Modmail cog)
         if isinstance(message.channel, discord.DMChannel):
             return
-        modmail_id = shared.config.get("channels.modmail_id", "")
-        try:
-            if modmail_id and message.channel.id == int(modmail_id) and message.reference:
-                return
-        except (ValueError, TypeError):
-            pass
+        cfg = shared.config.snapshot
+        if cfg.modmail_id and message.channel.id == cfg.modmail_id and message.reference:
+            return
 
         # --- Track activity for dead chat reviver ---
         if message.guild:
@@ -63,271 +263,25 @@ class OnMessage(commands.Cog):
         except Exception:
             pass
 
-        excluded = get_excluded_channels()
-
         # Periodically clean up GN watchlist (every ~100 messages)
         if random.random() < 0.01:
             self._cleanup_gn_watchlist()
 
-        try:
-            # --- GN Police: check if sender previously said goodnight ---
-            if shared.config.get("feature.gn_police.enabled", True) and message.guild and message.author.id in self.gn_watchlist:
-                said_gn_at = self.gn_watchlist[message.author.id]
-                mins = int((datetime.now(shared.EAT) - said_gn_at).total_seconds() / 60)
-                min_mins = shared.config.get("feature.gn_police.min_minutes", 20)
-                max_mins = shared.config.get("feature.gn_police.max_minutes", 180)
-                gn_chance = shared.config.get("feature.gn_police.chance", 0.50)
-                if min_mins <= mins <= max_mins and random.random() < gn_chance:
-                    callout = random.choice(gn_callouts).format(user=message.author.mention, mins=mins)
-                    await message.channel.send(callout)
-                    del self.gn_watchlist[message.author.id]
-                    try:
-                        await shared.logger.log_troll("gn_police", "GN Police", target_user=message.author, channel=message.channel, details={"minutes": mins})
-                        await shared.logger.increment_stat("gn_callouts")
-                    except Exception:
-                        pass
-                elif mins > max_mins:
-                    del self.gn_watchlist[message.author.id]
-
-            # --- GN Police: detect goodnight messages ---
-            if message.guild and message.content:
-                lower = message.content.lower().strip()
-                if any(lower == phrase or lower.startswith(phrase + " ") or lower.endswith(" " + phrase) for phrase in gn_phrases):
-                    self.gn_watchlist[message.author.id] = datetime.now(shared.EAT)
-
-            # --- Keyword Triggers (only one fires per message) ---
-            keyword_triggered = False
-
-            # --- Rage Detector ---
-            if (not keyword_triggered and shared.config.get("feature.rage_detector.enabled", True)
-                    and message.guild and message.content and message.channel.id not in excluded):
-                content = message.content
-                min_len = shared.config.get("feature.rage_detector.min_length", 10)
-                caps_thresh = shared.config.get("feature.rage_detector.caps_threshold", 0.70)
-                exclaim_thresh = shared.config.get("feature.rage_detector.exclaim_threshold", 3)
-                rage_chance = shared.config.get("feature.rage_detector.chance", 0.35)
-                is_caps_rage = len(content) >= min_len and sum(1 for c in content if c.isupper()) / max(len(content.replace(" ", "")), 1) > caps_thresh
-                is_exclaim_rage = content.count("!") >= exclaim_thresh
-                if (is_caps_rage or is_exclaim_rage) and random.random() < rage_chance:
-                    resp = random.choice(rage_responses).format(user=message.author.mention)
-                    await message.reply(resp, mention_author=False)
-                    keyword_triggered = True
-                    try:
-                        await shared.logger.log_troll("rage_detector", "Rage Detector", target_user=message.author, channel=message.channel)
-                        await shared.logger.increment_stat("rage_detections")
-                    except Exception:
-                        pass
-
-            # --- Excuse Generator ---
-            if (not keyword_triggered and shared.config.get("feature.excuse_generator.enabled", True)
-                    and message.guild and message.content and message.channel.id not in excluded):
-                lower = message.content.lower()
-                loss_phrases = ["i lost", "we lost", "took an l", "got destroyed", "got clapped", "got wrecked", "got bodied", "lost the game"]
-                excuse_chance = shared.config.get("feature.excuse_generator.chance", 0.40)
-                if any(phrase in lower for phrase in loss_phrases) and random.random() < excuse_chance:
-                    await message.reply(random.choice(excuse_responses), mention_author=False)
-                    keyword_triggered = True
-                    try:
-                        await shared.logger.log_troll("excuse_generator", "Excuse Generator", target_user=message.author, channel=message.channel)
-                        await shared.logger.increment_stat("excuse_generations")
-                    except Exception:
-                        pass
-
-            # --- Cap Alarm ---
-            if (not keyword_triggered and shared.config.get("feature.cap_alarm.enabled", True)
-                    and message.guild and message.content and message.channel.id not in excluded):
-                lower = message.content.lower()
-                cap_phrases = ["i swear", "no cap", "trust me", "on my life", "on god", "deadass", "fr fr", "i promise", "not lying"]
-                cap_chance = shared.config.get("feature.cap_alarm.chance", 0.35)
-                if any(phrase in lower for phrase in cap_phrases) and random.random() < cap_chance:
-                    await message.reply(random.choice(cap_responses), mention_author=False)
-                    keyword_triggered = True
-                    try:
-                        await shared.logger.log_troll("cap_alarm", "Cap Alarm", target_user=message.author, channel=message.channel)
-                        await shared.logger.increment_stat("cap_alarms")
-                    except Exception:
-                        pass
-
-            # --- Flex Police ---
-            if (not keyword_triggered and shared.config.get("feature.flex_police.enabled", True)
-                    and message.guild and message.content and message.channel.id not in excluded):
-                lower = message.content.lower()
-                flex_phrases = ["i'm the best", "im the best", "easy win", "easy dub", "too easy", "i carried", "they can't beat me", "i'm goated", "im goated", "undefeated", "no one can", "i don't lose", "i dont lose"]
-                flex_chance = shared.config.get("feature.flex_police.chance", 0.40)
-                if any(phrase in lower for phrase in flex_phrases) and random.random() < flex_chance:
-                    await message.reply(random.choice(flex_responses), mention_author=False)
-                    keyword_triggered = True
-                    try:
-                        await shared.logger.log_troll("flex_police", "Flex Police", target_user=message.author, channel=message.channel)
-                        await shared.logger.increment_stat("flex_polices")
-                    except Exception:
-                        pass
-
-            # --- Lag Defender ---
-            if (not keyword_triggered and shared.config.get("feature.lag_defender.enabled", True)
-                    and message.guild and message.content and message.channel.id not in excluded):
-                lower = message.content.lower()
-                lag_chance = shared.config.get("feature.lag_defender.chance", 0.40)
-                if "lag" in lower.split() and random.random() < lag_chance:
-                    await message.reply(random.choice(lag_responses), mention_author=False)
-                    keyword_triggered = True
-                    try:
-                        await shared.logger.log_troll("lag_defender", "Lag Defender", target_user=message.author, channel=message.channel)
-                        await shared.logger.increment_stat("lag_defenses")
-                    except Exception:
-                        pass
-
-            # --- Hype Detector (only count non-excluded channels) ---
-            if shared.config.get("feature.hype_detector.enabled", True) and message.guild and message.channel.id not in excluded:
-                now = datetime.now(shared.EAT)
-                self.recent_message_times.append(now)
-                time_window = shared.config.get("feature.hype_detector.time_window_sec", 60)
-                recent_count = sum(1 for t in self.recent_message_times if (now - t).total_seconds() < time_window)
-                threshold = shared.config.get("feature.hype_detector.threshold_messages", 15)
-                day = datetime.now(shared.EAT).weekday()
-                hype_chance = shared.config.get("feature.hype_detector.weekend_chance", 0.08) if day in (4, 5, 6) else shared.config.get("feature.hype_detector.weekday_chance", 0.05)
-                cooldown_min = shared.config.get("feature.hype_detector.cooldown_min", 30)
-                if recent_count >= threshold and (self.hype_cooldown_until is None or now > self.hype_cooldown_until) and random.random() < hype_chance:
-                    await message.channel.send(random.choice(hype_detector_messages))
-                    self.hype_cooldown_until = now + timedelta(minutes=cooldown_min)
-                    try:
-                        await shared.logger.log_troll("hype_detector", "Hype Detector", channel=message.channel, details={"message_count": recent_count})
-                        await shared.logger.increment_stat("hype_detections")
-                    except Exception:
-                        pass
-
-            # --- Troll checks (only in non-excluded guild channels) ---
-            if message.guild and message.channel.id not in excluded:
-
-                # Silently cache messages for "this you?" feature
-                bg_trolls_cog = self.bot.get_cog("BackgroundTrolls")
-                cache_chance = shared.config.get("feature.message_cache.chance", 0.10)
-                if message.content and len(message.content) > 10 and random.random() < cache_chance:
-                    if bg_trolls_cog:
-                        # Cap per-user entries to prevent one active user dominating the cache
-                        max_per_user = 5
-                        user_count = sum(1 for uid, _, _ in bg_trolls_cog.message_cache if uid == message.author.id)
-                        if user_count < max_per_user:
-                            bg_trolls_cog.message_cache.append((message.author.id, message.content, message.channel.id))
-
-                # Essay detector
-                troll_fired = False
-                if shared.config.get("feature.essay_detector.enabled", True):
-                    essay_thresh = shared.config.get("feature.essay_detector.threshold_chars", 500)
-                    essay_chance = shared.config.get("feature.essay_detector.chance", 0.30)
-                    if message.content and len(message.content) > essay_thresh and random.random() < essay_chance:
-                        await message.reply(random.choice(essay_responses), mention_author=False)
-                        troll_fired = True
-                        try:
-                            await shared.logger.log_troll("essay_detector", "Essay Detector", target_user=message.author, channel=message.channel, details={"length": len(message.content)})
-                            await shared.logger.increment_stat("essay_detections")
-                        except Exception:
-                            pass
-
-                # K energy (short dismissive messages)
-                if not troll_fired and shared.config.get("feature.k_energy.enabled", True) and message.content and message.content.strip().lower() in ("k", "ok", "okay", "kk"):
-                    k_chance = shared.config.get("feature.k_energy.chance", 0.30)
-                    if random.random() < k_chance:
-                        await message.reply(random.choice(k_responses), mention_author=False)
-                        troll_fired = True
-                        try:
-                            await shared.logger.log_troll("k_energy", "K Energy", target_user=message.author, channel=message.channel)
-                            await shared.logger.increment_stat("k_energy_fires")
-                        except Exception:
-                            pass
-
-                if not troll_fired:
-                    # Standard trolls
-                    if shared.config.get("feature.per_message_trolls.enabled", True):
-                        day = datetime.now(shared.EAT).weekday()
-                        troll_chance = shared.config.get("feature.per_message_trolls.weekend_chance", 0.08) if day in (4, 5, 6) else shared.config.get("feature.per_message_trolls.weekday_chance", 0.05)
-
-                        if random.random() < troll_chance:
-                            troll_type = random.randint(1, 13)
-
-                            try:
-                                if troll_type == 1:
-                                    await message.add_reaction("\U0001f1f1")  # Random L
-
-                                elif troll_type == 2:
-                                    await message.add_reaction("\U0001f480")  # Skull react
-
-                                elif troll_type == 3:
-                                    combo = random.choice(cursed_emojis)  # Emoji roulette
-                                    for emoji in combo:
-                                        await message.add_reaction(emoji)
-
-                                elif troll_type == 4:
-                                    # Slow clap
-                                    clap_emojis = ["\U0001f44f", "\U0001f44f\U0001f3fb", "\U0001f44f\U0001f3fc", "\U0001f44f\U0001f3fd", "\U0001f44f\U0001f3fe", "\U0001f44f\U0001f3ff"]
-                                    count = random.randint(3, 5)
-                                    for emoji in clap_emojis[:count]:
-                                        await message.add_reaction(emoji)
-                                        await asyncio.sleep(2)
-
-                                elif troll_type == 5:
-                                    # Fake typing
-                                    async with message.channel.typing():
-                                        await asyncio.sleep(random.randint(3, 8))
-                                    reply = random.choice(fake_typing_messages)
-                                    if reply:
-                                        await message.channel.send(reply)
-
-                                elif troll_type == 6:
-                                    await message.reply("?", mention_author=False)
-
-                                elif troll_type == 7:
-                                    await message.reply("nobody asked", mention_author=False)
-
-                                elif troll_type == 8:
-                                    await message.add_reaction("\U0001f9e2")  # Cap
-
-                                elif troll_type == 9:
-                                    await message.add_reaction("\U0001f4ee")  # Sus
-
-                                elif troll_type == 10:
-                                    await message.add_reaction("\U0001f44e")  # Disagree
-
-                                elif troll_type == 11:
-                                    await message.add_reaction("\U0001f440")  # Read receipt
-
-                                elif troll_type == 12:
-                                    # Countdown -- 3, 2, 1... nothing
-                                    for emoji in ["3\ufe0f\u20e3", "2\ufe0f\u20e3", "1\ufe0f\u20e3"]:
-                                        await message.add_reaction(emoji)
-                                        await asyncio.sleep(2)
-
-                                elif troll_type == 13:
-                                    await message.reply(random.choice(take_judgements), mention_author=False)  # L/W take
-                            except discord.HTTPException:
-                                pass  # Rate limited or message deleted
-
-                            try:
-                                troll_names = {
-                                    1: "Random L", 2: "Skull React", 3: "Emoji Roulette", 4: "Slow Clap",
-                                    5: "Fake Typing", 6: "Question Mark", 7: "Nobody Asked", 8: "Cap React",
-                                    9: "Sus React", 10: "Disagree React", 11: "Read Receipt", 12: "Countdown",
-                                    13: "Take Judgement",
-                                }
-                                await shared.logger.log_troll(f"msg_troll_{troll_type}", troll_names.get(troll_type, f"Type {troll_type}"), target_user=message.author, channel=message.channel)
-                                await shared.logger.increment_stat("per_message_trolls")
-                            except Exception:
-                                pass
-
-                # Late night bonus trolls
-                if shared.config.get("feature.late_night.enabled", True) and is_late_night():
-                    bonus_chance = shared.config.get("feature.late_night.bonus_chance", 0.03)
-                    if random.random() < bonus_chance:
-                        await message.channel.send(random.choice(late_night_messages))
-                        try:
-                            await shared.logger.log_troll("late_night_bonus", "Late Night Bonus", channel=message.channel)
-                            await shared.logger.increment_stat("late_night_bonuses")
-                        except Exception:
-                            pass
-
-        except Exception as e:
-            print(f"[on_message] Troll error: {e}")
-            traceback.print_exc()
+        if not message.guild:
+            return
+
+        excluded = message.channel.id in cfg.excluded
+        # Text features are worked out once, when a detector first asks for them
+        features = MessageFeatures(message.content or "")
+        ctx = MessageContext(message, self, cfg, excluded, features, datetime.now(shared.EAT))
+        await self.pipeline.run(ctx, rng=random)
+
+        # --- GN Police: remember goodnights (after the callout check, which reads the previous one) ---
+        if "gn" in features.phrases:
+            self.gn_watchlist[message.author.id] = ctx.now
+
+        if not excluded:
+            self._cache_message(message, features, cfg.message_cache_chance)
 
 
 async def setup(bot):
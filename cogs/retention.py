@@ -0,0 +1,149 @@
+"""Log retention: compact expired log rows into daily aggregates and reclaim space."""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from discord.ext import commands, tasks
+
+import bot as shared
+from database import EAT_OFFSET, LOG_COLUMNS, incremental_vacuum
+
+
+# (log table, settings key, aggregate upsert). Each upsert is bound to (cutoff_ms, max_id)
+# and must select exactly the rows the matching DELETE removes. Days are EAT days.
+COMPACT_PLANS = [
+    (
+        "troll_log",
+        "retention.troll_log_days",
+        "INSERT INTO troll_log_daily (day, troll_type_id, target_user_id, channel_id, count) "
+        "SELECT DATE(ts / 1000, 'unixepoch', '+3 hours'), troll_type_id, COALESCE(target_user_id, 0), "
+        "COALESCE(channel_id, 0), COUNT(*) "
+        "FROM troll_log WHERE ts < ? AND id <= ? GROUP BY 1, 2, 3, 4 "
+        "ON CONFLICT(day, troll_type_id, target_user_id, channel_id) DO UPDATE SET count = count + excluded.count",
+    ),
+    (
+        "activity_log",
+        "retention.activity_log_days",
+        "INSERT INTO activity_log_daily (day, event_type, channel_id, user_id, count) "
+        "SELECT DATE(ts / 1000, 'unixepoch', '+3 hours'), event_type, COALESCE(channel_id, 0), "
+        "COALESCE(user_id, 0), COUNT(*) "
+        "FROM activity_log WHERE ts < ? AND id <= ? GROUP BY 1, 2, 3, 4 "
+        "ON CONFLICT(day, event_type, channel_id, user_id) DO UPDATE SET count = count + excluded.count",
+    ),
+]
+
+
+class Retention(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.last_report = None
+        self.total_rows_compacted = 0
+        self.total_bytes_reclaimed = 0
+        self.retention_loop.start()
+
+    async def cog_unload(self):
+        self.retention_loop.cancel()
+
+    async def _compact_table(
+        self, table: str, upsert_sql: str, cutoff: int, batch_size: int, archive=None,
+    ) -> tuple[int, int]:
+        """
+        Move rows older than cutoff into the daily table, one short transaction per batch.
+
+        With an archive, each batch is read, then written to it (and fsynced) outside
+        the logger's write lock so log flushes aren't held up by the disk, then deleted
+        in a second transaction. A batch archived but not deleted is skipped by the
+        archive on retry. Returns (rows compacted, rows archived).
+        """
+        compacted = archived = 0
+        columns, joins = LOG_COLUMNS[table]
+        while True:
+            async with shared.logger.transaction() as db:
+                async with db.execute(
+                    f"SELECT MAX(id), COUNT(*) FROM (SELECT id FROM {table} WHERE ts < ? ORDER BY id LIMIT ?)",
+                    (cutoff, batch_size),
+                ) as cur:
+                    max_id, count = await cur.fetchone()
+                if not count:
+                    return compacted, archived
+                if archive is not None:
+                    async with db.execute(
+                        f"SELECT {columns} FROM {table} {joins} "
+                        f"WHERE {table}.ts < ? AND {table}.id <= ? ORDER BY {table}.id",
+                        (cutoff, max_id),
+                    ) as cur:
+                        rows = await cur.fetchall()
+            if archive is not None:
+                archived += await asyncio.to_thread(archive.append, table, rows)
+            async with shared.logger.transaction() as db:
+                await db.execute(upsert_sql, (cutoff, max_id))
+                await db.execute(f"DELETE FROM {table} WHERE ts < ? AND id <= ?", (cutoff, max_id))
+            compacted += count
+            await asyncio.sleep(0)  # let the log flusher in between batches
+
+    async def _run_retention(self) -> dict | None:
+        """Single retention pass — extracted for testability."""
+        if not shared.config.get("retention.enabled", True):
+            return None
+        if shared.logger is None:
+            return None
+        started = time.perf_counter()
+        batch_size = max(1, shared.config.get("retention.batch_size", 500))
+        now = datetime.now(timezone.utc)
+        # Cut at EAT midnight so a day is either fully compacted or fully raw
+        today = datetime.combine((now + EAT_OFFSET).date(), datetime.min.time(), timezone.utc) - EAT_OFFSET
+
+        archive = shared.archive if shared.config.get("archive.enabled", True) else None
+
+        compacted = {}
+        archived = 0
+        for table, days_key, upsert_sql in COMPACT_PLANS:
+            days = shared.config.get(days_key, 90)
+            cutoff = int((today - timedelta(days=days)).timestamp() * 1000)
+            compacted[table], table_archived = await self._compact_table(
+                table, upsert_sql, cutoff, batch_size, archive,
+            )
+            archived += table_archived
+        bytes_reclaimed = await incremental_vacuum(shared.logger.transaction)
+
+        rows = sum(compacted.values())
+        self.total_rows_compacted += rows
+        self.total_bytes_reclaimed += bytes_reclaimed
+        self.last_report = {
+            "ran_at": now.isoformat(),
+            "troll_rows_compacted": compacted["troll_log"],
+            "activity_rows_compacted": compacted["activity_log"],
+            "rows_archived": archived,
+            "bytes_reclaimed": bytes_reclaimed,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "total_rows_compacted": self.total_rows_compacted,
+            "total_bytes_reclaimed": self.total_bytes_reclaimed,
+        }
+        if rows:
+            try:
+                await shared.logger.log_activity(
+                    "retention", f"Compacted {rows} old log rows, reclaimed {bytes_reclaimed} bytes",
+                    metadata=compacted,
+                )
+            except Exception:
+                pass
+        return self.last_report
+
+    @tasks.loop(count=1)
+    async def retention_loop(self):
+        while True:
+            try:
+                await self._run_retention()
+            except Exception as e:
+                print(f"[retention] Pass failed: {e}")
+            check_interval = shared.config.get("retention.check_interval_min", 60) if shared.config else 60
+            await asyncio.sleep(check_interval * 60)
+
+    @retention_loop.before_loop
+    async def before_retention_loop(self):
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot):
+    await bot.add_cog(Retention(bot))
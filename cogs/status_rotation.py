@@ -1,13 +1,12 @@
 """Status rotation task loop."""
 
-import asyncio
 import random
 
 import discord
 from discord.ext import commands, tasks
 
 import bot as shared
-from helpers import get_online_members
+from helpers import get_online_members, interruptible_sleep
 from messages import games
 
 
@@ -22,8 +21,9 @@ class StatusRotation(commands.Cog):
     @tasks.loop(count=1)
     async def rotate_status(self):
         while True:
-            interval = shared.config.get("feature.status_rotation.interval_sec", 600) if shared.config else 600
-            await asyncio.sleep(interval)
+            await interruptible_sleep(
+                lambda: shared.config.get("feature.status_rotation.interval_sec", 600), "feature.status_rotation.",
+            )
 
             if not shared.config.get("feature.status_rotation.enabled", True):
                 continue
@@ -1,9 +1,14 @@
 """BotConfig: in-memory config backed by a JSON file."""
 
 import json
+import os
 import asyncio
+from dataclasses import dataclass, fields
 from pathlib import Path
 
+# Changes within this window are written to config.json together
+SAVE_DEBOUNCE_SEC = 0.5
+
 
 # All default settings with metadata for the dashboard
 # (key, default_value, value_type, category, description)
@@ -119,6 +124,30 @@ DEFAULT_SETTINGS = [
     # Message Cache
     ("feature.message_cache.chance", 0.10, "float", "Per-Message Trolls", "Chance to cache a message for 'this you'"),
 
+    # Log Retention
+    ("retention.enabled", True, "bool", "Log Retention", "Compact and delete old log rows"),
+    ("retention.troll_log_days", 90, "int", "Log Retention", "Days to keep troll log rows"),
+    ("retention.activity_log_days", 90, "int", "Log Retention", "Days to keep activity log rows"),
+    ("retention.batch_size", 500, "int", "Log Retention", "Rows compacted per transaction"),
+    ("retention.check_interval_min", 60, "int", "Log Retention", "Minutes between retention runs"),
+    ("archive.enabled", True, "bool", "Log Retention", "Archive raw rows to compressed files before compacting them"),
+
+    # Database Maintenance
+    ("database.profile", "balanced", "string", "Database Maintenance", "SQLite profile: durable, balanced or fast (applies on restart; $DB_PROFILE overrides)"),
+    ("maintenance.enabled", True, "bool", "Database Maintenance", "Run periodic SQLite maintenance"),
+    ("maintenance.check_interval_min", 10, "int", "Database Maintenance", "Minutes between maintenance passes"),
+    ("maintenance.wal_checkpoint_mb", 64, "int", "Database Maintenance", "Checkpoint the WAL once it grows past this many MB"),
+    ("maintenance.optimize_interval_hours", 6, "int", "Database Maintenance", "Hours between PRAGMA optimize runs"),
+    ("maintenance.vacuum_freelist_pages", 1024, "int", "Database Maintenance", "Free pages that trigger an incremental vacuum"),
+    ("maintenance.integrity_interval_hours", 24, "int", "Database Maintenance", "Hours between integrity checks"),
+
+    # Backups
+    ("backup.enabled", True, "bool", "Backups", "Take scheduled online backups of bot.db"),
+    ("backup.interval_hours", 24, "int", "Backups", "Hours between backups"),
+    ("backup.keep", 7, "int", "Backups", "Number of backups to keep"),
+    ("backup.compress", True, "bool", "Backups", "gzip backups after verifying them"),
+    ("backup.step_pages", 1024, "int", "Backups", "Pages copied per backup step"),
+
     # Channels
     ("channels.general_id", "750702727566327869", "string", "Channels", "General channel ID"),
     ("channels.greetings_id", "628278524905521179", "string", "Channels", "Greetings channel ID"),
@@ -158,23 +187,180 @@ DEFAULT_SETTINGS = [
 
 # Build metadata lookup: key -> (value_type, category, description)
 _META = {key: (vtype, cat, desc) for key, _, vtype, cat, desc in DEFAULT_SETTINGS}
+_DEFAULTS = {key: value for key, value, *_ in DEFAULT_SETTINGS}
+
+
+# ---------------------------------------------------------------------------
+# Typed snapshot of the settings read on every message
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class Toggle:
+    enabled: bool
+    chance: float
+
+
+@dataclass(frozen=True, slots=True)
+class GnPolice:
+    enabled: bool
+    min_minutes: int
+    max_minutes: int
+    chance: float
+
+
+@dataclass(frozen=True, slots=True)
+class RageDetector:
+    enabled: bool
+    caps_threshold: float
+    min_length: int
+    exclaim_threshold: int
+    chance: float
+
+
+@dataclass(frozen=True, slots=True)
+class HypeDetector:
+    enabled: bool
+    threshold_messages: int
+    time_window_sec: int
+    cooldown_min: int
+    weekday_chance: float
+    weekend_chance: float
+
+
+@dataclass(frozen=True, slots=True)
+class EssayDetector:
+    enabled: bool
+    threshold_chars: int
+    chance: float
+
+
+@dataclass(frozen=True, slots=True)
+class PerMessageTrolls:
+    enabled: bool
+    weekday_chance: float
+    weekend_chance: float
+
+
+@dataclass(frozen=True, slots=True)
+class LateNight:
+    enabled: bool
+    start_hour: int
+    end_hour: int
+    bonus_chance: float
+
+
+# feature.<name>.* settings -> snapshot type (field names are the setting suffixes)
+_FEATURE_TYPES = {
+    "gn_police": GnPolice,
+    "rage_detector": RageDetector,
+    "excuse_generator": Toggle,
+    "cap_alarm": Toggle,
+    "flex_police": Toggle,
+    "lag_defender": Toggle,
+    "hype_detector": HypeDetector,
+    "essay_detector": EssayDetector,
+    "k_energy": Toggle,
+    "per_message_trolls": PerMessageTrolls,
+    "late_night": LateNight,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """
+    Immutable, typed view of the settings the on_message path reads.
+
+    BotConfig rebuilds it whenever a value changes, so a message costs a few
+    attribute reads instead of dozens of string-keyed lookups. Channel IDs are
+    already ints and the exclusion list is a frozenset.
+    """
+    modmail_id: int | None
+    excluded: frozenset
+    message_cache_chance: float
+    gn_police: GnPolice
+    rage_detector: RageDetector
+    excuse_generator: Toggle
+    cap_alarm: Toggle
+    flex_police: Toggle
+    lag_defender: Toggle
+    hype_detector: HypeDetector
+    essay_detector: EssayDetector
+    k_energy: Toggle
+    per_message_trolls: PerMessageTrolls
+    late_night: LateNight
+
+
+def _coerce(value, kind, default):
+    """Cast a stored value to its field type, falling back to the default if it can't be."""
+    if value is None:
+        return default
+    try:
+        if kind is bool and isinstance(value, str):
+            return value.strip().lower() in ("true", "1", "yes", "on")
+        return kind(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _channel_id(value) -> int | None:
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def build_snapshot(data: dict) -> ConfigSnapshot:
+    """Compile a settings dict into a ConfigSnapshot (missing or malformed values use defaults)."""
+    features = {}
+    for name, cls in _FEATURE_TYPES.items():
+        values = {}
+        for f in fields(cls):
+            key = f"feature.{name}.{f.name}"
+            values[f.name] = _coerce(data.get(key), f.type, _DEFAULTS[key])
+        features[name] = cls(**values)
+    excluded = data.get("channels.excluded", _DEFAULTS["channels.excluded"])
+    return ConfigSnapshot(
+        modmail_id=_channel_id(data.get("channels.modmail_id", _DEFAULTS["channels.modmail_id"])),
+        excluded=frozenset(
+            cid for cid in map(_channel_id, excluded if isinstance(excluded, list) else []) if cid is not None
+        ),
+        message_cache_chance=_coerce(
+            data.get("feature.message_cache.chance"), float, _DEFAULTS["feature.message_cache.chance"],
+        ),
+        **features,
+    )
 
 
 class BotConfig:
     """
     Read path:  config.get("key") -> value  (dict lookup, zero I/O)
-    Write path: config.set("key", val) -> updates dict + writes config.json
+                config.snapshot.<feature>.<field>  (typed, for per-message code)
+    Write path: config.set("key", val) -> updates dict, schedules a write of config.json
+
+    Writes are debounced (SAVE_DEBOUNCE_SEC), serialized in a worker thread and
+    atomic: the JSON goes to a temp file that is then os.replace()d over
+    config.json, so a crash never leaves a truncated file. flush() writes any
+    pending change now (called on shutdown).
+
+    Long-running loops can wait_for_change("feature.x.") to wake as soon as a
+    matching setting changes instead of sleeping out a stale interval.
     """
 
     def __init__(self, path: str = "config.json"):
         self._path = Path(path)
         self._data: dict = {}
         self._lock = asyncio.Lock()
+        self._version = 0        # bumped on every change
+        self._saved_version = 0  # version last written to disk
+        self._save_task = None
+        self._flush_requested = None  # the pending save's Event, set by flush()
+        self.snapshot = build_snapshot(_DEFAULTS)
+        self._waiters = []  # [(key prefixes, future)] from wait_for_change()
 
     def load(self):
         """Load config from JSON file, merging with defaults for any missing keys."""
         # Start with defaults
-        defaults = {key: value for key, value, *_ in DEFAULT_SETTINGS}
+        defaults = dict(_DEFAULTS)
 
         if self._path.exists():
             try:
@@ -186,26 +372,100 @@ class BotConfig:
                 print(f"[config] WARNING: Failed to load config.json ({e}), using defaults")
 
         self._data = defaults
+        self.snapshot = build_snapshot(self._data)
         # Write back so any new default keys are persisted
-        self._save()
+        self._write(dict(self._data))
 
-    def _save(self):
-        """Write current config to JSON file."""
+    def _write(self, data: dict):
+        """Write a config snapshot to a temp file and atomically replace config.json."""
+        tmp = self._path.with_name(self._path.name + ".tmp")
         try:
-            with open(self._path, "w") as f:
-                json.dump(self._data, f, indent=2)
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._path)
         except OSError as e:
             print(f"[config] Failed to save config: {e}")
 
+    async def _save_now(self):
+        async with self._lock:
+            version = self._version
+            await asyncio.to_thread(self._write, dict(self._data))
+            self._saved_version = version
+
+    async def _save_later(self, flush_requested: asyncio.Event):
+        try:
+            await asyncio.wait_for(flush_requested.wait(), timeout=SAVE_DEBOUNCE_SEC)
+        except asyncio.TimeoutError:
+            pass
+        # Changes made while a write was in flight get their own write
+        while self._saved_version != self._version:
+            await self._save_now()
+
+    def _changed(self):
+        self._version += 1
+        if self._save_task is None or self._save_task.done():
+            # A fresh Event per save, so a flush() that lands after this save
+            # stopped waiting can't cut the next one's debounce short
+            self._flush_requested = asyncio.Event()
+            self._save_task = asyncio.create_task(self._save_later(self._flush_requested))
+
+    async def flush(self):
+        """Write pending changes now instead of waiting out the debounce window."""
+        task = self._save_task
+        if task is not None and not task.done():
+            self._flush_requested.set()
+            await task
+        elif self._saved_version != self._version:
+            await self._save_now()
+
+    @property
+    def version(self) -> int:
+        """Bumped on every change (dashboard responses are cached per version)."""
+        return self._version
+
     def get(self, key: str, default=None):
         """Fast in-memory read."""
         return self._data.get(key, default)
 
     async def set(self, key: str, value):
-        """Update value in memory and write to disk."""
-        async with self._lock:
-            self._data[key] = value
-            self._save()
+        """Update value in memory; config.json is written shortly after."""
+        await self.set_many({key: value})
+
+    async def set_many(self, updates: dict):
+        """Update several values at once, with a single write."""
+        changed = [key for key, value in updates.items() if key not in self._data or self._data[key] != value]
+        if not changed:
+            return
+        self._data.update(updates)
+        self.snapshot = build_snapshot(self._data)
+        self._changed()
+        self._notify(changed)
+
+    def _notify(self, keys: list):
+        for prefixes, waiter in self._waiters:
+            if not waiter.done() and (not prefixes or any(key.startswith(prefixes) for key in keys)):
+                waiter.set_result(True)
+
+    async def wait_for_change(self, *prefixes: str, timeout: float | None = None) -> bool:
+        """
+        Wait until a setting whose key starts with one of prefixes changes.
+
+        Returns True on a change, False if timeout seconds pass first. A full key
+        is its own prefix, so this subscribes to single keys as well; no prefixes
+        means any setting.
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (prefixes, waiter)
+        self._waiters.append(entry)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiters.remove(entry)
 
     def get_all_grouped(self) -> dict:
         """Return all settings grouped by category for the dashboard."""
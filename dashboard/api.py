@@ -1,21 +1,74 @@
 """REST API endpoints for the dashboard."""
 
+import io
+import re
+import csv
+import json
 import time
+import zlib
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 
 import discord
-from quart import Blueprint, request, jsonify, current_app
+from quart import Blueprint, Response, request, jsonify, current_app, stream_with_context
 
 from dashboard.auth import login_required
+from dashboard.cache import cached
+from database import EAT_OFFSET, LOG_COLUMNS
 
 api_bp = Blueprint("api", __name__)
 
 _start_time = time.time()
 
 
+@asynccontextmanager
+async def _read_db():
+    """A connection from the read pool, or the shared connection when there is no pool."""
+    pool = current_app.db_pool
+    if pool is None:
+        yield current_app.db
+        return
+    async with pool.acquire() as db:
+        yield db
+
+
+async def _fetch_all(sql: str, params=()) -> list:
+    """Run one read query on its own pooled connection."""
+    async with _read_db() as db:
+        async with db.execute(sql, params) as cur:
+            return await cur.fetchall()
+
+
+def _config_version():
+    return current_app.bot_config.version
+
+
+def _log_version():
+    """Every db write goes through BotLogger, so its write version covers the logs (and archive moves)."""
+    logger = current_app.bot_logger
+    return logger.write_version if logger else None
+
+
+def _rollup_version():
+    """The stats queries only change on a committed write; trolls_per_day also moves with the EAT day."""
+    logger = current_app.bot_logger
+    if logger is None:
+        return None
+    return logger.write_version, (datetime.now(timezone.utc) + EAT_OFFSET).date()
+
+
+def _stats_version():
+    version = _rollup_version()
+    # The response also merges uncommitted counters, which move with every chat message
+    return None if version is None else (*version, current_app.bot_logger.counter_version)
+
+
 # ── Settings ──────────────────────────────────────────────
 
 @api_bp.route("/api/settings")
 @login_required
+@cached(_config_version)
 async def get_settings():
     config = current_app.bot_config
     grouped = config.get_all_grouped()
@@ -70,6 +123,7 @@ async def update_settings_bulk():
         return jsonify({"error": "invalid or missing JSON body"}), 400
     updates = data.get("updates", [])
     results = []
+    validated = {}
     for item in updates:
         key = item.get("key")
         value = item.get("value")
@@ -95,8 +149,9 @@ async def update_settings_bulk():
                 value = str(value)
         except (ValueError, TypeError):
             continue
-        await config.set(key, value)
+        validated[key] = value
         results.append({"key": key, "value": value})
+    await config.set_many(validated)
     return jsonify({"ok": True, "updated": results})
 
 
@@ -161,154 +216,542 @@ async def remove_excluded_channel(channel_id: int):
 
 # ── Logs ──────────────────────────────────────────────────
 
-@api_bp.route("/api/logs/trolls")
-@login_required
-async def get_troll_logs():
-    db = current_app.db
-    try:
-        page = max(1, int(request.args.get("page", 1)))
-        limit = min(max(1, int(request.args.get("limit", 50))), 200)
-    except (ValueError, TypeError):
-        page, limit = 1, 50
-    troll_type = request.args.get("type", "")
-    user = request.args.get("user", "")
-    offset = (page - 1) * limit
+TOTAL_CACHE_TTL = 30  # seconds a filtered COUNT(*) is reused
+_total_cache: dict[tuple, tuple[float, int]] = {}
 
-    where_clauses = []
-    params = []
-    if troll_type:
-        where_clauses.append("troll_type = ?")
-        params.append(troll_type)
-    if user:
-        where_clauses.append("(target_user_name LIKE ? OR target_user_id = ?)")
-        params.extend([f"%{user}%", user])
 
-    where_sql = ("WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
+class _BadParameter(ValueError):
+    """A query parameter that can't be parsed; answered with a 400."""
 
-    # Count
-    async with db.execute(f"SELECT COUNT(*) FROM troll_log {where_sql}", params) as cur:
-        total = (await cur.fetchone())[0]
 
-    # Fetch
-    async with db.execute(
-        f"SELECT id, timestamp, troll_type, troll_name, target_user_id, target_user_name, "
-        f"channel_id, channel_name, details FROM troll_log {where_sql} "
-        f"ORDER BY id DESC LIMIT ? OFFSET ?",
-        params + [limit, offset],
-    ) as cur:
-        rows = await cur.fetchall()
+@api_bp.errorhandler(_BadParameter)
+async def _bad_parameter(e):
+    return jsonify({"error": str(e)}), 400
 
-    logs = []
-    for r in rows:
-        logs.append({
-            "id": r[0], "timestamp": r[1], "troll_type": r[2], "troll_name": r[3],
-            "target_user_id": r[4], "target_user_name": r[5],
-            "channel_id": r[6], "channel_name": r[7], "details": r[8],
-        })
 
-    return jsonify({"logs": logs, "total": total, "page": page, "limit": limit})
+def _parse_id(name: str) -> int | None:
+    value = request.args.get(name, "")
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
 
 
-@api_bp.route("/api/logs/activity")
-@login_required
-async def get_activity_logs():
-    db = current_app.db
+def _parse_time(name: str) -> int | None:
+    """
+    Epoch milliseconds from a `since`/`until` query parameter.
+
+    Accepts epoch ms or an ISO date/datetime (EAT when no offset is given).
+    A bare date for `until` means the end of that day. Anything else is a 400.
+    """
+    value = request.args.get(name, "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    try:
+        when = datetime.fromisoformat(value)
+    except ValueError:
+        raise _BadParameter(f"{name} must be epoch milliseconds or an ISO date/datetime") from None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc) - EAT_OFFSET
+    if name == "until" and len(value) == 10:
+        when += timedelta(days=1)
+    return int(when.timestamp() * 1000)
+
+
+def _time_range(table: str, where_clauses: list, params: list):
+    """
+    Add `since`/`until` filters as primary-key bounds.
+
+    Ids are assigned in time order, so the ts index finds the first/last id in
+    range once and the page query stays a rowid range walk (no sort, works with
+    every other filter's index).
+    """
+    since = _parse_time("since")
+    until = _parse_time("until")
+    if since is not None:
+        where_clauses.append(f"{table}.id >= (SELECT id FROM {table} WHERE ts >= ? ORDER BY ts, id LIMIT 1)")
+        params.append(since)
+    if until is not None:
+        where_clauses.append(f"{table}.id <= (SELECT id FROM {table} WHERE ts < ? ORDER BY ts DESC, id DESC LIMIT 1)")
+        params.append(until)
+
+
+def _archive_query(**filters) -> dict | None:
+    """The request's filters for LogArchive, or None when there is no archive."""
+    if current_app.archive is None:
+        return None
+    return {"since": _parse_time("since"), "until": _parse_time("until"), **filters}
+
+
+async def _cached_total(db, table: str, where_sql: str, params: list) -> int:
+    """COUNT(*) for a filter, cached for TOTAL_CACHE_TTL seconds."""
+    key = (table, where_sql, tuple(params))
+    now = time.monotonic()
+    hit = _total_cache.get(key)
+    if hit and now - hit[0] < TOTAL_CACHE_TTL:
+        return hit[1]
+    async with db.execute(f"SELECT COUNT(*) FROM {table} {where_sql}", params) as cur:
+        total = (await cur.fetchone())[0]
+    if len(_total_cache) > 256:
+        _total_cache.clear()
+    _total_cache[key] = (now, total)
+    return total
+
+
+async def _fetch_log_page(
+    db, table: str, columns: str, where_clauses: list, params: list, limit: int, joins: str = "",
+    archive_query: dict | None = None,
+) -> dict:
+    """
+    Fetch one page of a log table, newest first.
+
+    `joins` (dimension lookups) only apply to the page query; `where_clauses`
+    must reference the log table alone, since counts and probes skip the joins.
+
+    Cursor mode (default): walks the primary key. `before_id` gives the page of
+    older rows, `after_id` the page of newer rows; each page costs an index seek
+    plus `limit` rows no matter how deep it is. Legacy `page=N` uses OFFSET.
+    The total is only counted when asked for with `total=1` (cached).
+
+    With `archive_query` (the same filters, for LogArchive), cursor pages carry
+    on into the archive once the table runs out: archived ids are all older than
+    the rows still in the table, so the cursors work across both.
+    """
+    after_id = _parse_id("after_id")
+    before_id = _parse_id("before_id")
+    want_total = request.args.get("total", "") in ("1", "true")
+    legacy_page = None
+    if after_id is None and before_id is None and "page" in request.args:
+        try:
+            legacy_page = max(1, int(request.args.get("page", 1)))
+        except (ValueError, TypeError):
+            legacy_page = 1
+
+    filter_sql = " AND ".join(where_clauses)
+    clauses = list(where_clauses)
+    page_params = list(params)
+    if after_id is not None:
+        clauses.append(f"{table}.id > ?")
+        page_params.append(after_id)
+        order = "ASC"
+    else:
+        if before_id is not None:
+            clauses.append(f"{table}.id < ?")
+            page_params.append(before_id)
+        order = "DESC"
+    where_sql = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+
+    sql = f"SELECT {columns} FROM {table} {joins} {where_sql} ORDER BY {table}.id {order} LIMIT ?"
+    page_params.append(limit + 1)
+    if legacy_page is not None:
+        sql += " OFFSET ?"
+        page_params.append((legacy_page - 1) * limit)
+    async with db.execute(sql, page_params) as cur:
+        rows = list(await cur.fetchall())
+
+    archive = current_app.archive if archive_query is not None and legacy_page is None else None
+    if archive is not None:
+        if order == "DESC" and len(rows) <= limit:
+            bound = rows[-1][0] if rows else before_id
+            rows += await asyncio.to_thread(
+                archive.read, table, limit + 1 - len(rows), True, before_id=bound, **archive_query,
+            )
+        elif order == "ASC":
+            cold = await asyncio.to_thread(archive.read, table, limit + 1, False, after_id=after_id, **archive_query)
+            rows = (cold + rows)[:limit + 1]
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if order == "ASC":
+        rows.reverse()
+
+    # Is there anything on the other side of the cursor we came from?
+    async def _exists(condition: str, cursor_id: int) -> bool:
+        sql = f"SELECT 1 FROM {table} WHERE {filter_sql + ' AND ' if filter_sql else ''}{condition} LIMIT 1"
+        async with db.execute(sql, list(params) + [cursor_id]) as cur:
+            if await cur.fetchone() is not None:
+                return True
+        if archive is None:
+            return False
+        bound = {"before_id" if condition.startswith("id <") else "after_id": cursor_id}
+        return await asyncio.to_thread(archive.count, table, 1, **bound, **archive_query) > 0
+
+    if order == "ASC":
+        has_newer = has_more
+        has_older = bool(rows) and await _exists("id < ?", rows[-1][0])
+    else:
+        has_older = has_more
+        if legacy_page is not None:
+            has_newer = legacy_page > 1
+        else:
+            has_newer = before_id is not None and bool(rows) and await _exists("id > ?", rows[0][0])
+
+    result = {
+        "rows": rows,
+        "limit": limit,
+        "older_cursor": rows[-1][0] if rows and has_older else None,
+        "newer_cursor": rows[0][0] if rows and has_newer else None,
+    }
+    if legacy_page is not None:
+        result["page"] = legacy_page
+    if want_total or legacy_page is not None:
+        base_where = ("WHERE " + filter_sql) if filter_sql else ""
+        result["total"] = await _cached_total(db, table, base_where, params)
+        if archive is not None:
+            result["total"] += await asyncio.to_thread(archive.count, table, **archive_query)
+    return result
+
+
+def _fts_query(text: str) -> str | None:
+    """Free text -> safe FTS5 query: every word must match (as a prefix), quoted so no syntax leaks in."""
+    terms = re.findall(r"\w+", text)
+    return " ".join(f'"{term}"*' for term in terms) or None
+
+
+async def _fetch_search_page(
+    db, table: str, columns: str, where_clauses: list, params: list, limit: int, joins: str, match: str,
+) -> dict:
+    """
+    One page of full-text matches, best first (bm25 rank from {table}_fts).
+
+    Ranked results have no stable key to seek from, so the cursors here are row
+    offsets into the match list (`offset=`); FTS5 produces matches in rank order.
+    """
+    offset = max(0, _parse_id("offset") or 0)
+    want_total = request.args.get("total", "") in ("1", "true")
+    fts = f"{table}_fts"
+    from_sql = f"{fts} JOIN {table} ON {table}.id = {fts}.rowid"
+    where_sql = "WHERE " + " AND ".join([f"{fts} MATCH ?"] + where_clauses)
+    match_params = [match] + list(params)
+
+    sql = f"SELECT {columns} FROM {from_sql} {joins} {where_sql} ORDER BY {fts}.rank LIMIT ? OFFSET ?"
+    async with db.execute(sql, match_params + [limit + 1, offset]) as cur:
+        rows = list(await cur.fetchall())
+    has_more = len(rows) > limit
+
+    result = {
+        "rows": rows[:limit],
+        "limit": limit,
+        "ranked": True,
+        "older_cursor": offset + limit if has_more else None,
+        "newer_cursor": max(0, offset - limit) if offset else None,
+    }
+    if want_total:
+        result["total"] = await _cached_total(db, from_sql, where_sql, match_params)
+    return result
+
+
+def _parse_limit() -> int:
     try:
-        page = max(1, int(request.args.get("page", 1)))
-        limit = min(max(1, int(request.args.get("limit", 50))), 200)
+        return min(max(1, int(request.args.get("limit", 50))), 200)
     except (ValueError, TypeError):
-        page, limit = 1, 50
-    event_type = request.args.get("type", "")
-    offset = (page - 1) * limit
+        return 50
+
+
+def _iso(ts: int) -> str:
+    return datetime.fromtimestamp(ts / 1000, timezone.utc).isoformat()
+
+
+def _str_id(value: int | None) -> str | None:
+    # Snowflakes don't fit in a JavaScript number; the dashboard gets them as strings
+    return str(value) if value is not None else None
+
 
+TROLL_COLUMNS, TROLL_JOINS = LOG_COLUMNS["troll_log"]
+ACTIVITY_COLUMNS, ACTIVITY_JOINS = LOG_COLUMNS["activity_log"]
+
+
+async def _troll_filters() -> tuple[list, list]:
+    """WHERE clauses + params for the troll log's `type`/`user`/`since`/`until` arguments."""
+    troll_type = request.args.get("type", "")
+    user = request.args.get("user", "")
+    where_clauses = []
+    params = []
+    if troll_type:
+        where_clauses.append("troll_type_id = (SELECT id FROM troll_types WHERE type = ?)")
+        params.append(troll_type)
+    if user:
+        # A name substring, or for digits also a Discord user ID. The matching ids are
+        # looked up first in the (small) users table: one id is an equality on the
+        # target index, which walks ids in order with no sort. Only a name matching
+        # several users leaves SQLite sorting those users' rows.
+        user_id = int(user) if user.isdigit() else None
+        rows = await _fetch_all("SELECT id FROM users WHERE id = ? OR name LIKE ?", (user_id, f"%{user}%"))
+        user_ids = sorted({r[0] for r in rows} | ({user_id} if user_id is not None else set()))
+        if len(user_ids) == 1:
+            where_clauses.append("target_user_id = ?")
+        else:
+            where_clauses.append(f"target_user_id IN ({', '.join('?' * len(user_ids))})")
+        params += user_ids
+    _time_range("troll_log", where_clauses, params)
+    return where_clauses, params
+
+
+def _activity_filters() -> tuple[list, list]:
+    """WHERE clauses + params for the activity log's `type`/`since`/`until` arguments."""
+    event_type = request.args.get("type", "")
     where_clauses = []
     params = []
     if event_type:
         where_clauses.append("event_type = ?")
         params.append(event_type)
+    _time_range("activity_log", where_clauses, params)
+    return where_clauses, params
 
-    where_sql = ("WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
 
-    async with db.execute(f"SELECT COUNT(*) FROM activity_log {where_sql}", params) as cur:
-        total = (await cur.fetchone())[0]
+def _troll_entry(r) -> dict:
+    return {
+        "id": r[0], "timestamp": _iso(r[1]), "ts": r[1], "troll_type": r[2], "troll_name": r[3],
+        "target_user_id": _str_id(r[4]), "target_user_name": r[5],
+        "channel_id": _str_id(r[6]), "channel_name": r[7], "details": r[8],
+    }
+
+
+def _activity_entry(r) -> dict:
+    return {
+        "id": r[0], "timestamp": _iso(r[1]), "ts": r[1], "event_type": r[2], "description": r[3],
+        "channel_id": _str_id(r[4]), "channel_name": r[5],
+        "user_id": _str_id(r[6]), "user_name": r[7], "metadata": r[8],
+    }
+
+
+@api_bp.route("/api/logs/trolls")
+@login_required
+@cached(_log_version)
+async def get_troll_logs():
+    limit = _parse_limit()
+    where_clauses, params = await _troll_filters()
+    match = _fts_query(request.args.get("q", ""))
+
+    async with _read_db() as db:
+        if match:
+            page = await _fetch_search_page(
+                db, "troll_log", TROLL_COLUMNS, where_clauses, params, limit, TROLL_JOINS, match,
+            )
+        else:
+            archive_query = _archive_query(
+                log_type=request.args.get("type") or None, user=request.args.get("user") or None,
+            )
+            page = await _fetch_log_page(
+                db, "troll_log", TROLL_COLUMNS, where_clauses, params, limit, TROLL_JOINS, archive_query,
+            )
+
+    logs = [_troll_entry(r) for r in page.pop("rows")]
+    return jsonify({"logs": logs, **page})
 
-    async with db.execute(
-        f"SELECT id, timestamp, event_type, description, channel_id, channel_name, "
-        f"user_id, user_name, metadata FROM activity_log {where_sql} "
-        f"ORDER BY id DESC LIMIT ? OFFSET ?",
-        params + [limit, offset],
-    ) as cur:
-        rows = await cur.fetchall()
 
-    logs = []
-    for r in rows:
-        logs.append({
-            "id": r[0], "timestamp": r[1], "event_type": r[2], "description": r[3],
-            "channel_id": r[4], "channel_name": r[5],
-            "user_id": r[6], "user_name": r[7], "metadata": r[8],
-        })
+@api_bp.route("/api/logs/activity")
+@login_required
+@cached(_log_version)
+async def get_activity_logs():
+    limit = _parse_limit()
+    where_clauses, params = _activity_filters()
+    match = _fts_query(request.args.get("q", ""))
 
-    return jsonify({"logs": logs, "total": total, "page": page, "limit": limit})
+    async with _read_db() as db:
+        if match:
+            page = await _fetch_search_page(
+                db, "activity_log", ACTIVITY_COLUMNS, where_clauses, params, limit, ACTIVITY_JOINS, match,
+            )
+        else:
+            archive_query = _archive_query(log_type=request.args.get("type") or None)
+            page = await _fetch_log_page(
+                db, "activity_log", ACTIVITY_COLUMNS, where_clauses, params, limit, ACTIVITY_JOINS, archive_query,
+            )
+
+    logs = [_activity_entry(r) for r in page.pop("rows")]
+    return jsonify({"logs": logs, **page})
 
 
 @api_bp.route("/api/logs/trolls/types")
 @login_required
+@cached(_log_version)
 async def get_troll_types():
-    db = current_app.db
-    async with db.execute("SELECT DISTINCT troll_type FROM troll_log ORDER BY troll_type") as cur:
-        types = [r[0] for r in await cur.fetchall()]
+    rows = await _fetch_all("SELECT type FROM troll_types ORDER BY type")
+    types = [r[0] for r in rows]
     return jsonify({"types": types})
 
 
 @api_bp.route("/api/logs/activity/types")
 @login_required
+@cached(_log_version)
 async def get_activity_types():
-    db = current_app.db
-    async with db.execute("SELECT DISTINCT event_type FROM activity_log ORDER BY event_type") as cur:
-        types = [r[0] for r in await cur.fetchall()]
+    rows = await _fetch_all("SELECT DISTINCT event_type FROM activity_log ORDER BY event_type")
+    types = [r[0] for r in rows]
     return jsonify({"types": types})
 
 
+# ── Export ────────────────────────────────────────────────
+
+EXPORT_BATCH_ROWS = 500  # rows read (and encoded) per chunk
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _export_response(page_query, to_entry, name: str):
+    """
+    Stream rows as NDJSON or CSV (`format=`), optionally gzipped (`gzip=1`).
+
+    page_query(last_row, limit) returns (sql, params) for the `limit` rows after
+    last_row in export order (None for the first page). Each chunk of
+    EXPORT_BATCH_ROWS is its own keyset query on a connection taken for just that
+    query, so memory stays flat and no connection or WAL snapshot is held while
+    a slow client downloads.
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    compress = request.args.get("gzip", "") in ("1", "true")
+
+    def encode(entries: list, header: bool) -> str:
+        if fmt == "ndjson":
+            return "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries)
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=list(entries[0]))
+        if header:
+            writer.writeheader()
+        writer.writerows(entries)
+        return buf.getvalue()
+
+    @stream_with_context
+    async def generate():
+        gz = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+        last = None
+        while True:
+            rows = await _fetch_all(*page_query(last, EXPORT_BATCH_ROWS))
+            if not rows:
+                break
+            chunk = encode([to_entry(r) for r in rows], last is None).encode()
+            if gz:
+                chunk = gz.compress(chunk)
+            if chunk:
+                yield chunk
+            if len(rows) < EXPORT_BATCH_ROWS:
+                break
+            last = rows[-1]
+        if gz:
+            yield gz.flush()
+
+    filename = f"{name}.{fmt}" + (".gz" if compress else "")
+    response = Response(
+        generate(),
+        mimetype="application/gzip" if compress else EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+    response.timeout = None  # a large export may outlive RESPONSE_TIMEOUT
+    return response
+
+
+def _export_pages(table: str, columns: str, joins: str, where_clauses: list, params: list):
+    """Oldest-first pages by id; `q=` narrows to full-text matches instead of ranking them."""
+    match = _fts_query(request.args.get("q", ""))
+    if match:
+        where_clauses.append(f"{table}.id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)")
+        params.append(match)
+
+    def page_query(last_row, limit):
+        clauses, args = list(where_clauses), list(params)
+        if last_row is not None:
+            clauses.append(f"{table}.id > ?")
+            args.append(last_row[0])
+        where_sql = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        return f"SELECT {columns} FROM {table} {joins} {where_sql} ORDER BY {table}.id LIMIT ?", [*args, limit]
+    return page_query
+
+
+@api_bp.route("/api/export/trolls")
+@login_required
+async def export_trolls():
+    where_clauses, params = await _troll_filters()
+    pages = _export_pages("troll_log", TROLL_COLUMNS, TROLL_JOINS, where_clauses, params)
+    return _export_response(pages, _troll_entry, "trolls")
+
+
+@api_bp.route("/api/export/activity")
+@login_required
+async def export_activity():
+    where_clauses, params = _activity_filters()
+    pages = _export_pages("activity_log", ACTIVITY_COLUMNS, ACTIVITY_JOINS, where_clauses, params)
+    return _export_response(pages, _activity_entry, "activity")
+
+
+@api_bp.route("/api/export/stats")
+@login_required
+async def export_stats():
+    # Daily troll counts per type from the rollup, so compacted days are included.
+    # Paged in primary-key order, (day, troll_type_id), so each page is a seek with no sort.
+    def page_query(last_row, limit):
+        after_sql, args = "", []
+        if last_row is not None:
+            after_sql, args = "WHERE (d.day, d.troll_type_id) > (?, ?) ", [last_row[0], last_row[4]]
+        return (
+            "SELECT d.day, t.type, t.name, d.count, d.troll_type_id FROM troll_daily d "
+            f"JOIN troll_types t ON t.id = d.troll_type_id {after_sql}ORDER BY d.day, d.troll_type_id LIMIT ?",
+            [*args, limit],
+        )
+    return _export_response(
+        page_query, lambda r: {"day": r[0], "troll_type": r[1], "troll_name": r[2], "count": r[3]}, "troll_stats",
+    )
+
+
 # ── Stats ─────────────────────────────────────────────────
 
+async def _stats_rows() -> tuple:
+    """
+    Rows behind /api/stats, reused until the logger commits a write or the EAT day turns.
+
+    Everything except the persisted counters reads the rollup tables BotLogger
+    maintains, never the raw logs. The queries are independent, so each runs
+    on its own pooled connection concurrently.
+    """
+    version = _rollup_version()
+    snapshot = current_app.stats_snapshot
+    if version is not None and snapshot is not None and snapshot[0] == version:
+        return snapshot[1]
+    rows = await asyncio.gather(
+        _fetch_all("SELECT key, value FROM stats"),
+        # Trolls by type (grouped on the integer id, names from the dimension)
+        _fetch_all(
+            "SELECT t.type, t.name, d.cnt FROM ("
+            "SELECT troll_type_id, SUM(count) as cnt FROM troll_daily GROUP BY troll_type_id"
+            ") d JOIN troll_types t ON t.id = d.troll_type_id ORDER BY d.cnt DESC"
+        ),
+        # Top targets (current display names)
+        _fetch_all(
+            "SELECT u.name, tt.user_id, tt.count FROM troll_targets tt "
+            "LEFT JOIN users u ON u.id = tt.user_id ORDER BY tt.count DESC LIMIT 10"
+        ),
+        # Trolls per day (last 30 EAT days; a range scan on the rollup's primary key)
+        _fetch_all(
+            "SELECT day, SUM(count) as cnt FROM troll_daily "
+            "WHERE day >= DATE('now', '+3 hours', '-30 days') "
+            "GROUP BY day ORDER BY day"
+        ),
+        # Activity by hour (EAT)
+        _fetch_all("SELECT hour, SUM(count) as cnt FROM activity_hourly GROUP BY hour ORDER BY hour"),
+    )
+    if version is not None:
+        current_app.stats_snapshot = (version, rows)
+    return rows
+
+
 @api_bp.route("/api/stats")
 @login_required
+@cached(_stats_version)
 async def get_stats():
-    db = current_app.db
-
-    # All counters
-    async with db.execute("SELECT key, value FROM stats") as cur:
-        counters = {r[0]: r[1] for r in await cur.fetchall()}
-
-    # Trolls by type
-    async with db.execute(
-        "SELECT troll_type, troll_name, COUNT(*) as cnt FROM troll_log "
-        "GROUP BY troll_type, troll_name ORDER BY cnt DESC"
-    ) as cur:
-        by_type = [{"type": r[0], "name": r[1], "count": r[2]} for r in await cur.fetchall()]
-
-    # Top targets
-    async with db.execute(
-        "SELECT target_user_name, target_user_id, COUNT(*) as cnt FROM troll_log "
-        "WHERE target_user_name IS NOT NULL "
-        "GROUP BY target_user_id ORDER BY cnt DESC LIMIT 10"
-    ) as cur:
-        top_targets = [{"name": r[0], "user_id": r[1], "count": r[2]} for r in await cur.fetchall()]
-
-    # Trolls per day (last 30 days)
-    async with db.execute(
-        "SELECT DATE(timestamp) as day, COUNT(*) as cnt FROM troll_log "
-        "WHERE timestamp >= DATE('now', '-30 days') "
-        "GROUP BY day ORDER BY day"
-    ) as cur:
-        per_day = [{"day": r[0], "count": r[1]} for r in await cur.fetchall()]
-
-    # Activity by hour
-    async with db.execute(
-        "SELECT CAST(strftime('%H', timestamp) AS INTEGER) as hour, COUNT(*) as cnt "
-        "FROM activity_log GROUP BY hour ORDER BY hour"
-    ) as cur:
-        by_hour = [{"hour": r[0], "count": r[1]} for r in await cur.fetchall()]
+    counter_rows, type_rows, target_rows, day_rows, hour_rows = await _stats_rows()
+
+    # All counters (persisted value + deltas the logger hasn't flushed yet)
+    counters = {r[0]: r[1] for r in counter_rows}
+    logger = current_app.bot_logger
+    if logger:
+        counters = logger.counters.merge(counters)
+
+    by_type = [{"type": r[0], "name": r[1], "count": r[2]} for r in type_rows]
+    top_targets = [{"name": r[0], "user_id": _str_id(r[1]), "count": r[2]} for r in target_rows]
+    per_day = [{"day": r[0], "count": r[1]} for r in day_rows]
+    by_hour = [{"hour": r[0], "count": r[1]} for r in hour_rows]
 
     return jsonify({
         "counters": counters,
@@ -319,6 +762,47 @@ async def get_stats():
     })
 
 
+@api_bp.route("/api/retention")
+@login_required
+async def get_retention():
+    cog = current_app.bot_client.get_cog("Retention")
+    archive = current_app.archive
+    return jsonify({
+        "enabled": current_app.bot_config.get("retention.enabled", True),
+        "last_report": cog.last_report if cog else None,
+        "archive": await asyncio.to_thread(archive.summary) if archive else None,
+    })
+
+
+@api_bp.route("/api/db/maintenance")
+@login_required
+async def get_db_maintenance():
+    cog = current_app.bot_client.get_cog("DbMaintenance")
+    return jsonify({
+        "enabled": current_app.bot_config.get("maintenance.enabled", True),
+        "report": cog.report() if cog and cog.sizes else None,
+    })
+
+
+@api_bp.route("/api/backup")
+@login_required
+async def get_backup():
+    cog = current_app.bot_client.get_cog("Backup")
+    return jsonify({
+        "enabled": current_app.bot_config.get("backup.enabled", True),
+        "last_report": cog.last_report if cog else None,
+    })
+
+
+@api_bp.route("/api/detectors")
+@login_required
+async def get_detectors():
+    cog = current_app.bot_client.get_cog("OnMessage")
+    if not cog:
+        return jsonify({"detectors": [], "executor": None})
+    return jsonify({"detectors": cog.pipeline.report(), "executor": cog.executor.report()})
+
+
 # ── Bot Status ────────────────────────────────────────────
 
 @api_bp.route("/api/bot/status")
@@ -330,6 +814,7 @@ async def bot_status():
     minutes, seconds = divmod(remainder, 60)
 
     guild = bot.guilds[0] if bot.guilds else None
+    logger = current_app.bot_logger
     return jsonify({
         "online": bot.is_ready(),
         "uptime": f"{hours}h {minutes}m {seconds}s",
@@ -338,4 +823,5 @@ async def bot_status():
         "member_count": guild.member_count if guild else 0,
         "online_members": sum(1 for m in guild.members if not m.bot and m.status != discord.Status.offline) if guild else 0,
         "latency_ms": round(bot.latency * 1000, 1),
+        "logger": logger.metrics() if logger else None,
     })
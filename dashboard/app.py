@@ -7,9 +7,10 @@ from quart import Quart, render_template
 
 from dashboard.auth import auth_bp
 from dashboard.api import api_bp
+from dashboard.cache import ResponseCache
 
 
-def create_app(config, db, bot_client):
+def create_app(config, db, bot_client, logger=None, read_pool=None, archive=None):
     app = Quart(__name__, template_folder="templates")
     secret = os.getenv("DASHBOARD_SECRET")
     if not secret:
@@ -18,10 +19,19 @@ def create_app(config, db, bot_client):
     app.secret_key = secret
     app.permanent_session_lifetime = timedelta(days=7)
 
-    # Make config, db, and bot accessible to API routes
+    # Make config, db, bot, and logger accessible to API routes.
+    # Routes read through db_pool when given, so they never queue behind log writes,
+    # and fall through to the archive for rows retention has moved out of the db.
     app.bot_config = config
     app.db = db
+    app.db_pool = read_pool
     app.bot_client = bot_client
+    app.bot_logger = logger
+    app.archive = archive
+    # Rendered GET responses, keyed on the config/logger version they were built from
+    app.response_cache = ResponseCache()
+    # (rollup version, query rows) behind /api/stats, so chat traffic only re-merges counters
+    app.stats_snapshot = None
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(api_bp)
@@ -0,0 +1,87 @@
+"""Versioned response cache for dashboard GET endpoints: strong ETags, 304s and gzip."""
+
+import gzip
+import hashlib
+from collections import OrderedDict
+from functools import wraps
+
+from quart import Response, current_app, request
+
+CACHE_MAX_ENTRIES = 256
+# Bodies smaller than this aren't worth a gzip header
+GZIP_MIN_BYTES = 1024
+
+
+class ResponseCache:
+    """
+    LRU of rendered JSON bodies keyed on (path, query string, data version).
+
+    A key only ever maps to one body: when the data changes its version moves
+    on, the next request renders a new entry and the stale one ages out.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # key -> (etag, body, gzipped body or None)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, body: bytes):
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        entry = (etag, body, gzipped)
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+
+def _respond(etag: str, body: bytes, gzipped: bytes | None) -> Response:
+    # Strong ETags differ per content coding, so the gzipped body gets its own
+    use_gzip = gzipped is not None and request.accept_encodings["gzip"] > 0
+    tag = f"{etag}-gz" if use_gzip else etag
+    headers = {"ETag": f'"{tag}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if request.if_none_match.contains(tag):
+        return Response(b"", status=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        body = gzipped
+    return Response(body, content_type="application/json", headers=headers)
+
+
+def cached(version):
+    """
+    Serve a JSON GET endpoint from the response cache until version() changes.
+
+    version() runs inside the request and returns anything hashable that moves
+    whenever the endpoint's output would (a config or logger counter, plus the
+    day for date-relative queries); returning None skips the cache. A request
+    whose If-None-Match matches gets a 304 without the endpoint running, and
+    clients that accept gzip get the body compressed once, at render time.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = version()
+            if token is None:
+                return await func(*args, **kwargs)
+            cache = current_app.response_cache
+            key = (request.path, request.query_string, token)
+            entry = cache.get(key)
+            if entry is None:
+                response = await current_app.make_response(await func(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = cache.put(key, await response.get_data())
+            return _respond(*entry)
+        return wrapper
+    return decorator
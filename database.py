@@ -1,5 +1,11 @@
 """SQLite database module for logs and stats only."""
 
+import os
+import re
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
 import aiosqlite
 
 CREATE_TABLES_SQL = """
@@ -34,6 +40,430 @@ CREATE TABLE IF NOT EXISTS stats (
 );
 """
 
+# Indexes matching the filters, orderings and groupings in dashboard/api.py.
+# Single-column indexes keep rowid order within a key, so
+# "WHERE troll_type = ? ORDER BY id DESC LIMIT ?" needs no sort step.
+CREATE_INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS idx_troll_log_type ON troll_log (troll_type);
+CREATE INDEX IF NOT EXISTS idx_troll_log_target ON troll_log (target_user_id);
+CREATE INDEX IF NOT EXISTS idx_troll_log_timestamp ON troll_log (timestamp);
+CREATE INDEX IF NOT EXISTS idx_activity_log_type ON activity_log (event_type);
+CREATE INDEX IF NOT EXISTS idx_activity_log_timestamp ON activity_log (timestamp);
+"""
+
+# Rollups maintained by BotLogger in the same transaction as each log insert,
+# so /api/stats reads a few small tables instead of aggregating the full logs.
+CREATE_ROLLUPS_SQL = """
+CREATE TABLE IF NOT EXISTS troll_daily (
+    day TEXT NOT NULL,
+    troll_type TEXT NOT NULL,
+    troll_name TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, troll_type)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS troll_targets (
+    target_user_id TEXT PRIMARY KEY,
+    target_user_name TEXT,
+    count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS activity_hourly (
+    day TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, hour)
+) WITHOUT ROWID;
+"""
+
+# Africa/Nairobi (EAT) is UTC+3 all year (no DST), so day/hour buckets are a fixed
+# shift of the epoch. SQL uses the same shift as the '+3 hours' modifier.
+EAT_OFFSET = timedelta(hours=3)
+
+# Initial rollup fill (migration 3, UTC buckets). Superseded by later backfills.
+_BACKFILL_ROLLUPS_V3_SQL = """
+DELETE FROM troll_daily;
+DELETE FROM troll_targets;
+DELETE FROM activity_hourly;
+
+INSERT INTO troll_daily (day, troll_type, troll_name, count)
+SELECT DATE(timestamp), troll_type, MAX(troll_name), COUNT(*)
+FROM troll_log GROUP BY DATE(timestamp), troll_type;
+
+INSERT INTO troll_targets (target_user_id, target_user_name, count)
+SELECT target_user_id, target_user_name, cnt FROM (
+    -- bare column with MAX(id): the display name from the newest row
+    SELECT target_user_id, target_user_name, MAX(id), COUNT(*) AS cnt
+    FROM troll_log WHERE target_user_id IS NOT NULL GROUP BY target_user_id
+);
+
+INSERT INTO activity_hourly (day, hour, count)
+SELECT DATE(timestamp), CAST(strftime('%H', timestamp) AS INTEGER), COUNT(*)
+FROM activity_log GROUP BY 1, 2;
+"""
+
+# Epoch-millisecond timestamps: range filters and bucketing on an indexed integer
+# instead of parsing ISO text per row. The ts indexes replace the timestamp ones.
+ADD_EPOCH_TS_SQL = """
+ALTER TABLE troll_log ADD COLUMN ts INTEGER;
+ALTER TABLE activity_log ADD COLUMN ts INTEGER;
+UPDATE troll_log SET ts = CAST(ROUND((julianday(timestamp) - 2440587.5) * 86400000) AS INTEGER);
+UPDATE activity_log SET ts = CAST(ROUND((julianday(timestamp) - 2440587.5) * 86400000) AS INTEGER);
+DROP INDEX IF EXISTS idx_troll_log_timestamp;
+DROP INDEX IF EXISTS idx_activity_log_timestamp;
+CREATE INDEX IF NOT EXISTS idx_troll_log_ts ON troll_log (ts);
+CREATE INDEX IF NOT EXISTS idx_activity_log_ts ON activity_log (ts);
+"""
+
+# Rollups rebucketed to EAT (migration 6). Days that still have raw rows are rebuilt;
+# older days were compacted by the retention policy and keep their counts.
+_BACKFILL_ROLLUPS_V6_SQL = """
+DELETE FROM troll_daily WHERE day >= (SELECT DATE(MIN(ts) / 1000, 'unixepoch', '+3 hours') FROM troll_log);
+INSERT INTO troll_daily (day, troll_type, troll_name, count)
+SELECT day, troll_type, troll_name, cnt FROM (
+    -- bare column with MAX(id): the name from the newest row
+    SELECT DATE(ts / 1000, 'unixepoch', '+3 hours') AS day, troll_type, troll_name, MAX(id), COUNT(*) AS cnt
+    FROM troll_log GROUP BY 1, 2
+) WHERE true
+ON CONFLICT(day, troll_type) DO UPDATE SET count = count + excluded.count, troll_name = excluded.troll_name;
+
+UPDATE troll_targets SET count = (
+    SELECT COALESCE(SUM(count), 0) FROM troll_log_daily d WHERE d.target_user_id = troll_targets.target_user_id
+);
+INSERT INTO troll_targets (target_user_id, target_user_name, count)
+SELECT target_user_id, target_user_name, cnt FROM (
+    SELECT target_user_id, target_user_name, MAX(id), COUNT(*) AS cnt
+    FROM troll_log WHERE target_user_id IS NOT NULL GROUP BY target_user_id
+) WHERE true
+ON CONFLICT(target_user_id) DO UPDATE SET count = count + excluded.count, target_user_name = excluded.target_user_name;
+DELETE FROM troll_targets WHERE count = 0;
+
+DELETE FROM activity_hourly WHERE day >= (SELECT DATE(MIN(ts) / 1000, 'unixepoch', '+3 hours') FROM activity_log);
+INSERT INTO activity_hourly (day, hour, count)
+SELECT DATE(ts / 1000, 'unixepoch', '+3 hours'), CAST(strftime('%H', ts / 1000, 'unixepoch', '+3 hours') AS INTEGER), COUNT(*)
+FROM activity_log WHERE true GROUP BY 1, 2
+ON CONFLICT(day, hour) DO UPDATE SET count = count + excluded.count;
+"""
+
+# Daily aggregates of log rows removed by the retention policy (cogs/retention.py).
+# NULL ids are stored as '' so they can be part of the primary key.
+CREATE_COMPACTED_SQL = """
+CREATE TABLE IF NOT EXISTS troll_log_daily (
+    day TEXT NOT NULL,
+    troll_type TEXT NOT NULL,
+    target_user_id TEXT NOT NULL DEFAULT '',
+    channel_id TEXT NOT NULL DEFAULT '',
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, troll_type, target_user_id, channel_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS activity_log_daily (
+    day TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    channel_id TEXT NOT NULL DEFAULT '',
+    user_id TEXT NOT NULL DEFAULT '',
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, event_type, channel_id, user_id)
+) WITHOUT ROWID;
+"""
+
+
+# Interned dimension tables. users/channels are keyed by the Discord snowflake and
+# hold the latest display name; troll types get a small surrogate id. Log and
+# rollup rows are rebuilt to reference them, so a row is a handful of integers and
+# grouping/joining happens on integer keys. BotLogger caches these tables in memory.
+NORMALIZE_SQL = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS channels (
+    id INTEGER PRIMARY KEY,
+    name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS troll_types (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL
+);
+
+-- Dimensions, newest name first (bare column with MAX())
+INSERT INTO users (id, name)
+SELECT uid, name FROM (
+    SELECT CAST(uid AS INTEGER) AS uid, name, MAX(ts) FROM (
+        SELECT target_user_id AS uid, target_user_name AS name, ts FROM troll_log WHERE target_user_id IS NOT NULL
+        UNION ALL
+        SELECT user_id, user_name, ts FROM activity_log WHERE user_id IS NOT NULL
+    ) GROUP BY 1
+);
+INSERT OR IGNORE INTO users (id, name) SELECT CAST(target_user_id AS INTEGER), target_user_name FROM troll_targets;
+INSERT OR IGNORE INTO users (id) SELECT DISTINCT CAST(target_user_id AS INTEGER) FROM troll_log_daily WHERE target_user_id != '';
+INSERT OR IGNORE INTO users (id) SELECT DISTINCT CAST(user_id AS INTEGER) FROM activity_log_daily WHERE user_id != '';
+
+INSERT INTO channels (id, name)
+SELECT cid, name FROM (
+    SELECT CAST(cid AS INTEGER) AS cid, name, MAX(ts) FROM (
+        SELECT channel_id AS cid, channel_name AS name, ts FROM troll_log WHERE channel_id IS NOT NULL
+        UNION ALL
+        SELECT channel_id, channel_name, ts FROM activity_log WHERE channel_id IS NOT NULL
+    ) GROUP BY 1
+);
+INSERT OR IGNORE INTO channels (id) SELECT DISTINCT CAST(channel_id AS INTEGER) FROM troll_log_daily WHERE channel_id != '';
+INSERT OR IGNORE INTO channels (id) SELECT DISTINCT CAST(channel_id AS INTEGER) FROM activity_log_daily WHERE channel_id != '';
+
+INSERT INTO troll_types (type, name)
+SELECT troll_type, troll_name FROM (SELECT troll_type, troll_name, MAX(ts) FROM troll_log GROUP BY troll_type);
+INSERT OR IGNORE INTO troll_types (type, name)
+SELECT troll_type, troll_name FROM (SELECT troll_type, troll_name, MAX(day) FROM troll_daily GROUP BY troll_type);
+INSERT OR IGNORE INTO troll_types (type, name) SELECT DISTINCT troll_type, troll_type FROM troll_log_daily;
+
+-- Logs
+CREATE TABLE troll_log_v7 (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    troll_type_id INTEGER NOT NULL,
+    target_user_id INTEGER,
+    channel_id INTEGER,
+    details TEXT
+);
+INSERT INTO troll_log_v7 (id, ts, troll_type_id, target_user_id, channel_id, details)
+SELECT l.id, COALESCE(l.ts, 0), t.id, CAST(l.target_user_id AS INTEGER), CAST(l.channel_id AS INTEGER), l.details
+FROM troll_log l JOIN troll_types t ON t.type = l.troll_type;
+DROP TABLE troll_log;
+ALTER TABLE troll_log_v7 RENAME TO troll_log;
+CREATE INDEX idx_troll_log_type ON troll_log (troll_type_id);
+CREATE INDEX idx_troll_log_target ON troll_log (target_user_id);
+CREATE INDEX idx_troll_log_ts ON troll_log (ts);
+
+CREATE TABLE activity_log_v7 (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    event_type TEXT NOT NULL,
+    description TEXT NOT NULL,
+    channel_id INTEGER,
+    user_id INTEGER,
+    metadata TEXT
+);
+INSERT INTO activity_log_v7 (id, ts, event_type, description, channel_id, user_id, metadata)
+SELECT id, COALESCE(ts, 0), event_type, description, CAST(channel_id AS INTEGER), CAST(user_id AS INTEGER), metadata
+FROM activity_log;
+DROP TABLE activity_log;
+ALTER TABLE activity_log_v7 RENAME TO activity_log;
+CREATE INDEX idx_activity_log_type ON activity_log (event_type);
+CREATE INDEX idx_activity_log_ts ON activity_log (ts);
+
+-- Rollups
+CREATE TABLE troll_daily_v7 (
+    day TEXT NOT NULL,
+    troll_type_id INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, troll_type_id)
+) WITHOUT ROWID;
+INSERT INTO troll_daily_v7 (day, troll_type_id, count)
+SELECT d.day, t.id, d.count FROM troll_daily d JOIN troll_types t ON t.type = d.troll_type;
+DROP TABLE troll_daily;
+ALTER TABLE troll_daily_v7 RENAME TO troll_daily;
+
+CREATE TABLE troll_targets_v7 (
+    user_id INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+);
+INSERT INTO troll_targets_v7 (user_id, count) SELECT CAST(target_user_id AS INTEGER), count FROM troll_targets;
+DROP TABLE troll_targets;
+ALTER TABLE troll_targets_v7 RENAME TO troll_targets;
+
+-- Compacted logs ('' ids become 0)
+CREATE TABLE troll_log_daily_v7 (
+    day TEXT NOT NULL,
+    troll_type_id INTEGER NOT NULL,
+    target_user_id INTEGER NOT NULL DEFAULT 0,
+    channel_id INTEGER NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, troll_type_id, target_user_id, channel_id)
+) WITHOUT ROWID;
+INSERT INTO troll_log_daily_v7 (day, troll_type_id, target_user_id, channel_id, count)
+SELECT d.day, t.id, CAST(d.target_user_id AS INTEGER), CAST(d.channel_id AS INTEGER), d.count
+FROM troll_log_daily d JOIN troll_types t ON t.type = d.troll_type;
+DROP TABLE troll_log_daily;
+ALTER TABLE troll_log_daily_v7 RENAME TO troll_log_daily;
+
+CREATE TABLE activity_log_daily_v7 (
+    day TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    channel_id INTEGER NOT NULL DEFAULT 0,
+    user_id INTEGER NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, event_type, channel_id, user_id)
+) WITHOUT ROWID;
+INSERT INTO activity_log_daily_v7 (day, event_type, channel_id, user_id, count)
+SELECT day, event_type, CAST(channel_id AS INTEGER), CAST(user_id AS INTEGER), count FROM activity_log_daily;
+DROP TABLE activity_log_daily;
+ALTER TABLE activity_log_daily_v7 RENAME TO activity_log_daily;
+"""
+
+# Rebuild the rollups from the raw logs in EAT buckets (`backfill-rollups`). Days that
+# still have raw rows are rebuilt; older days were compacted by the retention policy,
+# have no raw rows left, and keep their counts. Targets add up raw and compacted rows.
+BACKFILL_ROLLUPS_SQL = """
+DELETE FROM troll_daily WHERE day >= (SELECT DATE(MIN(ts) / 1000, 'unixepoch', '+3 hours') FROM troll_log);
+INSERT INTO troll_daily (day, troll_type_id, count)
+SELECT DATE(ts / 1000, 'unixepoch', '+3 hours'), troll_type_id, COUNT(*) FROM troll_log WHERE true GROUP BY 1, 2
+ON CONFLICT(day, troll_type_id) DO UPDATE SET count = count + excluded.count;
+
+DELETE FROM troll_targets;
+INSERT INTO troll_targets (user_id, count)
+SELECT user_id, SUM(cnt) FROM (
+    SELECT target_user_id AS user_id, COUNT(*) AS cnt FROM troll_log WHERE target_user_id IS NOT NULL GROUP BY 1
+    UNION ALL
+    SELECT target_user_id, SUM(count) FROM troll_log_daily WHERE target_user_id != 0 GROUP BY 1
+) GROUP BY user_id;
+
+DELETE FROM activity_hourly WHERE day >= (SELECT DATE(MIN(ts) / 1000, 'unixepoch', '+3 hours') FROM activity_log);
+INSERT INTO activity_hourly (day, hour, count)
+SELECT DATE(ts / 1000, 'unixepoch', '+3 hours'), CAST(strftime('%H', ts / 1000, 'unixepoch', '+3 hours') AS INTEGER), COUNT(*)
+FROM activity_log WHERE true GROUP BY 1, 2
+ON CONFLICT(day, hour) DO UPDATE SET count = count + excluded.count;
+"""
+
+# Full-text indexes over the logs (rowid = log id), kept in sync by triggers. Names
+# are indexed as they were when the row was written, so old names stay searchable.
+CREATE_FTS_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS troll_log_fts USING fts5(
+    troll, target, channel, details,
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS activity_log_fts USING fts5(
+    event, description, user, channel, metadata,
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS troll_log_fts_insert AFTER INSERT ON troll_log BEGIN
+    INSERT INTO troll_log_fts (rowid, troll, target, channel, details) VALUES (
+        new.id,
+        (SELECT type || ' ' || name FROM troll_types WHERE id = new.troll_type_id),
+        (SELECT name FROM users WHERE id = new.target_user_id),
+        (SELECT name FROM channels WHERE id = new.channel_id),
+        new.details
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS troll_log_fts_delete AFTER DELETE ON troll_log BEGIN
+    DELETE FROM troll_log_fts WHERE rowid = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS activity_log_fts_insert AFTER INSERT ON activity_log BEGIN
+    INSERT INTO activity_log_fts (rowid, event, description, user, channel, metadata) VALUES (
+        new.id,
+        new.event_type,
+        new.description,
+        (SELECT name FROM users WHERE id = new.user_id),
+        (SELECT name FROM channels WHERE id = new.channel_id),
+        new.metadata
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS activity_log_fts_delete AFTER DELETE ON activity_log BEGIN
+    DELETE FROM activity_log_fts WHERE rowid = old.id;
+END;
+
+INSERT INTO troll_log_fts (rowid, troll, target, channel, details)
+SELECT l.id, t.type || ' ' || t.name, u.name, c.name, l.details
+FROM troll_log l JOIN troll_types t ON t.id = l.troll_type_id
+LEFT JOIN users u ON u.id = l.target_user_id LEFT JOIN channels c ON c.id = l.channel_id;
+
+INSERT INTO activity_log_fts (rowid, event, description, user, channel, metadata)
+SELECT l.id, l.event_type, l.description, u.name, c.name, l.metadata
+FROM activity_log l LEFT JOIN users u ON u.id = l.user_id LEFT JOIN channels c ON c.id = l.channel_id;
+"""
+
+# Written by BotLogger alongside each log batch
+TROLL_DAILY_UPSERT_SQL = (
+    "INSERT INTO troll_daily (day, troll_type_id, count) VALUES (?, ?, ?) "
+    "ON CONFLICT(day, troll_type_id) DO UPDATE SET count = count + excluded.count"
+)
+TROLL_TARGETS_UPSERT_SQL = (
+    "INSERT INTO troll_targets (user_id, count) VALUES (?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET count = count + excluded.count"
+)
+ACTIVITY_HOURLY_UPSERT_SQL = (
+    "INSERT INTO activity_hourly (day, hour, count) VALUES (?, ?, ?) "
+    "ON CONFLICT(day, hour) DO UPDATE SET count = count + excluded.count"
+)
+USER_UPSERT_SQL = (
+    "INSERT INTO users (id, name) VALUES (?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET name = COALESCE(excluded.name, name)"
+)
+CHANNEL_UPSERT_SQL = (
+    "INSERT INTO channels (id, name) VALUES (?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET name = COALESCE(excluded.name, name)"
+)
+TROLL_TYPE_UPSERT_SQL = (
+    "INSERT INTO troll_types (type, name) VALUES (?, ?) "
+    "ON CONFLICT(type) DO UPDATE SET name = excluded.name RETURNING id"
+)
+
+# Log rows with their dimension names resolved: (columns, joins) per table. The
+# dashboard pages and exports in this shape and the archive stores it, so
+# columns 0-2 are always id, ts and type.
+LOG_COLUMNS = {
+    "troll_log": (
+        "troll_log.id, troll_log.ts, t.type, t.name, troll_log.target_user_id, u.name, "
+        "troll_log.channel_id, c.name, troll_log.details",
+        "JOIN troll_types t ON t.id = troll_type_id "
+        "LEFT JOIN users u ON u.id = target_user_id "
+        "LEFT JOIN channels c ON c.id = channel_id",
+    ),
+    "activity_log": (
+        "activity_log.id, activity_log.ts, activity_log.event_type, activity_log.description, "
+        "activity_log.channel_id, c.name, activity_log.user_id, u.name, activity_log.metadata",
+        "LEFT JOIN channels c ON c.id = channel_id LEFT JOIN users u ON u.id = user_id",
+    ),
+}
+
+
+async def _check_incremental_vacuum(db: aiosqlite.Connection):
+    """Point out databases that can't vacuum incrementally yet.
+
+    New databases get auto_vacuum=INCREMENTAL in init_db. Switching an existing
+    one takes a full VACUUM that rewrites the file, so it's never done on boot:
+    run `python database.py enable-incremental-vacuum` with the bot stopped.
+    """
+    async with db.execute("PRAGMA auto_vacuum") as cur:
+        if (await cur.fetchone())[0] != 2:
+            print("[database] auto_vacuum is not INCREMENTAL; run `python database.py enable-incremental-vacuum` "
+                  "with the bot stopped so retention can return freed pages to the OS")
+
+
+async def enable_incremental_vacuum(db: aiosqlite.Connection) -> bool:
+    """Switch to auto_vacuum=INCREMENTAL with a full VACUUM (rewrites the file). False if already on."""
+    async with db.execute("PRAGMA auto_vacuum") as cur:
+        if (await cur.fetchone())[0] == 2:
+            return False
+    await db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    await db.execute("VACUUM")
+    return True
+
+
+# Schema migrations, applied in order. The database's PRAGMA user_version is the
+# number of migrations already applied. Only ever append to this list.
+# Entries are SQL scripts (run in one transaction) or async callables for steps
+# that can't run inside a transaction.
+MIGRATIONS = [
+    CREATE_TABLES_SQL,   # 1: base tables
+    CREATE_INDEXES_SQL,  # 2: hot-path indexes for the dashboard
+    CREATE_ROLLUPS_SQL + _BACKFILL_ROLLUPS_V3_SQL,  # 3: stats rollups, backfilled from existing logs
+    CREATE_COMPACTED_SQL,  # 4: daily aggregates for compacted logs
+    _check_incremental_vacuum,  # 5: incremental vacuum for the retention policy (switched by the CLI)
+    ADD_EPOCH_TS_SQL + _BACKFILL_ROLLUPS_V6_SQL,  # 6: epoch-ms ts column, rollups rebucketed to EAT
+    NORMALIZE_SQL,  # 7: user/channel/troll type dimensions, integer-only log rows
+    CREATE_FTS_SQL,  # 8: full-text search over the logs
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
 DEFAULT_STATS = [
     "messages_processed",
     "trolls_triggered",
@@ -60,16 +490,140 @@ DEFAULT_STATS = [
 ]
 
 
-async def init_db(db_path: str = "bot.db") -> aiosqlite.Connection:
-    """Open database, create tables, seed default stats, return connection."""
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    """Number of migrations applied to this database."""
+    async with db.execute("PRAGMA user_version") as cur:
+        return (await cur.fetchone())[0]
+
+
+async def migrate(db: aiosqlite.Connection) -> int:
+    """Apply pending migrations, each in its own transaction. Returns the new version."""
+    version = await get_schema_version(db)
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        step = MIGRATIONS[target - 1]
+        try:
+            if callable(step):
+                await step(db)
+                await db.execute(f"PRAGMA user_version = {target}")
+                await db.commit()
+            else:
+                await db.executescript(f"BEGIN;\n{step}\nPRAGMA user_version = {target};\nCOMMIT;")
+        except Exception:
+            await db.rollback()
+            raise
+        print(f"[database] Migrated schema to version {target}")
+    return max(version, SCHEMA_VERSION)
+
+
+async def backfill_rollups(db: aiosqlite.Connection):
+    """Rebuild the stats rollup tables from troll_log/activity_log in one transaction (EAT buckets)."""
+    try:
+        await db.executescript(f"BEGIN;\n{BACKFILL_ROLLUPS_SQL}\nCOMMIT;")
+    except Exception:
+        await db.rollback()
+        raise
+
+
+async def database_path(db: aiosqlite.Connection) -> str:
+    """Filename of the connection's main database ("" for in-memory)."""
+    async with db.execute("PRAGMA database_list") as cur:
+        return next((row[2] for row in await cur.fetchall() if row[1] == "main"), "")
+
+
+# Pages released per incremental_vacuum step (the write lock is dropped between steps)
+VACUUM_STEP_PAGES = 256
+
+
+async def incremental_vacuum(transaction, step_pages: int = VACUUM_STEP_PAGES) -> int:
+    """
+    Release free pages to the OS in small steps; returns bytes reclaimed.
+
+    `transaction` is BotLogger.transaction: each step borrows the writer
+    connection briefly, so log flushes get in between steps.
+    """
+    reclaimed = 0
+    while True:
+        async with transaction() as db:
+            async with db.execute("PRAGMA page_size") as cur:
+                page_size = (await cur.fetchone())[0]
+            async with db.execute("PRAGMA freelist_count") as cur:
+                before = (await cur.fetchone())[0]
+            if not before:
+                return reclaimed
+            # executescript runs the pragma to completion (execute() frees one page per step)
+            await db.executescript(f"PRAGMA incremental_vacuum({step_pages});")
+            async with db.execute("PRAGMA freelist_count") as cur:
+                after = (await cur.fetchone())[0]
+        reclaimed += (before - after) * page_size
+        if after >= before:
+            return reclaimed  # auto_vacuum is off, nothing more will be freed
+        await asyncio.sleep(0)
+
+
+async def explain_query_plan(db: aiosqlite.Connection, sql: str, params=()) -> list[str]:
+    """Return the EXPLAIN QUERY PLAN detail lines for a query."""
+    async with db.execute(f"EXPLAIN QUERY PLAN {sql}", params) as cur:
+        return [row[3] for row in await cur.fetchall()]
+
+
+_FULL_SCAN_RE = re.compile(r"^SCAN \w+$")
+
+
+def plan_uses_index(plan: list[str]) -> bool:
+    """True if no step of the plan is a bare full-table scan."""
+    return bool(plan) and not any(_FULL_SCAN_RE.match(step) for step in plan)
+
+
+# Connection PRAGMA profiles, picked with $DB_PROFILE or the database.profile setting.
+# All of them run in WAL mode. synchronous=NORMAL can't corrupt the database, but a
+# power cut may lose the last few commits; OFF can lose more if the OS crashes.
+# Numbers are SQLite's units: cache_size < 0 is KiB, mmap_size is bytes, busy_timeout
+# ms, wal_autocheckpoint pages. `python benchmarks/bench_db_profiles.py` compares them.
+PRAGMA_PROFILES = {
+    "durable": {
+        "synchronous": "FULL", "cache_size": -8000, "mmap_size": 0,
+        "temp_store": "DEFAULT", "busy_timeout": 5000, "wal_autocheckpoint": 1000,
+    },
+    "balanced": {
+        "synchronous": "NORMAL", "cache_size": -32000, "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY", "busy_timeout": 5000, "wal_autocheckpoint": 1000,
+    },
+    "fast": {
+        "synchronous": "OFF", "cache_size": -64000, "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY", "busy_timeout": 10000, "wal_autocheckpoint": 4000,
+    },
+}
+DEFAULT_PROFILE = "balanced"
+
+# The subset that matters to read-only connections
+_READ_PRAGMAS = ("cache_size", "mmap_size", "temp_store", "busy_timeout")
+
+
+def resolve_profile(name: str | None = None) -> str:
+    """$DB_PROFILE, else `name`, else the default; unknown names fall back to the default."""
+    chosen = os.getenv("DB_PROFILE") or name or DEFAULT_PROFILE
+    if chosen not in PRAGMA_PROFILES:
+        print(f"[database] WARNING: unknown profile '{chosen}', using '{DEFAULT_PROFILE}'")
+        return DEFAULT_PROFILE
+    return chosen
+
+
+async def apply_profile(db: aiosqlite.Connection, profile: str, read_only: bool = False):
+    """Set a profile's PRAGMAs on a connection."""
+    for pragma, value in PRAGMA_PROFILES[profile].items():
+        if not read_only or pragma in _READ_PRAGMAS:
+            await db.execute(f"PRAGMA {pragma} = {value}")
+
+
+async def init_db(db_path: str = "bot.db", profile: str | None = None) -> aiosqlite.Connection:
+    """Open database, apply migrations, seed default stats, return connection."""
     db = await aiosqlite.connect(db_path)
+    if await get_schema_version(db) == 0:
+        # Only takes effect before the first table is created; existing files need the CLI switch
+        await db.execute("PRAGMA auto_vacuum=INCREMENTAL")
     await db.execute("PRAGMA journal_mode=WAL")
-
-    for statement in CREATE_TABLES_SQL.strip().split(";"):
-        statement = statement.strip()
-        if statement:
-            await db.execute(statement)
-    await db.commit()
+    await apply_profile(db, resolve_profile(profile))
+    await migrate(db)
 
     # Seed default stats
     now = "1970-01-01T00:00:00"
@@ -81,3 +635,80 @@ async def init_db(db_path: str = "bot.db") -> aiosqlite.Connection:
 
     await db.commit()
     return db
+
+
+class ReadPool:
+    """
+    A few read-only connections for the dashboard, separate from the writer.
+
+    In WAL mode readers never wait on the writer (and vice versa), and each
+    connection has its own worker thread, so independent queries run concurrently
+    instead of queueing behind log inserts on the single writer connection.
+    """
+
+    def __init__(self, db_path: str = "bot.db", size: int = 4, profile: str | None = None):
+        self._db_path = db_path
+        self._size = size
+        self._profile = resolve_profile(profile)
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._conns: list[aiosqlite.Connection] = []
+
+    async def open(self) -> "ReadPool":
+        for _ in range(self._size):
+            conn = await aiosqlite.connect(f"file:{self._db_path}?mode=ro", uri=True)
+            await conn.execute("PRAGMA query_only = 1")
+            await apply_profile(conn, self._profile, read_only=True)
+            self._conns.append(conn)
+            self._idle.put_nowait(conn)
+        return self
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a read connection, waiting if all are busy."""
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def close(self):
+        for conn in self._conns:
+            await conn.close()
+        self._conns.clear()
+
+
+async def open_read_pool(db_path: str = "bot.db", size: int = 4, profile: str | None = None) -> ReadPool:
+    """Open a pool of read-only connections (call after init_db has created the file)."""
+    return await ReadPool(db_path, size, profile).open()
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="bot.db maintenance commands")
+    parser.add_argument("command", choices=["migrate", "backfill-rollups", "enable-incremental-vacuum"])
+    parser.add_argument("--db", default="bot.db", help="path to the SQLite database")
+    args = parser.parse_args()
+
+    async def _main():
+        db = await init_db(args.db)
+        try:
+            if args.command == "backfill-rollups":
+                await backfill_rollups(db)
+                print("[database] Rollup tables rebuilt")
+            elif args.command == "enable-incremental-vacuum":
+                if await enable_incremental_vacuum(db):
+                    print("[database] auto_vacuum set to INCREMENTAL")
+                else:
+                    print("[database] auto_vacuum is already INCREMENTAL")
+            else:
+                print(f"[database] Schema at version {await get_schema_version(db)}")
+        finally:
+            await db.close()
+
+    asyncio.run(_main())
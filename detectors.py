@@ -0,0 +1,225 @@
+"""Table-driven message detectors: declarations, the pipeline that runs them, per-detector timing."""
+
+import asyncio
+import random
+import string
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable
+
+import bot as shared
+from matcher import get_matcher
+
+# Seconds a detector's response may take before it's abandoned
+DETECTOR_TIMEOUT_SEC = 10.0
+# Characters of a non-ASCII message scanned one by one for its features
+FEATURE_SCAN_CHARS = 1000
+
+_ASCII_UPPER = string.ascii_uppercase.encode("ascii")
+
+
+@dataclass(frozen=True, slots=True)
+class Detector:
+    """
+    One message detector.
+
+    match(ctx) returns a truthy value when the message qualifies: a dict is
+    passed on to respond() and logged as the troll's details. respond(ctx,
+    details) sends (or queues) the response and may return (troll_type,
+    troll_name) to log under instead of the detector's own, or False if it
+    didn't respond after all (nothing is logged). Settings come from the ConfigSnapshot
+    attribute named by `feature` (its `enabled`, and `chance` unless a chance
+    function is given).
+    """
+    name: str                  # troll_log type
+    label: str                 # troll_log name
+    feature: str               # ConfigSnapshot attribute with the feature's settings
+    match: Callable
+    respond: Callable
+    stat: str                  # stats key bumped when it fires
+    priority: int = 100        # lower runs first
+    group: str | None = None   # only the first detector to fire in a group responds
+    chance: Callable | None = None  # (ctx, settings) -> float
+    needs_content: bool = True
+    in_excluded: bool = False  # also runs in excluded channels
+    targets_author: bool = True
+    timeout: float = DETECTOR_TIMEOUT_SEC
+
+
+class MessageFeatures:
+    """
+    Text features of a message, each computed on first use and then kept.
+
+    ASCII messages (most of them) get their character counts from bytes
+    operations; for anything else the per-character scan stops after
+    FEATURE_SCAN_CHARS, so caps_ratio is measured on that prefix.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.length = len(text)
+
+    @cached_property
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def stripped(self) -> str:
+        """Lowercased, surrounding whitespace removed."""
+        return self.lower.strip()
+
+    @cached_property
+    def exclamations(self) -> int:
+        return self.text.count("!")
+
+    @cached_property
+    def caps_ratio(self) -> float:
+        """Uppercase letters over characters other than spaces."""
+        text = self.text
+        if text.isascii():
+            raw = text.encode("ascii")
+            upper = len(raw) - len(raw.translate(None, _ASCII_UPPER))
+            non_space = len(raw) - raw.count(b" ")
+        else:
+            text = text[:FEATURE_SCAN_CHARS]
+            upper = sum(1 for c in text if c.isupper())
+            non_space = len(text) - text.count(" ")
+        return upper / max(non_space, 1)
+
+    @cached_property
+    def phrases(self) -> frozenset:
+        """Phrase detectors that match (see matcher.DETECTORS)."""
+        return frozenset(get_matcher().scan(self.stripped)) if self.text else frozenset()
+
+
+class MessageContext:
+    """What detectors see of a message, computed once per message."""
+
+    __slots__ = ("message", "cog", "cfg", "excluded", "features", "now")
+
+    def __init__(self, message, cog, cfg, excluded: bool, features: MessageFeatures, now):
+        self.message = message
+        self.cog = cog
+        self.cfg = cfg
+        self.excluded = excluded
+        self.features = features
+        self.now = now
+
+
+class DetectorStats:
+    __slots__ = (
+        "runs", "responses", "fired", "errors", "timeouts", "match_ms", "max_match_ms", "respond_ms", "max_respond_ms",
+    )
+
+    def __init__(self):
+        self.runs = 0
+        self.responses = 0  # respond() calls, whatever their outcome
+        self.fired = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.match_ms = 0.0
+        self.max_match_ms = 0.0
+        self.respond_ms = 0.0
+        self.max_respond_ms = 0.0
+
+    def report(self) -> dict:
+        return {
+            "runs": self.runs,
+            "responses": self.responses,
+            "fired": self.fired,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "avg_match_us": round(self.match_ms * 1000 / self.runs, 1) if self.runs else 0.0,
+            "max_match_ms": round(self.max_match_ms, 3),
+            "avg_respond_ms": round(self.respond_ms / self.responses, 1) if self.responses else 0.0,
+            "max_respond_ms": round(self.max_respond_ms, 1),
+        }
+
+
+class DetectorPipeline:
+    """
+    Runs detectors in priority order, timing each one and isolating its failures.
+
+    A detector that raises is counted and skipped; one whose response times out
+    is abandoned. Either way the message carries on to the next detector. Once a
+    detector in a group responds (or fails partway through responding), the rest
+    of that group is skipped.
+    """
+
+    def __init__(self, detectors):
+        self.detectors = sorted(detectors, key=lambda d: d.priority)
+        self.stats = {d.name: DetectorStats() for d in self.detectors}
+
+    async def run(self, ctx: MessageContext, rng=random) -> list:
+        """Run every applicable detector on a message; returns the names of those that fired."""
+        fired = []
+        done_groups = set()
+        has_content = ctx.features.length > 0
+        for d in self.detectors:
+            if d.group in done_groups:
+                continue
+            settings = getattr(ctx.cfg, d.feature)
+            if not settings.enabled or (d.needs_content and not has_content) or (ctx.excluded and not d.in_excluded):
+                continue
+            stats = self.stats[d.name]
+            stats.runs += 1
+            started = time.perf_counter()
+            try:
+                details = d.match(ctx)
+                chance = d.chance(ctx, settings) if d.chance else settings.chance
+                hit = bool(details) and rng.random() < chance
+            except Exception as e:
+                stats.errors += 1
+                print(f"[detectors] {d.name} match failed: {e}")
+                continue
+            finally:
+                elapsed = (time.perf_counter() - started) * 1000
+                stats.match_ms += elapsed
+                stats.max_match_ms = max(stats.max_match_ms, elapsed)
+            if not hit:
+                continue
+
+            if d.group is not None:
+                done_groups.add(d.group)
+            started = time.perf_counter()
+            try:
+                log_as = await asyncio.wait_for(d.respond(ctx, details), timeout=d.timeout)
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                print(f"[detectors] {d.name} response timed out after {d.timeout}s")
+                continue
+            except Exception as e:
+                stats.errors += 1
+                print(f"[detectors] {d.name} response failed: {e}")
+                continue
+            finally:
+                elapsed = (time.perf_counter() - started) * 1000
+                stats.responses += 1
+                stats.respond_ms += elapsed
+                stats.max_respond_ms = max(stats.max_respond_ms, elapsed)
+            if log_as is False:
+                continue
+            stats.fired += 1
+            fired.append(d.name)
+
+            troll_type, troll_name = log_as or (d.name, d.label)
+            try:
+                await shared.logger.log_troll(
+                    troll_type, troll_name,
+                    target_user=ctx.message.author if d.targets_author else None,
+                    channel=ctx.message.channel,
+                    details=details if isinstance(details, dict) else None,
+                )
+                await shared.logger.increment_stat(d.stat)
+            except Exception:
+                pass
+        return fired
+
+    def report(self) -> list:
+        """Per-detector counters and timings, in run order (for the dashboard)."""
+        return [
+            {"name": d.name, "label": d.label, "priority": d.priority, "group": d.group,
+             **self.stats[d.name].report()}
+            for d in self.detectors
+        ]
@@ -0,0 +1,218 @@
+"""Bounded executor for slow responses (reaction sequences, delayed sends, typing) so handlers never wait on them."""
+
+import asyncio
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+# Plans running at once, across all channels
+MAX_WORKERS = 4
+# Plans running at once in one channel
+MAX_PER_KEY = 1
+# Plans waiting to run; submissions beyond this are dropped
+MAX_QUEUE = 100
+# Seconds a plan may run before it's abandoned
+PLAN_TIMEOUT_SEC = 30.0
+
+
+# --- Steps ---
+
+@dataclass(frozen=True, slots=True)
+class React:
+    """Add reactions in order, `gap` seconds apart."""
+    message: object
+    emojis: tuple
+    gap: float = 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class Send:
+    channel: object
+    text: str
+    delay: float = 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class Reply:
+    message: object
+    text: str
+    delay: float = 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class Typing:
+    """Show the typing indicator for `seconds`."""
+    channel: object
+    seconds: float
+
+
+@dataclass(slots=True)
+class Plan:
+    name: str
+    steps: tuple
+    key: object = None
+    submitted: float = field(default_factory=time.monotonic)
+
+
+async def run_step(step):
+    if isinstance(step, React):
+        for i, emoji in enumerate(step.emojis):
+            if i and step.gap:
+                await asyncio.sleep(step.gap)
+            await step.message.add_reaction(emoji)
+    elif isinstance(step, Typing):
+        async with step.channel.typing():
+            await asyncio.sleep(step.seconds)
+    elif isinstance(step, Send):
+        if step.delay:
+            await asyncio.sleep(step.delay)
+        await step.channel.send(step.text)
+    elif isinstance(step, Reply):
+        if step.delay:
+            await asyncio.sleep(step.delay)
+        await step.message.reply(step.text, mention_author=False)
+    else:
+        raise TypeError(f"Unknown step {step!r}")
+
+
+class ActionExecutor:
+    """
+    Runs response plans (sequences of steps) in the background, a bounded number at a time.
+
+    submit() queues a plan and returns at once. Each running plan is its own
+    task; at most `max_workers` run at once, and at most `per_key` for one key
+    (a channel ID), so one busy channel can't take every slot. A finished plan
+    starts the next runnable one in the queue. A full queue drops new plans,
+    and a plan running past `timeout` is abandoned. Counters and queue depth
+    are kept for the dashboard.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, per_key: int = MAX_PER_KEY,
+                 max_queue: int = MAX_QUEUE, timeout: float = PLAN_TIMEOUT_SEC):
+        self.max_workers = max_workers
+        self.per_key = per_key
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._queue = deque()
+        self._running = {}          # task -> Plan
+        self._running_keys = Counter()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closed = False
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._wait_ms = 0.0
+        self._started = 0
+
+    def submit(self, name: str, steps, key=None) -> bool:
+        """Queue a plan; False if it was dropped (queue full or executor closed). Empty plans are skipped."""
+        if self._closed or len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return False
+        steps = tuple(steps)
+        if not steps:
+            return True
+        self._queue.append(Plan(name, steps, key))
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._idle.clear()
+        self._pump()
+        return True
+
+    def _take(self):
+        """Remove and return the oldest queued plan whose key has a free slot."""
+        for i, plan in enumerate(self._queue):
+            if self._running_keys[plan.key] < self.per_key:
+                del self._queue[i]
+                return plan
+        return None
+
+    def _pump(self):
+        while len(self._running) < self.max_workers:
+            plan = self._take()
+            if plan is None:
+                break
+            self._wait_ms += (time.monotonic() - plan.submitted) * 1000
+            self._started += 1
+            task = asyncio.get_running_loop().create_task(self._run(plan))
+            self._running[task] = plan
+            self._running_keys[plan.key] += 1
+            task.add_done_callback(self._finished)
+        if not self._running and not self._queue:
+            self._idle.set()
+
+    async def _run(self, plan: Plan) -> bool:
+        async def steps():
+            for step in plan.steps:
+                await run_step(step)
+        try:
+            await asyncio.wait_for(steps(), timeout=self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            print(f"[executor] {plan.name} timed out after {self.timeout}s")
+            return False
+
+    def _finished(self, task):
+        plan = self._running.pop(task)
+        self._running_keys[plan.key] -= 1
+        if self._running_keys[plan.key] <= 0:
+            del self._running_keys[plan.key]
+        if task.cancelled():
+            self.cancelled += 1
+        elif task.exception() is not None:
+            self.failed += 1
+            print(f"[executor] {plan.name} failed: {task.exception()}")
+        elif task.result():
+            self.completed += 1
+        if not self._closed:
+            self._pump()
+        elif not self._running:
+            self._idle.set()
+
+    def cancel(self, key) -> int:
+        """Drop queued plans and cancel running ones for a key; returns how many."""
+        queued = [p for p in self._queue if p.key == key]
+        for plan in queued:
+            self._queue.remove(plan)
+        self.cancelled += len(queued)
+        running = [t for t, p in self._running.items() if p.key == key]
+        for task in running:
+            task.cancel()
+        if not self._running and not self._queue:
+            self._idle.set()
+        return len(queued) + len(running)
+
+    async def join(self):
+        """Wait until every queued and running plan is done."""
+        await self._idle.wait()
+
+    async def close(self):
+        """Stop taking plans, drop the queue and cancel what's running."""
+        self._closed = True
+        self.cancelled += len(self._queue)
+        self._queue.clear()
+        tasks = list(self._running)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._idle.set()
+
+    def report(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "running": len(self._running),
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "dropped": self.dropped,
+            "avg_wait_ms": round(self._wait_ms / self._started, 1) if self._started else 0.0,
+        }
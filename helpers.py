@@ -1,5 +1,6 @@
 """Utility functions shared across cogs."""
 
+import asyncio
 import random
 from datetime import datetime
 
@@ -9,13 +10,13 @@ import bot as shared
 
 
 def get_excluded_channels():
-    """Get excluded channel IDs from config."""
-    return set(shared.config.get("channels.excluded", []))
+    """Get excluded channel IDs from config (a mutable copy; hot paths read config.snapshot.excluded)."""
+    return set(shared.config.snapshot.excluded)
 
 
 def get_troll_channels(guild):
     """Get text channels that aren't excluded from trolling."""
-    excluded = get_excluded_channels()
+    excluded = shared.config.snapshot.excluded
     return [c for c in guild.text_channels if c.id not in excluded]
 
 
@@ -38,9 +39,8 @@ def pick_member(members, recent_victim_ids):
 def is_late_night():
     """Check if it's between midnight and 5am EAT."""
     hour = datetime.now(shared.EAT).hour
-    start = shared.config.get("feature.late_night.start_hour", 0)
-    end = shared.config.get("feature.late_night.end_hour", 5)
-    return start <= hour < end
+    late_night = shared.config.snapshot.late_night
+    return late_night.start_hour <= hour < late_night.end_hour
 
 
 def get_channel_by_key(key):
@@ -52,3 +52,19 @@ def get_channel_by_key(key):
         except (ValueError, TypeError):
             return None
     return None
+
+
+async def interruptible_sleep(seconds_fn, *prefixes):
+    """Sleep seconds_fn() seconds, re-reading it whenever a setting under prefixes changes.
+
+    The wait is measured from the start, so shortening an interval on the
+    dashboard takes effect at once and lengthening it extends the current wait.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    while True:
+        remaining = started + seconds_fn() - loop.time()
+        if remaining <= 0:
+            return
+        if not await shared.config.wait_for_change(*prefixes, timeout=remaining):
+            return
@@ -1,18 +1,207 @@
 """Logging module: troll logs, activity logs, and stats counters."""
 
 import json
+import time
 import asyncio
+import sqlite3
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
 import aiosqlite
 
+from database import (
+    EAT_OFFSET, TROLL_DAILY_UPSERT_SQL, TROLL_TARGETS_UPSERT_SQL, ACTIVITY_HOURLY_UPSERT_SQL,
+    USER_UPSERT_SQL, CHANNEL_UPSERT_SQL, TROLL_TYPE_UPSERT_SQL,
+)
+
+
+TROLL_INSERT_SQL = (
+    "INSERT INTO troll_log (ts, troll_type_id, target_user_id, channel_id, details) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+ACTIVITY_INSERT_SQL = (
+    "INSERT INTO activity_log (ts, event_type, description, channel_id, user_id, metadata) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+STAT_UPSERT_SQL = (
+    "INSERT INTO stats (key, value, updated_at) VALUES (?, ?, ?) "
+    "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value, updated_at = excluded.updated_at"
+)
+
+# Errors a record will hit on every retry: the batch is rewritten one record at a time
+# and the records that fail again are dropped
+PERMANENT_ERRORS = (sqlite3.IntegrityError, sqlite3.DataError)
+# Longest wait between retries of a batch that keeps failing for other reasons
+MAX_RETRY_DELAY_SEC = 30.0
+
+
+class StatCounters:
+    """
+    In-memory stat deltas. increment -> dict add (zero I/O); the logger's flusher
+    drains them into one upsert batch. Deltas taken for an in-progress flush stay
+    visible in merge() until the commit lands, so reads are always exact.
+    """
+
+    def __init__(self):
+        self._pending: dict[str, int] = {}
+        self._inflight: dict[str, int] = {}
+
+    def add(self, key: str, amount: int = 1):
+        self._pending[key] = self._pending.get(key, 0) + amount
+
+    def pending(self) -> dict:
+        """Deltas not yet committed to the stats table."""
+        result = dict(self._inflight)
+        for key, amount in self._pending.items():
+            result[key] = result.get(key, 0) + amount
+        return result
+
+    def drain(self) -> dict:
+        """Take all pending deltas for a flush."""
+        deltas, self._pending = self._pending, {}
+        for key, amount in deltas.items():
+            self._inflight[key] = self._inflight.get(key, 0) + amount
+        return deltas
+
+    def commit(self, deltas: dict):
+        """Mark drained deltas as persisted."""
+        for key, amount in deltas.items():
+            left = self._inflight.get(key, 0) - amount
+            if left:
+                self._inflight[key] = left
+            else:
+                self._inflight.pop(key, None)
+
+    def restore(self, deltas: dict):
+        """Return drained deltas to pending after a failed flush."""
+        self.commit(deltas)
+        for key, amount in deltas.items():
+            self.add(key, amount)
+
+    def merge(self, persisted: dict) -> dict:
+        """Persisted values plus every delta not yet committed."""
+        merged = dict(persisted)
+        for key, amount in self.pending().items():
+            merged[key] = merged.get(key, 0) + amount
+        return merged
+
+
+def _eat_bucket(ts: int) -> tuple[str, int]:
+    """(day, hour) in EAT for an epoch-millisecond timestamp."""
+    local = datetime.fromtimestamp(ts / 1000, timezone.utc) + EAT_OFFSET
+    return local.strftime("%Y-%m-%d"), local.hour
+
+
+def _now_ms() -> int:
+    """Current time in epoch milliseconds."""
+    return int(time.time() * 1000)
+
+
+class NameCache:
+    """
+    In-process copy of the dimension tables (users, channels, troll types).
+
+    Resolving a troll type id or checking whether a display name changed is a dict
+    lookup; the tables are only written for new ids and renames. Updates are staged
+    per batch and applied after the commit, so a rolled-back batch leaves no trace.
+    """
+
+    def __init__(self):
+        self.users: dict[int, str | None] = {}
+        self.channels: dict[int, str | None] = {}
+        self.troll_types: dict[str, tuple[int, str]] = {}  # type -> (id, name)
+        self.loaded = False
+
+    async def load(self, db: aiosqlite.Connection):
+        async with db.execute("SELECT id, name FROM users") as cur:
+            self.users = dict(await cur.fetchall())
+        async with db.execute("SELECT id, name FROM channels") as cur:
+            self.channels = dict(await cur.fetchall())
+        async with db.execute("SELECT type, id, name FROM troll_types") as cur:
+            self.troll_types = {r[0]: (r[1], r[2]) for r in await cur.fetchall()}
+        self.loaded = True
+
+    @staticmethod
+    def changed(known: dict, seen: dict) -> dict:
+        """Entries of `seen` (id -> latest name) that are new or renamed."""
+        return {
+            key: name for key, name in seen.items()
+            if key not in known or (name is not None and known[key] != name)
+        }
+
+
+def _rollup_rows(trolls: list[tuple], activity: list[tuple]) -> tuple[list, list, list]:
+    """Aggregate a batch of resolved log rows into rollup upsert params (EAT buckets)."""
+    daily: dict[tuple, int] = {}
+    targets: dict[int, int] = {}
+    hourly: dict[tuple, int] = {}
+    for ts, type_id, target_id, *_ in trolls:
+        key = (_eat_bucket(ts)[0], type_id)
+        daily[key] = daily.get(key, 0) + 1
+        if target_id is not None:
+            targets[target_id] = targets.get(target_id, 0) + 1
+    for ts, *_ in activity:
+        key = _eat_bucket(ts)
+        hourly[key] = hourly.get(key, 0) + 1
+    return (
+        [(day, type_id, count) for (day, type_id), count in daily.items()],
+        list(targets.items()),
+        [(day, hour, count) for (day, hour), count in hourly.items()],
+    )
+
 
 class BotLogger:
-    def __init__(self, db: aiosqlite.Connection):
+    """
+    Direct mode:        every log call does its own execute + commit.
+    Write-behind mode:  log calls enqueue a record and return; a single flusher task
+                        writes the queue with executemany in one transaction every
+                        `flush_interval` seconds or `flush_max_rows` records. At most
+                        `max_queue_rows` records wait; further ones are dropped.
+
+    Stat increments never touch the DB directly in either mode: they accumulate in
+    `counters` and are upserted by the flusher every `stats_flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        db: aiosqlite.Connection,
+        write_behind: bool = False,
+        flush_interval: float = 0.5,
+        flush_max_rows: int = 200,
+        stats_flush_interval: float = 5.0,
+        max_queue_rows: int = 50_000,
+    ):
         self._db = db
-        self._msg_counter = 0
-        self._msg_flush_threshold = 100
-        self._lock = asyncio.Lock()
+        self.counters = StatCounters()
+        self.names = NameCache()
+        self._stats_flush_interval = stats_flush_interval
+        self._last_stats_flush = time.monotonic()
+
+        self.write_behind = write_behind
+        self._flush_interval = flush_interval
+        self._flush_max_rows = flush_max_rows
+        self._max_queue_rows = max_queue_rows
+        self._queue: list[tuple[str, tuple]] = []  # (kind, params), oldest first
+        self._retry_delay = 0.0  # doubles with each failed flush, back to 0 on success
+        self._retry_at = 0.0     # monotonic time before which the flusher doesn't retry
+        self._write_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flusher_task = None
+        self._closed = False
+        # Dashboard responses are cached per version: write_version changes with every
+        # committed db write, counter_version with every stat increment
+        self.write_version = 0
+        self.counter_version = 0
+
+        # Flush metrics (exposed on the dashboard)
+        self.flush_count = 0
+        self.rows_flushed = 0
+        self.flush_errors = 0
+        self.dropped_rows = 0  # records that couldn't be written, or arrived with the queue full
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    # ── Public logging API ────────────────────────────────
 
     async def log_troll(
         self,
@@ -23,22 +212,16 @@ class BotLogger:
         details: dict | None = None,
     ):
         """Log a troll event to troll_log and increment stats."""
-        now = datetime.now(timezone.utc).isoformat()
-        await self._db.execute(
-            "INSERT INTO troll_log (timestamp, troll_type, troll_name, target_user_id, "
-            "target_user_name, channel_id, channel_name, details) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (
-                now,
-                troll_type,
-                troll_name,
-                str(target_user.id) if target_user else None,
-                getattr(target_user, "display_name", None),
-                str(channel.id) if channel else None,
-                getattr(channel, "name", None),
-                json.dumps(details) if details else None,
-            ),
-        )
-        await self._db.commit()
+        await self._submit("troll", (
+            _now_ms(),
+            troll_type,
+            troll_name,
+            target_user.id if target_user else None,
+            getattr(target_user, "display_name", None),
+            channel.id if channel else None,
+            getattr(channel, "name", None),
+            json.dumps(details) if details else None,
+        ))
         await self.increment_stat("trolls_triggered")
 
     async def log_activity(
@@ -50,45 +233,259 @@ class BotLogger:
         metadata: dict | None = None,
     ):
         """Log a general activity event."""
-        now = datetime.now(timezone.utc).isoformat()
-        await self._db.execute(
-            "INSERT INTO activity_log (timestamp, event_type, description, channel_id, "
-            "channel_name, user_id, user_name, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (
-                now,
-                event_type,
-                description,
-                str(channel.id) if channel else None,
-                getattr(channel, "name", None),
-                str(user.id) if user else None,
-                getattr(user, "display_name", str(user) if user else None),
-                json.dumps(metadata) if metadata else None,
-            ),
-        )
-        await self._db.commit()
+        await self._submit("activity", (
+            _now_ms(),
+            event_type,
+            description,
+            channel.id if channel else None,
+            getattr(channel, "name", None),
+            user.id if user else None,
+            getattr(user, "display_name", str(user) if user else None),
+            json.dumps(metadata) if metadata else None,
+        ))
 
     async def increment_stat(self, key: str, amount: int = 1):
-        """Atomically increment a stat counter."""
-        now = datetime.now(timezone.utc).isoformat()
-        await self._db.execute(
-            "UPDATE stats SET value = value + ?, updated_at = ? WHERE key = ?",
-            (amount, now, key),
-        )
-        await self._db.commit()
+        """Increment a stat counter (in memory; persisted by the flusher)."""
+        self.counters.add(key, amount)
+        self.counter_version += 1
 
     async def count_message(self):
-        """Batched message counter - flushes to DB every N messages."""
-        self._msg_counter += 1
-        if self._msg_counter >= self._msg_flush_threshold:
-            async with self._lock:
-                count = self._msg_counter
-                self._msg_counter = 0
-            await self.increment_stat("messages_processed", count)
+        """Count a processed message (in memory; persisted by the flusher)."""
+        self.counters.add("messages_processed")
+        self.counter_version += 1
 
     async def flush_messages(self):
-        """Flush remaining message count to DB (call on shutdown)."""
-        async with self._lock:
-            count = self._msg_counter
-            self._msg_counter = 0
-        if count > 0:
-            await self.increment_stat("messages_processed", count)
+        """Persist all pending stat counters now."""
+        await self.flush(include_stats=True)
+
+    # ── Write-behind queue ────────────────────────────────
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of records waiting to be written."""
+        return len(self._queue)
+
+    def metrics(self) -> dict:
+        """Queue depth and flush latency for the dashboard."""
+        return {
+            "write_behind": self.write_behind,
+            "queue_depth": self.queue_depth,
+            "pending_stats": sum(self.counters.pending().values()),
+            "flush_count": self.flush_count,
+            "rows_flushed": self.rows_flushed,
+            "flush_errors": self.flush_errors,
+            "dropped_rows": self.dropped_rows,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Borrow the writer connection for other writes (retention, maintenance).
+
+        Serialized with log flushes; commits on exit and rolls back on error.
+        """
+        async with self._write_lock:
+            try:
+                yield self._db
+                await self._db.commit()
+            except BaseException:
+                await self._db.rollback()
+                raise
+            finally:
+                self.write_version += 1
+
+    def start(self):
+        """Start the background flusher."""
+        if self._flusher_task is None:
+            self._flusher_task = asyncio.create_task(self._flush_loop())
+
+    async def flush(self, include_stats: bool = True):
+        """
+        Write every queued record (and optionally pending stats) in a single transaction.
+
+        A batch that breaks a constraint is rewritten one record per transaction and
+        the records that fail again are dropped (counted in dropped_rows), so one bad
+        record can't hold up the rest. On any other error the batch is queued again
+        and the flusher backs off before retrying.
+        """
+        async with self._write_lock:
+            batch, self._queue = self._queue, []
+            deltas = self.counters.drain() if include_stats else {}
+            if include_stats:
+                self._last_stats_flush = time.monotonic()
+            if not batch and not deltas:
+                return
+            started = time.perf_counter()
+            written = len(batch)
+            try:
+                try:
+                    await self._write_batch(batch, deltas)
+                except PERMANENT_ERRORS as e:
+                    print(f"[logger] Flush failed ({e}), writing the batch record by record")
+                    written = await self._write_each(batch, deltas)
+            except BaseException as e:
+                # Put what's unwritten back in front of anything queued meanwhile so nothing is lost
+                self._queue = batch + self._queue
+                self.counters.restore(deltas)
+                if not isinstance(e, Exception):
+                    raise  # cancelled: the batch was rolled back and is queued again
+                self.flush_errors += 1
+                self._retry_delay = min(max(self._retry_delay * 2, self._flush_interval), MAX_RETRY_DELAY_SEC)
+                self._retry_at = time.monotonic() + self._retry_delay
+                print(f"[logger] Flush failed ({len(batch)} rows queued, retrying in {self._retry_delay:.1f}s): {e}")
+                return
+            self._retry_delay = 0.0
+            self.counters.commit(deltas)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flush_count += 1
+            self.rows_flushed += written + len(deltas)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+
+    async def close(self):
+        """
+        Stop the flusher and write everything still buffered (call on shutdown).
+
+        Raises RuntimeError if records or stat increments are still unwritten.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._flusher_task is not None:
+            # Let a flush in progress finish rather than cancelling it mid-write
+            self._wakeup.set()
+            await self._flusher_task
+            self._flusher_task = None
+        await self.flush()
+        pending_stats = sum(self.counters.pending().values())
+        if self._queue or pending_stats:
+            raise RuntimeError(f"{len(self._queue)} rows and {pending_stats} stat increments left unwritten")
+
+    async def _submit(self, kind: str, params: tuple):
+        """Write a record now (direct mode) or enqueue it (write-behind mode)."""
+        if not self.write_behind or self._closed:
+            async with self._write_lock:
+                await self._write_batch([(kind, params)], {})
+            return
+        if len(self._queue) >= self._max_queue_rows:
+            self.dropped_rows += 1  # the db has been failing for a while; don't grow without bound
+            return
+        self._queue.append((kind, params))
+        if len(self._queue) >= self._flush_max_rows:
+            self._wakeup.set()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._closed:
+                return  # close() writes what's left
+            if time.monotonic() < self._retry_at:
+                continue  # backing off after a failed flush
+            stats_due = time.monotonic() - self._last_stats_flush >= self._stats_flush_interval
+            await self.flush(include_stats=stats_due)
+
+    async def _write_each(self, batch: list[tuple[str, tuple]], deltas: dict) -> int:
+        """
+        Write records one per transaction, dropping those that break a constraint,
+        then the stat deltas. Written records are removed from `batch` as it goes, so
+        on any other error it holds just the unwritten ones. Returns records written.
+        """
+        written = 0
+        while batch:
+            try:
+                await self._write_batch(batch[:1], {})
+                written += 1
+            except PERMANENT_ERRORS as e:
+                self.dropped_rows += 1
+                print(f"[logger] Dropped {batch[0][0]} record {batch[0][1]!r}: {e}")
+            del batch[0]
+        if deltas:
+            await self._write_batch([], deltas)
+        return written
+
+    async def _resolve_names(self, trolls: list[tuple], activity: list[tuple]) -> tuple[list, list, tuple]:
+        """
+        Swap names for dimension ids, writing only new or renamed dimension rows.
+        Returns the insert params and the cache updates to apply once committed.
+        """
+        names = self.names
+        if not names.loaded:
+            await names.load(self._db)
+
+        users: dict[int, str | None] = {}
+        channels: dict[int, str | None] = {}
+        types: dict[str, str] = {}
+        def _see(seen: dict, key, name):
+            if key is not None and (name is not None or key not in seen):
+                seen[key] = name
+
+        for _, troll_type, troll_name, target_id, target_name, channel_id, channel_name, _ in trolls:
+            types[troll_type] = troll_name
+            _see(users, target_id, target_name)
+            _see(channels, channel_id, channel_name)
+        for _, _, _, channel_id, channel_name, user_id, user_name, _ in activity:
+            _see(channels, channel_id, channel_name)
+            _see(users, user_id, user_name)
+
+        new_users = NameCache.changed(names.users, users)
+        new_channels = NameCache.changed(names.channels, channels)
+        if new_users:
+            await self._db.executemany(USER_UPSERT_SQL, list(new_users.items()))
+        if new_channels:
+            await self._db.executemany(CHANNEL_UPSERT_SQL, list(new_channels.items()))
+
+        type_ids = {}
+        new_types = {}
+        for troll_type, troll_name in types.items():
+            cached = names.troll_types.get(troll_type)
+            if cached is not None and cached[1] == troll_name:
+                type_ids[troll_type] = cached[0]
+                continue
+            async with self._db.execute(TROLL_TYPE_UPSERT_SQL, (troll_type, troll_name)) as cur:
+                type_id = (await cur.fetchone())[0]
+            type_ids[troll_type] = type_id
+            new_types[troll_type] = (type_id, troll_name)
+
+        troll_rows = [
+            (ts, type_ids[troll_type], target_id, channel_id, details)
+            for ts, troll_type, _, target_id, _, channel_id, _, details in trolls
+        ]
+        activity_rows = [
+            (ts, event_type, description, channel_id, user_id, metadata)
+            for ts, event_type, description, channel_id, _, user_id, _, metadata in activity
+        ]
+        return troll_rows, activity_rows, (new_users, new_channels, new_types)
+
+    async def _write_batch(self, batch: list[tuple[str, tuple]], deltas: dict):
+        """Write log records, their dimensions, rollups and stat deltas with a single commit."""
+        trolls = [params for kind, params in batch if kind == "troll"]
+        activity = [params for kind, params in batch if kind == "activity"]
+        now = datetime.now(timezone.utc).isoformat()
+        stats = [(key, amount, now) for key, amount in deltas.items() if amount]
+        try:
+            trolls, activity, (new_users, new_channels, new_types) = await self._resolve_names(trolls, activity)
+            daily, targets, hourly = _rollup_rows(trolls, activity)
+            if trolls:
+                await self._db.executemany(TROLL_INSERT_SQL, trolls)
+                await self._db.executemany(TROLL_DAILY_UPSERT_SQL, daily)
+                if targets:
+                    await self._db.executemany(TROLL_TARGETS_UPSERT_SQL, targets)
+            if activity:
+                await self._db.executemany(ACTIVITY_INSERT_SQL, activity)
+                await self._db.executemany(ACTIVITY_HOURLY_UPSERT_SQL, hourly)
+            if stats:
+                await self._db.executemany(STAT_UPSERT_SQL, stats)
+            await self._db.commit()
+        except BaseException:
+            # Also on cancellation, so a half-written batch is never committed by a later flush
+            await self._db.rollback()
+            raise
+        self.names.users.update(new_users)
+        self.names.channels.update(new_channels)
+        self.names.troll_types.update(new_types)
+        self.write_version += 1
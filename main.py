@@ -2,14 +2,17 @@
 
 import asyncio
 import os
+import signal
 
 from dotenv import load_dotenv
 
 import bot as shared
+from archive import LogArchive
 from config import BotConfig
-from database import init_db
+from database import init_db, open_read_pool
 from logger import BotLogger
 from dashboard.app import create_app
+from shutdown import build_shutdown
 
 load_dotenv()
 
@@ -21,6 +24,9 @@ EXTENSIONS = [
     "cogs.events",
     "cogs.modmail",
     "cogs.on_message",
+    "cogs.retention",
+    "cogs.db_maintenance",
+    "cogs.backup",
 ]
 
 
@@ -41,12 +47,16 @@ async def on_ready():
     # Initialize config (JSON file) and database (SQLite for logs/stats)
     shared.config = BotConfig()
     shared.config.load()
-    db = await init_db()
-    shared.logger = BotLogger(db)
+    db_profile = shared.config.get("database.profile", "balanced")
+    db = await init_db(profile=db_profile)
+    shared.logger = BotLogger(db, write_behind=True)
+    shared.logger.start()
+    shared.archive = LogArchive()
 
     # Start dashboard
     dashboard_port = int(os.getenv("DASHBOARD_PORT", "8080"))
-    app = create_app(shared.config, db, shared.client)
+    read_pool = await open_read_pool(profile=db_profile)
+    app = create_app(shared.config, db, shared.client, shared.logger, read_pool, shared.archive)
 
     from hypercorn.asyncio import serve
     from hypercorn.config import Config as HyperConfig
@@ -60,5 +70,17 @@ async def on_ready():
     for ext in EXTENSIONS:
         await shared.client.load_extension(ext)
 
+    # SIGTERM (service stop/restart) closes the bot through the shutdown pipeline
+    shared.client.shutdown = build_shutdown(
+        shared.client, db, shared.logger, extensions=EXTENSIONS, tasks=[_dashboard_task], read_pool=read_pool,
+        config=shared.config,
+    )
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, lambda: asyncio.create_task(shared.client.close()),
+        )
+    except NotImplementedError:
+        pass  # Windows: only Ctrl+C, which discord.py turns into close()
+
 
 shared.client.run(os.getenv("TOKEN"))
@@ -0,0 +1,121 @@
+"""Single-pass phrase matching for the on_message keyword detectors."""
+
+import re
+
+import messages
+
+# Detector -> (match rule, phrase list in messages.py)
+#   edge:      the whole message, its first word(s) before a space or its last word(s) after one
+#   word:      a whitespace-delimited token
+#   substring: anywhere in the message
+DETECTORS = {
+    "gn": ("edge", "gn_phrases"),
+    "excuse": ("substring", "loss_phrases"),
+    "cap": ("substring", "cap_phrases"),
+    "flex": ("substring", "flex_phrases"),
+    "lag": ("word", "lag_words"),
+}
+
+
+def _trie_pattern(phrases) -> str:
+    """
+    A regex alternation with shared prefixes factored out ("gn|gnight" -> "gn(?:ight)?").
+
+    At each position only the branch for the next character can continue, instead
+    of every phrase being tried in turn. Optional tails are greedy, so a match is
+    the longest phrase starting there.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = None  # a phrase ends here
+
+    def build(node) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class PhraseMatcher:
+    """
+    Every detector phrase compiled into one regex (a prefix trie, see _trie_pattern).
+
+    A message without phrases costs one search. After a hit the next search
+    resumes one character later, which also finds phrases that overlap it. A
+    hit is the longest phrase starting at its position; any other phrase
+    matching there is a prefix of it, and those are precomputed per phrase.
+    Edge and word boundaries are only checked at hits.
+    """
+
+    def __init__(self, detectors: dict):
+        """detectors: name -> (rule, phrases)."""
+        rules = {}  # phrase -> [(detector, rule)]
+        for name, (rule, phrases) in detectors.items():
+            for phrase in phrases:
+                rules.setdefault(phrase.lower(), []).append((name, rule))
+        ordered = sorted(rules, key=len, reverse=True)
+        self._pattern = re.compile(_trie_pattern(ordered)) if ordered else None
+        # Matched phrase -> (length, detector, rule) for it and every phrase that is a prefix of it
+        self._hits = {
+            phrase: [(len(p), name, rule) for p in ordered if phrase.startswith(p) for name, rule in rules[p]]
+            for phrase in ordered
+        }
+
+    def match(self, text: str) -> set:
+        """Names of every detector with a phrase in text (case-insensitive, surrounding whitespace ignored)."""
+        return self.scan(text.lower().strip())
+
+    def scan(self, text: str) -> set:
+        """match() for text that is already lowercased and stripped."""
+        found = set()
+        if self._pattern is None:
+            return found
+        size = len(text)
+        search = self._pattern.search
+        m = search(text)
+        while m is not None:
+            start = m.start()
+            for length, name, rule in self._hits[m.group()]:
+                if name in found:
+                    continue
+                end = start + length
+                if rule == "substring":
+                    found.add(name)
+                elif rule == "word":
+                    if (start == 0 or text[start - 1].isspace()) and (end == size or text[end].isspace()):
+                        found.add(name)
+                elif (start == 0 and (end == size or text[end] == " ")) or (
+                        end == size and start > 0 and text[start - 1] == " "):
+                    found.add(name)
+            m = search(text, start + 1)
+        return found
+
+
+_matcher = None
+_sources = None
+
+
+def get_matcher() -> PhraseMatcher:
+    """The matcher for the current phrase lists; rebuilt when a list in messages.py is replaced or resized."""
+    global _matcher, _sources
+    lists = [getattr(messages, attr) for _, attr in DETECTORS.values()]
+    stale = _matcher is None or any(
+        phrases is not built or len(phrases) != size for phrases, (built, size) in zip(lists, _sources)
+    )
+    if stale:
+        _matcher = PhraseMatcher({
+            name: (rule, phrases) for (name, (rule, _)), phrases in zip(DETECTORS.items(), lists)
+        })
+        _sources = [(phrases, len(phrases)) for phrases in lists]
+    return _matcher
+
+
+def detect(text: str) -> set:
+    """Detectors whose phrases appear in a message (see DETECTORS)."""
+    return get_matcher().match(text)
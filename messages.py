@@ -304,6 +304,10 @@ rage_responses = [
 
 # --- Excuse Generator ---
 
+loss_phrases = [
+    "i lost", "we lost", "took an l", "got destroyed", "got clapped", "got wrecked", "got bodied", "lost the game",
+]
+
 excuse_responses = [
     "nah it was definitely lag",
     "your controller was broken obviously",
@@ -319,6 +323,8 @@ excuse_responses = [
 
 # --- Cap Alarm ---
 
+cap_phrases = ["i swear", "no cap", "trust me", "on my life", "on god", "deadass", "fr fr", "i promise", "not lying"]
+
 cap_responses = [
     "\U0001f9e2\U0001f9e2\U0001f9e2",
     "cap detected \U0001f6a8",
@@ -333,6 +339,11 @@ cap_responses = [
 
 # --- Flex Police ---
 
+flex_phrases = [
+    "i'm the best", "im the best", "easy win", "easy dub", "too easy", "i carried", "they can't beat me",
+    "i'm goated", "im goated", "undefeated", "no one can", "i don't lose", "i dont lose",
+]
+
 flex_responses = [
     "calm down it's not that serious \U0001f612",
     "bro is flexing in a Discord server \U0001f480",
@@ -348,6 +359,8 @@ flex_responses = [
 
 # --- Lag Defender ---
 
+lag_words = ["lag"]  # whole words only
+
 lag_responses = [
     "IT WAS DEFINITELY LAG. I believe you.",
     "100% lag. No way that was a skill issue. Absolutely not.",
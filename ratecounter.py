@@ -0,0 +1,144 @@
+"""Sliding-window event rates: bucketed ring-buffer counters with an EWMA, one per channel."""
+
+import math
+import time
+from collections import OrderedDict
+
+# Buckets per window; the window's trailing edge is accurate to one bucket
+DEFAULT_BUCKETS = 30
+# Counters kept by ChannelRates before the least recently active is dropped
+MAX_KEYS = 500
+
+
+class RateCounter:
+    """
+    Events seen in the last `window` seconds, counted in a ring of fixed-width buckets.
+
+    add() and count() are O(1): the ring keeps a running total, and buckets that
+    age out as time moves on are subtracted from it (a long gap clears the ring
+    in one go). The count covers the current bucket and the ones before it, so
+    events between window - bucket_sec and window seconds old may already be
+    dropped. It also keeps an exponentially weighted moving average of the rate
+    in events/sec, with time constant `ewma_sec` (the window by default).
+    Times are time.monotonic() seconds unless `now` is passed.
+    """
+
+    __slots__ = ("window", "bucket_sec", "ewma_sec", "_buckets", "_total", "_tick", "_ewma", "_ewma_at")
+
+    def __init__(self, window: float, buckets: int = DEFAULT_BUCKETS, ewma_sec: float | None = None):
+        if window <= 0 or buckets < 1:
+            raise ValueError("window and buckets must be positive")
+        self.window = window
+        self.bucket_sec = window / buckets
+        self.ewma_sec = ewma_sec or window
+        self._buckets = [0] * buckets
+        self._total = 0
+        self._tick = None      # time slot (now // bucket_sec) of the newest bucket
+        self._ewma = 0.0
+        self._ewma_at = None
+
+    def _advance(self, now: float):
+        tick = int(now // self.bucket_sec)
+        if self._tick is None:
+            self._tick = tick
+            return
+        gap = tick - self._tick
+        if gap <= 0:
+            return
+        buckets = self._buckets
+        size = len(buckets)
+        if gap >= size:
+            buckets[:] = [0] * size
+            self._total = 0
+        else:
+            for slot in range(self._tick + 1, tick + 1):
+                i = slot % size
+                self._total -= buckets[i]
+                buckets[i] = 0
+        self._tick = tick
+
+    def _decay(self, now: float):
+        if self._ewma_at is None:
+            self._ewma_at = now
+        elif now > self._ewma_at:
+            self._ewma *= math.exp((self._ewma_at - now) / self.ewma_sec)
+            self._ewma_at = now
+
+    def add(self, count: int = 1, now: float | None = None):
+        """Record `count` events."""
+        now = time.monotonic() if now is None else now
+        self._advance(now)
+        self._buckets[self._tick % len(self._buckets)] += count
+        self._total += count
+        self._decay(now)
+        self._ewma += count / self.ewma_sec
+
+    def count(self, now: float | None = None) -> int:
+        """Events in the window."""
+        self._advance(time.monotonic() if now is None else now)
+        return self._total
+
+    def rate(self, now: float | None = None) -> float:
+        """Events per second over the window."""
+        return self.count(now) / self.window
+
+    def ewma(self, now: float | None = None) -> float:
+        """Smoothed events per second, decayed to now."""
+        self._decay(time.monotonic() if now is None else now)
+        return self._ewma
+
+
+class ChannelRates:
+    """
+    A RateCounter per key (a channel ID), created on first event.
+
+    Keeps at most `max_keys` counters, dropping the least recently active one
+    when a new key arrives. configure() changes the window, which starts every
+    counter afresh.
+    """
+
+    def __init__(self, window: float, buckets: int = DEFAULT_BUCKETS, ewma_sec: float | None = None,
+                 max_keys: int = MAX_KEYS):
+        self.window = window
+        self.buckets = buckets
+        self.ewma_sec = ewma_sec
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+
+    def configure(self, window: float):
+        """Switch to a new window length (no-op if unchanged)."""
+        if window != self.window:
+            self.window = window
+            self._counters.clear()
+
+    def add(self, key, count: int = 1, now: float | None = None) -> RateCounter:
+        """Record events for key; returns its counter."""
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = RateCounter(self.window, self.buckets, self.ewma_sec)
+            self._counters[key] = counter
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+        else:
+            self._counters.move_to_end(key)
+        counter.add(count, now)
+        return counter
+
+    def count(self, key, now: float | None = None) -> int:
+        counter = self._counters.get(key)
+        return counter.count(now) if counter else 0
+
+    def ewma(self, key, now: float | None = None) -> float:
+        counter = self._counters.get(key)
+        return counter.ewma(now) if counter else 0.0
+
+    def __len__(self):
+        return len(self._counters)
+
+    def report(self, now: float | None = None) -> dict:
+        """{key: {"count", "rate", "ewma"}} for every tracked key."""
+        now = time.monotonic() if now is None else now
+        return {
+            key: {"count": c.count(now), "rate": round(c.rate(now), 3), "ewma": round(c.ewma(now), 3)}
+            for key, c in self._counters.items()
+        }
@@ -215,6 +215,7 @@ mock_bot_module = ModuleType("bot")
 mock_bot_module.EAT = EAT
 mock_bot_module.config = None
 mock_bot_module.logger = None
+mock_bot_module.archive = None
 mock_bot_module.client = None
 sys.modules["bot"] = mock_bot_module
 
@@ -242,14 +243,15 @@ def run_async(coro):
 # ============================================================================
 
 def make_mock_config(overrides=None):
-    """Return a MagicMock that mimics BotConfig.get()."""
-    from config import DEFAULT_SETTINGS
+    """Return a MagicMock that mimics BotConfig.get() and BotConfig.snapshot."""
+    from config import DEFAULT_SETTINGS, build_snapshot
     defaults = {key: value for key, value, *_ in DEFAULT_SETTINGS}
     if overrides:
         defaults.update(overrides)
 
     cfg = MagicMock()
     cfg.get = MagicMock(side_effect=lambda key, default=None: defaults.get(key, default))
+    cfg.snapshot = build_snapshot(defaults)
     return cfg
 
 
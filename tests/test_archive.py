@@ -0,0 +1,106 @@
+"""Tests for archive.py — compressed cold storage of aged log rows."""
+
+import os
+from datetime import datetime, timezone
+
+from archive import LogArchive
+
+
+def _ts(day, hour=9):
+    """Epoch ms for 2024-03-<day> at <hour>:00 UTC (12:00 EAT by default)."""
+    return int(datetime(2024, 3, day, hour, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _troll(row_id, ts, troll_type="cap_alarm", user_id=7, user_name="Alice"):
+    return (row_id, ts, troll_type, "Troll", user_id, user_name, 100, "general", None)
+
+
+def _archive(tmp_path):
+    archive = LogArchive(str(tmp_path / "archive"))
+    archive.append("troll_log", [
+        _troll(1, _ts(1)),
+        _troll(2, _ts(1), "k_energy", 8, "Bob"),
+        _troll(3, _ts(2)),
+        _troll(4, _ts(3), "k_energy"),
+    ])
+    return archive
+
+
+class TestAppend:
+    def test_partitions_by_eat_day(self, tmp_path):
+        archive = LogArchive(str(tmp_path / "archive"))
+        # 22:00 UTC on the 1st is 01:00 EAT on the 2nd
+        archive.append("troll_log", [_troll(1, _ts(1)), _troll(2, _ts(1, hour=22))])
+        files = sorted(os.listdir(tmp_path / "archive" / "troll_log" / "2024"))
+        assert files == ["2024-03-01.ndjson.gz", "2024-03-02.ndjson.gz"]
+        assert archive.last_id("troll_log") == 2
+
+    def test_appends_skip_archived_ids(self, tmp_path):
+        archive = _archive(tmp_path)
+        assert archive.append("troll_log", [_troll(4, _ts(3)), _troll(5, _ts(3))]) == 1
+        assert [r[0] for r in archive.read("troll_log", 10)] == [5, 4, 3, 2, 1]
+
+    def test_index_survives_reopen(self, tmp_path):
+        _archive(tmp_path)
+        archive = LogArchive(str(tmp_path / "archive"))
+        assert archive.last_id("troll_log") == 4
+        assert archive.summary()["troll_log"]["rows"] == 4
+
+    def test_unindexed_tail_is_truncated(self, tmp_path):
+        archive = _archive(tmp_path)
+        path = tmp_path / "archive" / "troll_log" / "2024" / "2024-03-03.ndjson.gz"
+        with open(path, "ab") as f:
+            f.write(b"torn write")  # crash after the segment write, before the index
+        archive.append("troll_log", [_troll(5, _ts(3))])
+        assert [r[0] for r in archive.read("troll_log", 10, since=_ts(3, hour=0))] == [5, 4]
+
+
+class TestRead:
+    def test_rows_come_back_as_written(self, tmp_path):
+        archive = _archive(tmp_path)
+        assert archive.read("troll_log", 1) == [_troll(4, _ts(3), "k_energy")]
+
+    def test_filters_and_cursors(self, tmp_path):
+        archive = _archive(tmp_path)
+        assert [r[0] for r in archive.read("troll_log", 10, log_type="k_energy")] == [4, 2]
+        assert [r[0] for r in archive.read("troll_log", 10, user="bo")] == [2]
+        assert [r[0] for r in archive.read("troll_log", 10, user="7")] == [4, 3, 1]
+        assert [r[0] for r in archive.read("troll_log", 2, before_id=4)] == [3, 2]
+        assert [r[0] for r in archive.read("troll_log", 2, False, after_id=1)] == [2, 3]
+
+    def test_only_matching_segments_are_opened(self, tmp_path, monkeypatch):
+        archive = _archive(tmp_path)
+        opened = []
+        load = archive._load
+        monkeypatch.setattr(archive, "_load", lambda table, seg: opened.append(seg["file"]) or load(table, seg))
+        archive.read("troll_log", 10, since=_ts(2, hour=0), until=_ts(3, hour=0))
+        assert opened == ["2024/2024-03-02.ndjson.gz"]
+
+    def test_count_uses_index_for_whole_segments(self, tmp_path, monkeypatch):
+        archive = _archive(tmp_path)
+        monkeypatch.setattr(archive, "_load", None)  # any decompression would fail
+        assert archive.count("troll_log") == 4
+        assert archive.count("troll_log", log_type="k_energy") == 2
+        assert archive.count("troll_log", limit=1) == 1  # stops after the newest segment
+
+    def test_user_count_uses_index(self, tmp_path, monkeypatch):
+        archive = _archive(tmp_path)
+        monkeypatch.setattr(archive, "_load", None)
+        assert archive.count("troll_log", user="7") == 3
+        assert archive.count("troll_log", user="ali") == 3
+        assert archive.count("troll_log", user="8") == 1
+
+    def test_segments_without_the_user_are_skipped(self, tmp_path, monkeypatch):
+        archive = _archive(tmp_path)
+        opened = []
+        load = archive._load
+        monkeypatch.setattr(archive, "_load", lambda table, seg: opened.append(seg["file"]) or load(table, seg))
+        assert [r[0] for r in archive.read("troll_log", 10, user="bob")] == [2]
+        assert archive.count("troll_log", log_type="k_energy", user="8") == 1
+        assert opened == ["2024/2024-03-01.ndjson.gz"] * 2
+
+    def test_digits_match_id_or_name(self, tmp_path):
+        archive = _archive(tmp_path)
+        archive.append("troll_log", [_troll(5, _ts(3), user_id=9, user_name="gamer7")])
+        assert [r[0] for r in archive.read("troll_log", 10, user="7")] == [5, 4, 3, 1]
+        assert archive.count("troll_log", user="7") == 4
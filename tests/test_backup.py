@@ -0,0 +1,111 @@
+"""Tests for cogs/backup.py — online snapshots, compression and rotation."""
+
+import asyncio
+import gzip
+import os
+import sqlite3
+
+import pytest
+
+import bot as shared
+from database import init_db
+from logger import BotLogger
+from tests.conftest import run_async, make_mock_config, make_mock_bot
+
+
+def make_backup_cog(bot, directory):
+    """Construct Backup cog without discord.py internals."""
+    from cogs.backup import Backup
+    cog = object.__new__(Backup)
+    cog.bot = bot
+    cog.directory = directory
+    cog.last_report = None
+    return cog
+
+
+async def _setup(tmp_path, rows=0, overrides=None):
+    db = await init_db(str(tmp_path / "bot.db"))
+    await db.executemany(
+        "INSERT INTO activity_log (ts, event_type, description) VALUES (0, 'greeting', ?)",
+        [("x" * 200,)] * rows,
+    )
+    await db.commit()
+    shared.config = make_mock_config(overrides)
+    shared.logger = BotLogger(db)
+    return db, make_backup_cog(make_mock_bot(), str(tmp_path / "backups"))
+
+
+def _count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM activity_log").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture(autouse=True)
+def _reset_shared():
+    yield
+    shared.config = None
+    shared.logger = None
+
+
+class TestBackup:
+    def test_snapshot_is_verified_and_compressed(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, rows=300)
+            report = await cog._run_backup()
+            assert report["integrity"] == "ok"
+            assert report["file"].endswith(".db.gz")
+            restored = tmp_path / "restored.db"
+            with gzip.open(tmp_path / "backups" / report["file"]) as f:
+                restored.write_bytes(f.read())
+            assert _count_rows(restored) == 300
+            assert os.listdir(tmp_path / "backups") == [report["file"]]  # no partial files left
+            await db.close()
+        run_async(_test())
+
+    def test_uncompressed_backup_is_standalone(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, rows=10, overrides={"backup.compress": False})
+            report = await cog._run_backup()
+            path = tmp_path / "backups" / report["file"]
+            conn = sqlite3.connect(path)
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+            conn.close()
+            await db.close()
+        run_async(_test())
+
+    def test_writes_continue_during_backup(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, rows=20000, overrides={"backup.step_pages": 8})
+            backup = asyncio.create_task(cog._run_backup())
+            writes = 0
+            while not backup.done():
+                await shared.logger.log_activity("greeting", "during backup")
+                writes += 1
+            report = await backup
+            assert writes > 1
+            assert report["integrity"] == "ok"
+            await db.close()
+        run_async(_test())
+
+    def test_rotation_keeps_newest(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, overrides={"backup.keep": 2, "backup.compress": False})
+            os.makedirs(cog.directory)
+            for stamp in ("20240101-000000", "20240102-000000"):
+                (tmp_path / "backups" / f"bot-{stamp}.db").write_bytes(b"")
+            report = await cog._run_backup(force=True)
+            assert report["rotated_out"] == ["bot-20240101-000000.db"]
+            assert sorted(os.listdir(cog.directory)) == ["bot-20240102-000000.db", report["file"]]
+            await db.close()
+        run_async(_test())
+
+    def test_not_due_after_recent_backup(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path)
+            assert await cog._run_backup() is not None
+            assert await cog._run_backup() is None
+            await db.close()
+        run_async(_test())
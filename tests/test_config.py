@@ -2,11 +2,13 @@
 
 import json
 import asyncio
+import time
 from pathlib import Path
 
 import pytest
 
-from config import BotConfig, DEFAULT_SETTINGS
+import config as config_module
+from config import BotConfig, DEFAULT_SETTINGS, build_snapshot
 
 
 @pytest.fixture
@@ -69,10 +71,132 @@ class TestBotConfigSet:
 
     def test_set_persists_to_file(self, tmp_config):
         cfg, path = tmp_config
-        asyncio.get_event_loop().run_until_complete(cfg.set("feature.gn_police.chance", 0.99))
+
+        async def _set():
+            await cfg.set("feature.gn_police.chance", 0.99)
+            await cfg.flush()
+        asyncio.get_event_loop().run_until_complete(_set())
         data = json.loads(path.read_text())
         assert data["feature.gn_police.chance"] == 0.99
 
+    def test_sets_are_coalesced_into_one_write(self, tmp_config, monkeypatch):
+        cfg, path = tmp_config
+        writes = []
+        write = cfg._write
+        monkeypatch.setattr(cfg, "_write", lambda data: (writes.append(data), write(data)))
+
+        async def _set():
+            for chance in (0.1, 0.2, 0.3):
+                await cfg.set("feature.gn_police.chance", chance)
+            assert writes == []  # still inside the debounce window
+            await asyncio.sleep(config_module.SAVE_DEBOUNCE_SEC + 0.2)
+        asyncio.get_event_loop().run_until_complete(_set())
+        assert len(writes) == 1
+        assert json.loads(path.read_text())["feature.gn_police.chance"] == 0.3
+
+    def test_late_flush_does_not_skip_next_debounce(self, tmp_config, monkeypatch):
+        cfg, _ = tmp_config
+        monkeypatch.setattr(config_module, "SAVE_DEBOUNCE_SEC", 0.1)
+        writes = []
+        write = cfg._write
+
+        def slow_write(data):
+            writes.append(data)
+            time.sleep(0.2)
+            write(data)
+        monkeypatch.setattr(cfg, "_write", slow_write)
+
+        async def _set():
+            await cfg.set("feature.gn_police.chance", 0.41)
+            await asyncio.sleep(0.15)  # debounce over, write in progress
+            await cfg.flush()
+            await cfg.set("feature.gn_police.chance", 0.42)
+            await asyncio.sleep(0.05)
+            assert len(writes) == 1  # the second change still waits out the debounce
+            await cfg.flush()
+        asyncio.get_event_loop().run_until_complete(_set())
+        assert len(writes) == 2
+
+    def test_set_many_updates_all_keys(self, tmp_config):
+        cfg, path = tmp_config
+
+        async def _set():
+            await cfg.set_many({"feature.gn_police.chance": 0.5, "feature.gn_police.enabled": False})
+            await cfg.flush()
+        asyncio.get_event_loop().run_until_complete(_set())
+        data = json.loads(path.read_text())
+        assert data["feature.gn_police.chance"] == 0.5
+        assert data["feature.gn_police.enabled"] is False
+
+    def test_save_replaces_file_atomically(self, tmp_config):
+        cfg, path = tmp_config
+
+        async def _set():
+            await cfg.set("feature.gn_police.chance", 0.7)
+            await cfg.flush()
+        asyncio.get_event_loop().run_until_complete(_set())
+        assert [p.name for p in path.parent.iterdir()] == ["config.json"]  # no temp file left behind
+
+
+class TestConfigSnapshot:
+    def test_snapshot_matches_defaults(self, tmp_config):
+        cfg, _ = tmp_config
+        snap = cfg.snapshot
+        assert snap.gn_police.chance == cfg.get("feature.gn_police.chance")
+        assert snap.modmail_id == int(cfg.get("channels.modmail_id"))
+        assert snap.excluded == frozenset(cfg.get("channels.excluded"))
+
+    def test_snapshot_is_immutable(self, tmp_config):
+        cfg, _ = tmp_config
+        with pytest.raises(AttributeError):
+            cfg.snapshot.gn_police.chance = 1.0
+
+    def test_set_rebuilds_snapshot(self, tmp_config):
+        cfg, _ = tmp_config
+        before = cfg.snapshot
+
+        async def _set():
+            await cfg.set("feature.cap_alarm.enabled", False)
+            await cfg.set_many({"channels.excluded": ["123", 456], "channels.modmail_id": ""})
+            await cfg.flush()
+        asyncio.get_event_loop().run_until_complete(_set())
+        assert before.cap_alarm.enabled is True
+        assert cfg.snapshot.cap_alarm.enabled is False
+        assert cfg.snapshot.excluded == frozenset({123, 456})
+        assert cfg.snapshot.modmail_id is None
+
+    def test_malformed_values_fall_back_to_defaults(self):
+        snap = build_snapshot({"feature.rage_detector.min_length": "lots", "feature.k_energy.chance": "0.5"})
+        assert snap.rage_detector.min_length == 10
+        assert snap.k_energy.chance == 0.5
+
+
+class TestWaitForChange:
+    def test_wakes_on_matching_change(self, tmp_config):
+        cfg, _ = tmp_config
+
+        async def _test():
+            waiter = asyncio.ensure_future(cfg.wait_for_change("feature.dead_chat.", timeout=5))
+            await asyncio.sleep(0)
+            await cfg.set("feature.gn_police.chance", 0.9)  # other feature: keeps waiting
+            await asyncio.sleep(0)
+            assert not waiter.done()
+            await cfg.set("feature.dead_chat.check_interval_min", 1)
+            assert await asyncio.wait_for(waiter, 1) is True
+            await cfg.flush()
+        asyncio.get_event_loop().run_until_complete(_test())
+
+    def test_times_out_without_change(self, tmp_config):
+        cfg, _ = tmp_config
+
+        async def _test():
+            waiter = asyncio.ensure_future(cfg.wait_for_change("feature.dead_chat.enabled", timeout=0.05))
+            await asyncio.sleep(0)
+            await cfg.set("feature.dead_chat.enabled", True)  # same value: not a change
+            assert await waiter is False
+            assert cfg._waiters == []
+        asyncio.get_event_loop().run_until_complete(_test())
+
 
 class TestBotConfigGrouped:
     def test_get_all_grouped_returns_categories(self, tmp_config):
@@ -0,0 +1,550 @@
+"""Tests for dashboard/api.py — log pagination, export and stats endpoints."""
+
+import csv
+import gzip
+import io
+import json
+import re
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from archive import LogArchive
+from database import LOG_COLUMNS, explain_query_plan, init_db, open_read_pool, plan_uses_index
+from logger import BotLogger
+from dashboard import api as api_module
+from dashboard.app import create_app
+from tests.conftest import run_async, make_mock_config, make_mock_member
+
+
+@pytest.fixture(autouse=True)
+def _clear_total_cache():
+    # COUNT(*) totals are cached per filter at module level; each test has its own db
+    yield
+    api_module._total_cache.clear()
+
+
+async def _make_client(tmp_path, troll_rows=0, activity_rows=0, pooled=False, archive=None):
+    """Build an authenticated test client over a seeded temp database."""
+    path = str(tmp_path / "bot.db")
+    db = await init_db(path)
+    logger = BotLogger(db, write_behind=True)
+    for i in range(troll_rows):
+        await logger.log_troll("cap_alarm" if i % 2 else "k_energy", "Troll")
+    for i in range(activity_rows):
+        await logger.log_activity("greeting", f"event {i}")
+    await logger.flush()
+
+    read_pool = await open_read_pool(path, size=2) if pooled else None
+    app = create_app(make_mock_config(), db, MagicMock(), logger, read_pool, archive)
+    client = app.test_client()
+    async with client.session_transaction() as sess:
+        sess["authenticated"] = True
+    return client, db, logger
+
+
+class TestLogCursorPagination:
+    def test_first_page_is_newest(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=25)
+            data = await (await client.get("/api/logs/trolls?limit=10")).get_json()
+            assert [l["id"] for l in data["logs"]] == list(range(25, 15, -1))
+            assert data["older_cursor"] == 16
+            assert data["newer_cursor"] is None
+            assert "total" not in data
+            await db.close()
+        run_async(_test())
+
+    def test_walks_older_then_newer(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=25)
+            data = await (await client.get("/api/logs/trolls?limit=10&before_id=16")).get_json()
+            assert [l["id"] for l in data["logs"]] == list(range(15, 5, -1))
+            assert data["newer_cursor"] == 15
+
+            data = await (await client.get("/api/logs/trolls?limit=10&before_id=6")).get_json()
+            assert [l["id"] for l in data["logs"]] == [5, 4, 3, 2, 1]
+            assert data["older_cursor"] is None
+
+            data = await (await client.get("/api/logs/trolls?limit=10&after_id=5")).get_json()
+            assert [l["id"] for l in data["logs"]] == list(range(15, 5, -1))
+            assert data["older_cursor"] == 6
+            assert data["newer_cursor"] == 15
+            await db.close()
+        run_async(_test())
+
+    def test_cursor_respects_filter(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=10)
+            data = await (await client.get("/api/logs/trolls?type=cap_alarm&limit=2&before_id=8")).get_json()
+            assert [l["id"] for l in data["logs"]] == [6, 4]
+            assert all(l["troll_type"] == "cap_alarm" for l in data["logs"])
+            await db.close()
+        run_async(_test())
+
+    def test_total_only_when_requested(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, activity_rows=7)
+            data = await (await client.get("/api/logs/activity?total=1")).get_json()
+            assert data["total"] == 7
+            await db.close()
+        run_async(_test())
+
+    def test_legacy_page_mode(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, activity_rows=7)
+            data = await (await client.get("/api/logs/activity?page=2&limit=5")).get_json()
+            assert [l["id"] for l in data["logs"]] == [2, 1]
+            assert data["total"] == 7
+            assert data["page"] == 2
+            await db.close()
+        run_async(_test())
+
+
+class TestTimeRange:
+    async def _client(self, tmp_path):
+        client, db, logger = await _make_client(tmp_path)
+        # One troll a day at 12:00 EAT (09:00 UTC), 1-5 March 2024
+        await db.execute("INSERT INTO troll_types (id, type, name) VALUES (1, 'k_energy', 'K Energy')")
+        for day in range(1, 6):
+            ts = int(datetime(2024, 3, day, 9, tzinfo=timezone.utc).timestamp() * 1000)
+            await db.execute("INSERT INTO troll_log (ts, troll_type_id) VALUES (?, 1)", (ts,))
+        await db.commit()
+        return client, db
+
+    def test_since_until_dates_are_eat_days(self, tmp_path):
+        async def _test():
+            client, db = await self._client(tmp_path)
+            data = await (await client.get("/api/logs/trolls?since=2024-03-02&until=2024-03-04")).get_json()
+            assert [l["id"] for l in data["logs"]] == [4, 3, 2]
+            await db.close()
+        run_async(_test())
+
+    def test_since_accepts_epoch_ms(self, tmp_path):
+        async def _test():
+            client, db = await self._client(tmp_path)
+            since = int(datetime(2024, 3, 4, tzinfo=timezone.utc).timestamp() * 1000)
+            data = await (await client.get(f"/api/logs/trolls?since={since}&total=1")).get_json()
+            assert [l["id"] for l in data["logs"]] == [5, 4]
+            assert data["total"] == 2
+            await db.close()
+        run_async(_test())
+
+    def test_empty_range(self, tmp_path):
+        async def _test():
+            client, db = await self._client(tmp_path)
+            data = await (await client.get("/api/logs/trolls?since=2025-01-01")).get_json()
+            assert data["logs"] == []
+            await db.close()
+        run_async(_test())
+
+
+    def test_rows_sharing_a_boundary_ts_are_all_kept(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path)
+            await db.execute("INSERT INTO troll_types (id, type, name) VALUES (1, 'k_energy', 'K Energy')")
+            for ts in (1000, 2000, 2000, 2000, 3000, 3000):
+                await db.execute("INSERT INTO troll_log (ts, troll_type_id) VALUES (?, 1)", (ts,))
+            await db.commit()
+            data = await (await client.get("/api/logs/trolls?since=2000&until=3000")).get_json()
+            assert [l["id"] for l in data["logs"]] == [4, 3, 2]
+            data = await (await client.get("/api/logs/trolls?since=3000")).get_json()
+            assert [l["id"] for l in data["logs"]] == [6, 5]
+            await db.close()
+        run_async(_test())
+
+    def test_malformed_time_is_rejected(self, tmp_path):
+        async def _test():
+            client, db = await self._client(tmp_path)
+            for query in ("since=yesterday", "until=2024-13-01"):
+                response = await client.get(f"/api/logs/trolls?{query}")
+                assert response.status_code == 400
+                assert "error" in await response.get_json()
+            response = await client.get("/api/export/trolls?since=nope")
+            assert response.status_code == 400
+            await db.close()
+        run_async(_test())
+
+class TestNames:
+    def test_logs_show_latest_names_and_string_ids(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path)
+            snowflake = 123456789012345678
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=make_mock_member(user_id=snowflake, name="Old"))
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=make_mock_member(user_id=snowflake, name="New"))
+            await logger.flush()
+            data = await (await client.get("/api/logs/trolls")).get_json()
+            assert [l["target_user_name"] for l in data["logs"]] == ["New", "New"]
+            assert data["logs"][0]["target_user_id"] == str(snowflake)
+            data = await (await client.get("/api/logs/trolls?user=ne")).get_json()
+            assert len(data["logs"]) == 2
+            data = await (await client.get("/api/stats")).get_json()
+            assert data["top_targets"] == [{"name": "New", "user_id": str(snowflake), "count": 2}]
+            await db.close()
+        run_async(_test())
+
+    def test_numeric_user_matches_id_or_name(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path)
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=make_mock_member(user_id=42, name="Alice"))
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=make_mock_member(user_id=7, name="gamer42"))
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=make_mock_member(user_id=8, name="Bob"))
+            await logger.flush()
+            data = await (await client.get("/api/logs/trolls?user=42&total=1")).get_json()
+            assert [l["target_user_name"] for l in data["logs"]] == ["gamer42", "Alice"]
+            assert data["total"] == 2
+            await db.close()
+        run_async(_test())
+
+
+class TestSearch:
+    async def _client(self, tmp_path):
+        client, db, logger = await _make_client(tmp_path)
+        alice = make_mock_member(user_id=7, name="Alice")
+        await logger.log_troll("cap_alarm", "Cap Alarm", target_user=alice, details={"quoted": "no cap fr"})
+        await logger.log_troll("k_energy", "K Energy", details={"quoted": "k"})
+        await logger.log_troll("cap_alarm", "Cap Alarm", details={"quoted": "cap cap cap"})
+        await logger.log_activity("greeting", "Sent morning greeting")
+        await logger.log_activity("dead_chat", "Revived dead chat")
+        await logger.flush()
+        return client, db
+
+    def test_ranked_matches(self, tmp_path):
+        async def _test():
+            client, db = await self._client(tmp_path)
+            data = await (await client.get("/api/logs/trolls?q=cap&total=1")).get_json()
+            assert data["ranked"] is True
+            assert [l["id"] for l in data["logs"]] == [3, 1]  # more occurrences rank first
+            assert data["total"] == 2
+            await db.close()
+        run_async(_test())
+
+    def test_matches_names_and_prefixes(self, tmp_path):
+        async def _test():
+            client, db = await self._client(tmp_path)
+            data = await (await client.get("/api/logs/trolls?q=ali")).get_json()
+            assert [l["id"] for l in data["logs"]] == [1]
+            data = await (await client.get("/api/logs/activity?q=morn")).get_json()
+            assert [l["event_type"] for l in data["logs"]] == ["greeting"]
+            await db.close()
+        run_async(_test())
+
+    def test_search_combines_with_filters(self, tmp_path):
+        async def _test():
+            client, db = await self._client(tmp_path)
+            data = await (await client.get("/api/logs/trolls?q=cap&user=7")).get_json()
+            assert [l["id"] for l in data["logs"]] == [1]
+            await db.close()
+        run_async(_test())
+
+    def test_offset_pagination(self, tmp_path):
+        async def _test():
+            client, db = await self._client(tmp_path)
+            data = await (await client.get("/api/logs/trolls?q=cap&limit=1")).get_json()
+            assert data["older_cursor"] == 1 and data["newer_cursor"] is None
+            data = await (await client.get("/api/logs/trolls?q=cap&limit=1&offset=1")).get_json()
+            assert [l["id"] for l in data["logs"]] == [1]
+            assert data["older_cursor"] is None and data["newer_cursor"] == 0
+            await db.close()
+        run_async(_test())
+
+    def test_query_syntax_is_not_interpreted(self, tmp_path):
+        async def _test():
+            client, db = await self._client(tmp_path)
+            resp = await client.get('/api/logs/trolls?q=" OR NEAR(cap')
+            assert resp.status_code == 200
+            await db.close()
+        run_async(_test())
+
+
+class TestExport:
+    def test_ndjson_streams_every_row_oldest_first(self, tmp_path, monkeypatch):
+        async def _test():
+            monkeypatch.setattr("dashboard.api.EXPORT_BATCH_ROWS", 4)  # several chunks
+            client, db, logger = await _make_client(tmp_path, troll_rows=10)
+            resp = await client.get("/api/export/trolls")
+            assert resp.mimetype == "application/x-ndjson"
+            assert "trolls.ndjson" in resp.headers["Content-Disposition"]
+            rows = [json.loads(line) for line in (await resp.get_data(as_text=True)).splitlines()]
+            assert [r["id"] for r in rows] == list(range(1, 11))
+            assert rows[0]["troll_type"] == "k_energy"
+            await db.close()
+        run_async(_test())
+
+    def test_filters_match_log_endpoint(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=10)
+            await logger.log_troll("cap_alarm", "Cap Alarm", details={"quoted": "bussin fr"})
+            await logger.flush()
+            data = await (await client.get("/api/export/trolls?type=cap_alarm")).get_data(as_text=True)
+            assert [json.loads(l)["id"] for l in data.splitlines()] == [2, 4, 6, 8, 10, 11]
+            data = await (await client.get("/api/export/trolls?q=bussin")).get_data(as_text=True)
+            assert [json.loads(l)["id"] for l in data.splitlines()] == [11]
+            await db.close()
+        run_async(_test())
+
+    def test_csv_gzip(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, activity_rows=3, pooled=True)
+            resp = await client.get("/api/export/activity?format=csv&gzip=1")
+            assert resp.mimetype == "application/gzip"
+            text = gzip.decompress(await resp.get_data()).decode()
+            rows = list(csv.DictReader(io.StringIO(text)))
+            assert [r["description"] for r in rows] == ["event 0", "event 1", "event 2"]
+            await client.app.db_pool.close()
+            await db.close()
+        run_async(_test())
+
+    def test_each_chunk_takes_its_own_connection(self, tmp_path, monkeypatch):
+        async def _test():
+            monkeypatch.setattr("dashboard.api.EXPORT_BATCH_ROWS", 4)
+            client, db, logger = await _make_client(tmp_path, troll_rows=10, pooled=True)
+            pool = client.app.db_pool
+            acquire = pool.acquire
+            acquired = []
+            monkeypatch.setattr(pool, "acquire", lambda: acquired.append(None) or acquire())
+            data = await (await client.get("/api/export/trolls?type=k_energy")).get_data(as_text=True)
+            assert [json.loads(l)["id"] for l in data.splitlines()] == [1, 3, 5, 7, 9]
+            assert len(acquired) == 2  # 4 rows, then the last one
+            await pool.close()
+            await db.close()
+        run_async(_test())
+
+    def test_stats_export_pages_on_day_and_type(self, tmp_path, monkeypatch):
+        async def _test():
+            monkeypatch.setattr("dashboard.api.EXPORT_BATCH_ROWS", 1)
+            client, db, logger = await _make_client(tmp_path, troll_rows=3)
+            data = await (await client.get("/api/export/stats")).get_data(as_text=True)
+            assert [json.loads(l)["troll_type"] for l in data.splitlines()] == ["k_energy", "cap_alarm"]  # by type id
+            await db.close()
+        run_async(_test())
+
+    def test_stats_export_and_bad_format(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=3)
+            data = await (await client.get("/api/export/stats")).get_data(as_text=True)
+            counts = {json.loads(l)["troll_type"]: json.loads(l)["count"] for l in data.splitlines()}
+            assert counts == {"k_energy": 2, "cap_alarm": 1}
+            resp = await client.get("/api/export/trolls?format=xml")
+            assert resp.status_code == 400
+            await db.close()
+        run_async(_test())
+
+
+# Requests covering every log/export query shape; "ali" matches two users, the
+# one filter whose page is allowed to sort (only those users' rows)
+PLAN_REQUESTS = [
+    ("/api/logs/trolls", False),
+    ("/api/logs/trolls?type=cap_alarm&total=1", False),
+    ("/api/logs/trolls?user=7&before_id=6", False),
+    ("/api/logs/trolls?user=alice&after_id=1", False),
+    ("/api/logs/trolls?user=ali", True),
+    ("/api/logs/trolls?since=2024-01-01&until=2030-01-01&before_id=5", False),
+    ("/api/logs/trolls?page=2&limit=2&total=1", False),
+    ("/api/logs/trolls?q=cap&total=1", False),
+    ("/api/logs/trolls/types", False),
+    ("/api/logs/activity?type=greeting&before_id=3&total=1", False),
+    ("/api/logs/activity?since=2024-01-01&after_id=1", False),
+    ("/api/logs/activity/types", False),
+    ("/api/export/trolls?user=7&type=cap_alarm", False),
+    ("/api/export/activity", False),
+    ("/api/export/stats", False),
+]
+
+
+class TestQueryPlans:
+    """EXPLAIN QUERY PLAN for every statement the log and export endpoints actually run."""
+
+    async def _traced(self, tmp_path, url) -> list:
+        client, db, logger = await _make_client(tmp_path, troll_rows=6, activity_rows=4)
+        await logger.log_troll("cap_alarm", "Cap Alarm", target_user=make_mock_member(user_id=7, name="Alice"))
+        await logger.log_troll("cap_alarm", "Cap Alarm", target_user=make_mock_member(user_id=8, name="Alina"))
+        await logger.flush()
+        statements = []
+        await db.set_trace_callback(statements.append)
+        resp = await client.get(url)
+        await resp.get_data()
+        await db.set_trace_callback(None)
+        assert resp.status_code == 200
+        # FTS5's own statements are traced too, as "-- ..." comments
+        plans = [(sql, await explain_query_plan(db, sql)) for sql in statements if sql.startswith("SELECT")]
+        await db.close()
+        return plans
+
+    @pytest.mark.parametrize("url,may_sort", PLAN_REQUESTS)
+    def test_queries_use_indexes_and_pages_dont_sort(self, tmp_path, url, may_sort):
+        async def _test():
+            plans = await self._traced(tmp_path, url)
+            assert plans
+            for sql, plan in plans:
+                # Full scans allowed: the user filter's name match over the small users
+                # table, and an unfiltered page, which walks the key and stops at LIMIT
+                steps = [step for step in plan if step != "SCAN users"]
+                if " WHERE " not in sql and " LIMIT " in sql:
+                    steps = [step for step in steps if not re.fullmatch(r"SCAN \w+", step)]
+                assert not steps or plan_uses_index(steps), f"{sql!r} does a full scan: {plan}"
+                if re.search(r"ORDER BY \w+\.(id|day)\b.* LIMIT ", sql) and not may_sort:
+                    assert not any("TEMP B-TREE" in step for step in plan), f"{sql!r} sorts: {plan}"
+        run_async(_test())
+
+    def test_user_filter_resolves_single_user_to_equality(self, tmp_path):
+        async def _test():
+            plans = await self._traced(tmp_path, "/api/logs/trolls?user=alice")
+            page_sql, page_plan = plans[1]
+            assert "target_user_id = 7" in page_sql
+            assert any("idx_troll_log_target" in step for step in page_plan)
+        run_async(_test())
+
+
+class TestArchiveFallthrough:
+    async def _client(self, tmp_path):
+        # 10 trolls; retention has moved ids 1-6 to the archive
+        archive = LogArchive(str(tmp_path / "archive"))
+        client, db, logger = await _make_client(tmp_path, troll_rows=10, archive=archive)
+        columns, joins = LOG_COLUMNS["troll_log"]
+        async with db.execute(f"SELECT {columns} FROM troll_log {joins} WHERE troll_log.id <= 6 ORDER BY troll_log.id") as cur:
+            archive.append("troll_log", await cur.fetchall())
+        await db.execute("DELETE FROM troll_log WHERE id <= 6")
+        await db.commit()
+        return client, db
+
+    def test_pages_continue_into_archive(self, tmp_path):
+        async def _test():
+            client, db = await self._client(tmp_path)
+            data = await (await client.get("/api/logs/trolls?limit=6&total=1")).get_json()
+            assert [l["id"] for l in data["logs"]] == [10, 9, 8, 7, 6, 5]
+            assert data["total"] == 10
+            assert data["logs"][4]["troll_type"] == "cap_alarm"
+            data = await (await client.get("/api/logs/trolls?limit=6&before_id=5")).get_json()
+            assert [l["id"] for l in data["logs"]] == [4, 3, 2, 1]
+            assert data["older_cursor"] is None
+            assert data["newer_cursor"] == 4
+            data = await (await client.get("/api/logs/trolls?limit=6&after_id=4")).get_json()
+            assert [l["id"] for l in data["logs"]] == [10, 9, 8, 7, 6, 5]
+            assert data["older_cursor"] == 5
+            await db.close()
+        run_async(_test())
+
+    def test_archive_rows_are_filtered(self, tmp_path):
+        async def _test():
+            client, db = await self._client(tmp_path)
+            data = await (await client.get("/api/logs/trolls?type=cap_alarm&before_id=7")).get_json()
+            assert [l["id"] for l in data["logs"]] == [6, 4, 2]
+            await db.close()
+        run_async(_test())
+
+
+class TestStats:
+    def test_counters_include_pending_deltas(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=3)
+            await logger.increment_stat("trolls_triggered", 2)  # not flushed yet
+            data = await (await client.get("/api/stats")).get_json()
+            assert data["counters"]["trolls_triggered"] == 5
+            assert sum(t["count"] for t in data["trolls_by_type"]) == 3
+            await db.close()
+        run_async(_test())
+
+    def test_reads_through_pool(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=3, pooled=True)
+            await logger.log_troll("k_energy", "K Energy")  # queued, not committed
+            data = await (await client.get("/api/stats")).get_json()
+            assert data["counters"]["trolls_triggered"] == 4
+            assert sum(t["count"] for t in data["trolls_by_type"]) == 3
+            data = await (await client.get("/api/logs/trolls")).get_json()
+            assert len(data["logs"]) == 3
+            await client.app.db_pool.close()
+            await db.close()
+        run_async(_test())
+
+
+    def test_chat_traffic_reuses_the_queries(self, tmp_path, monkeypatch):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=3)
+            queries = []
+            fetch_all = api_module._fetch_all
+
+            async def _counting(sql, params=()):
+                queries.append(sql)
+                return await fetch_all(sql, params)
+            monkeypatch.setattr(api_module, "_fetch_all", _counting)
+
+            await client.get("/api/stats")
+            ran = len(queries)
+            await logger.count_message()
+            await logger.increment_stat("cap_alarms")
+            data = await (await client.get("/api/stats")).get_json()
+            assert len(queries) == ran
+            assert data["counters"]["messages_processed"] == 1
+            assert data["counters"]["cap_alarms"] == 1
+
+            await logger.flush_messages()  # a committed write refreshes the rows
+            data = await (await client.get("/api/stats")).get_json()
+            assert len(queries) == 2 * ran
+            assert data["counters"]["messages_processed"] == 1
+            await db.close()
+        run_async(_test())
+
+
+class TestResponseCache:
+    def test_etag_revalidates_to_304(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=5)
+            first = await client.get("/api/logs/trolls")
+            etag = first.headers["ETag"]
+            again = await client.get("/api/logs/trolls", headers={"If-None-Match": etag})
+            assert again.status_code == 304
+            assert await again.get_data() == b""
+            assert client.app.response_cache.hits == 1
+            await db.close()
+        run_async(_test())
+
+    def test_writes_invalidate(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=5)
+            etag = (await client.get("/api/logs/trolls")).headers["ETag"]
+            await logger.log_troll("k_energy", "K Energy")
+            await logger.flush()
+            fresh = await client.get("/api/logs/trolls", headers={"If-None-Match": etag})
+            assert fresh.status_code == 200
+            assert len((await fresh.get_json())["logs"]) == 6
+            assert fresh.headers["ETag"] != etag
+            await db.close()
+        run_async(_test())
+
+    def test_chat_messages_do_not_invalidate_logs(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=5)
+            logs_etag = (await client.get("/api/logs/trolls")).headers["ETag"]
+            stats_etag = (await client.get("/api/stats")).headers["ETag"]
+            await logger.count_message()
+            await logger.increment_stat("cap_alarms")
+            logs = await client.get("/api/logs/trolls", headers={"If-None-Match": logs_etag})
+            assert logs.status_code == 304
+            stats = await client.get("/api/stats", headers={"If-None-Match": stats_etag})
+            assert stats.status_code == 200  # stats include uncommitted counters
+            await db.close()
+        run_async(_test())
+
+    def test_gzip_when_accepted(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=30)
+            plain = await client.get("/api/logs/trolls")
+            zipped = await client.get("/api/logs/trolls", headers={"Accept-Encoding": "gzip"})
+            assert zipped.headers["Content-Encoding"] == "gzip"
+            assert zipped.headers["ETag"] != plain.headers["ETag"]  # strong ETags differ per coding
+            assert gzip.decompress(await zipped.get_data()) == await plain.get_data()
+            await db.close()
+        run_async(_test())
+
+    def test_query_string_is_part_of_the_key(self, tmp_path):
+        async def _test():
+            client, db, logger = await _make_client(tmp_path, troll_rows=10)
+            data = await (await client.get("/api/logs/trolls?limit=2")).get_json()
+            assert len(data["logs"]) == 2
+            data = await (await client.get("/api/logs/trolls?limit=3")).get_json()
+            assert len(data["logs"]) == 3
+            await db.close()
+        run_async(_test())
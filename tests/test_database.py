@@ -0,0 +1,291 @@
+"""Tests for database.py — migrations and dashboard query plans."""
+
+import asyncio
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from database import (
+    init_db, migrate, get_schema_version, explain_query_plan, plan_uses_index, enable_incremental_vacuum,
+    backfill_rollups, open_read_pool, resolve_profile, SCHEMA_VERSION, DEFAULT_STATS,
+)
+from tests.conftest import run_async
+
+
+# /api/stats queries: these read only the rollup and dimension tables, never the raw logs.
+STATS_QUERIES = [
+    "SELECT t.type, t.name, d.cnt FROM (SELECT troll_type_id, SUM(count) as cnt FROM troll_daily GROUP BY troll_type_id) d "
+    "JOIN troll_types t ON t.id = d.troll_type_id ORDER BY d.cnt DESC",
+    "SELECT u.name, tt.user_id, tt.count FROM troll_targets tt LEFT JOIN users u ON u.id = tt.user_id "
+    "ORDER BY tt.count DESC LIMIT 10",
+    "SELECT day, SUM(count) as cnt FROM troll_daily WHERE day >= DATE('now', '+3 hours', '-30 days') GROUP BY day ORDER BY day",
+    "SELECT hour, SUM(count) as cnt FROM activity_hourly GROUP BY hour ORDER BY hour",
+]
+
+
+async def insert_troll(db, iso, troll_type="k_energy", troll_name="K Energy", user_id=None, user_name=None):
+    """Insert a raw troll_log row (and its dimension rows) at an ISO time."""
+    async with db.execute(
+        "INSERT INTO troll_types (type, name) VALUES (?, ?) "
+        "ON CONFLICT(type) DO UPDATE SET name = excluded.name RETURNING id",
+        (troll_type, troll_name),
+    ) as cur:
+        type_id = (await cur.fetchone())[0]
+    if user_id is not None:
+        await db.execute("INSERT OR REPLACE INTO users (id, name) VALUES (?, ?)", (user_id, user_name))
+    await db.execute(
+        "INSERT INTO troll_log (ts, troll_type_id, target_user_id) VALUES (?, ?, ?)",
+        (_ts(iso), type_id, user_id),
+    )
+
+
+def _ts(iso):
+    return int(datetime.fromisoformat(iso).timestamp() * 1000)
+
+
+class TestMigrations:
+    def test_fresh_db_reaches_current_version(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            assert await get_schema_version(db) == SCHEMA_VERSION
+            await db.close()
+        run_async(_test())
+
+    def test_migrate_is_idempotent(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            assert await migrate(db) == SCHEMA_VERSION
+            await db.close()
+        run_async(_test())
+
+    def test_upgrades_unversioned_db(self, tmp_path):
+        """A bot.db created before migrations existed keeps its rows, normalized and indexed."""
+        path = tmp_path / "bot.db"
+        conn = sqlite3.connect(path)
+        conn.executescript(
+            "CREATE TABLE troll_log (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, "
+            "troll_type TEXT NOT NULL, troll_name TEXT NOT NULL, target_user_id TEXT, target_user_name TEXT, "
+            "channel_id TEXT, channel_name TEXT, details TEXT);"
+            "INSERT INTO troll_log (timestamp, troll_type, troll_name, target_user_id, target_user_name) "
+            "VALUES ('2024-01-01T00:00:00+00:00', 'k_energy', 'K Energy', '123456789012345678', 'Alice');"
+        )
+        conn.close()
+
+        async def _test():
+            db = await init_db(str(path))
+            assert await get_schema_version(db) == SCHEMA_VERSION
+            async with db.execute("SELECT COUNT(*) FROM troll_log") as cur:
+                assert (await cur.fetchone())[0] == 1
+            async with db.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'idx_troll_log_type'") as cur:
+                assert await cur.fetchone() is not None
+            async with db.execute(
+                "SELECT l.ts, t.type, u.id, u.name FROM troll_log l "
+                "JOIN troll_types t ON t.id = l.troll_type_id JOIN users u ON u.id = l.target_user_id"
+            ) as cur:
+                assert await cur.fetchall() == [(1704067200000, "k_energy", 123456789012345678, "Alice")]
+            async with db.execute("SELECT day, t.type, count FROM troll_daily JOIN troll_types t ON t.id = troll_type_id") as cur:
+                assert await cur.fetchall() == [("2024-01-01", "k_energy", 1)]
+            async with db.execute("SELECT user_id, count FROM troll_targets") as cur:
+                assert await cur.fetchall() == [(123456789012345678, 1)]
+            async with db.execute("SELECT rowid FROM troll_log_fts WHERE troll_log_fts MATCH 'alice'") as cur:
+                assert await cur.fetchall() == [(1,)]
+            await db.close()
+        run_async(_test())
+
+    def test_fresh_db_uses_incremental_vacuum(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            async with db.execute("PRAGMA auto_vacuum") as cur:
+                assert (await cur.fetchone())[0] == 2
+            await db.close()
+        run_async(_test())
+
+    def test_existing_db_is_not_vacuumed_on_boot(self, tmp_path):
+        path = tmp_path / "bot.db"
+        conn = sqlite3.connect(path)
+        conn.executescript("CREATE TABLE legacy (x INTEGER); INSERT INTO legacy VALUES (1);")
+        conn.close()
+
+        async def _test():
+            db = await init_db(str(path))
+            async with db.execute("PRAGMA auto_vacuum") as cur:
+                assert (await cur.fetchone())[0] == 0
+            assert await enable_incremental_vacuum(db) is True
+            async with db.execute("PRAGMA auto_vacuum") as cur:
+                assert (await cur.fetchone())[0] == 2
+            assert await enable_incremental_vacuum(db) is False
+            await db.close()
+        run_async(_test())
+
+    def test_seeds_default_stats(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            async with db.execute("SELECT key FROM stats") as cur:
+                keys = {r[0] for r in await cur.fetchall()}
+            assert set(DEFAULT_STATS) <= keys
+            await db.close()
+        run_async(_test())
+
+
+class TestQueryPlans:
+    def test_plan_uses_index_rejects_full_scan(self):
+        assert not plan_uses_index(["SCAN troll_log"])
+        assert plan_uses_index(["SEARCH troll_log USING INDEX idx_troll_log_type (troll_type=?)"])
+        assert plan_uses_index(["SCAN troll_log USING COVERING INDEX idx_troll_log_type"])
+
+    @pytest.mark.parametrize("sql", STATS_QUERIES)
+    def test_stats_query_reads_only_rollups(self, tmp_path, sql):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            plan = await explain_query_plan(db, sql)
+            await db.close()
+            assert not any("troll_log" in step or "activity_log" in step for step in plan), plan
+            if "WHERE day" in sql:
+                assert plan_uses_index(plan), f"{sql!r} is not a range scan: {plan}"
+        run_async(_test())
+
+
+class TestRollupBackfill:
+    def test_backfill_rebuilds_from_logs(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            await insert_troll(db, "2024-03-01T10:00:00+00:00", "cap_alarm", "Cap Alarm", 7, "Alice")
+            await insert_troll(db, "2024-03-01T11:00:00+00:00", "cap_alarm", "Cap Alarm", 7, "Alice")
+            await insert_troll(db, "2024-03-02T09:00:00+00:00")
+            await db.execute(
+                "INSERT INTO activity_log (ts, event_type, description) VALUES (?, ?, ?)",
+                (_ts("2024-03-01T14:30:00+00:00"), "greeting", "Sent morning greeting"),
+            )
+            await db.commit()
+            await backfill_rollups(db)
+
+            async with db.execute(
+                "SELECT day, t.type, count FROM troll_daily JOIN troll_types t ON t.id = troll_type_id ORDER BY day"
+            ) as cur:
+                assert await cur.fetchall() == [("2024-03-01", "cap_alarm", 2), ("2024-03-02", "k_energy", 1)]
+            async with db.execute("SELECT user_id, count FROM troll_targets") as cur:
+                assert await cur.fetchall() == [(7, 2)]
+            async with db.execute("SELECT day, hour, count FROM activity_hourly") as cur:
+                assert await cur.fetchall() == [("2024-03-01", 17, 1)]  # EAT hour
+            await db.close()
+        run_async(_test())
+
+    def test_buckets_by_eat_day(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            await insert_troll(db, "2024-03-01T22:30:00+00:00")  # 01:30 on 2 March in Nairobi
+            await db.commit()
+            await backfill_rollups(db)
+            async with db.execute("SELECT day FROM troll_daily") as cur:
+                assert await cur.fetchall() == [("2024-03-02",)]
+            await db.close()
+        run_async(_test())
+
+    def test_keeps_compacted_days(self, tmp_path):
+        """Days with no raw rows left (compacted by retention) keep their rollup counts."""
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            await insert_troll(db, "2024-03-01T10:00:00+00:00", user_id=7, user_name="Alice")
+            await db.execute("INSERT INTO troll_daily VALUES ('2023-01-01', 1, 9)")
+            await db.execute("INSERT INTO troll_log_daily VALUES ('2023-01-01', 1, 7, 0, 9)")
+            await db.commit()
+            await backfill_rollups(db)
+            async with db.execute("SELECT day, count FROM troll_daily ORDER BY day") as cur:
+                assert await cur.fetchall() == [("2023-01-01", 9), ("2024-03-01", 1)]
+            async with db.execute("SELECT user_id, count FROM troll_targets") as cur:
+                assert await cur.fetchall() == [(7, 10)]
+            await db.close()
+        run_async(_test())
+
+
+class TestReadPool:
+    def test_sees_committed_writes(self, tmp_path):
+        async def _test():
+            path = str(tmp_path / "bot.db")
+            db = await init_db(path)
+            pool = await open_read_pool(path, size=2)
+            await db.execute("INSERT INTO activity_log (ts, event_type, description) VALUES (0, 'greeting', 'hi')")
+            await db.commit()
+            async with pool.acquire() as conn:
+                async with conn.execute("SELECT COUNT(*) FROM activity_log") as cur:
+                    assert (await cur.fetchone())[0] == 1
+            await pool.close()
+            await db.close()
+        run_async(_test())
+
+    def test_connections_are_read_only(self, tmp_path):
+        async def _test():
+            path = str(tmp_path / "bot.db")
+            db = await init_db(path)
+            pool = await open_read_pool(path, size=1)
+            async with pool.acquire() as conn:
+                with pytest.raises(sqlite3.OperationalError):
+                    await conn.execute("DELETE FROM stats")
+            await pool.close()
+            await db.close()
+        run_async(_test())
+
+    def test_acquire_waits_for_free_connection(self, tmp_path):
+        async def _test():
+            path = str(tmp_path / "bot.db")
+            db = await init_db(path)
+            pool = await open_read_pool(path, size=1)
+            order = []
+
+            async def _use(name):
+                async with pool.acquire():
+                    order.append(f"{name}+")
+                    await asyncio.sleep(0.01)
+                    order.append(f"{name}-")
+
+            await asyncio.gather(_use("a"), _use("b"))
+            assert order == ["a+", "a-", "b+", "b-"]
+            await pool.close()
+            await db.close()
+        run_async(_test())
+
+
+async def _pragma(db, name):
+    async with db.execute(f"PRAGMA {name}") as cur:
+        return (await cur.fetchone())[0]
+
+
+class TestProfiles:
+    def test_profile_sets_pragmas(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"), profile="durable")
+            assert await _pragma(db, "synchronous") == 2  # FULL
+            assert await _pragma(db, "journal_mode") == "wal"
+            await db.close()
+            db = await init_db(str(tmp_path / "bot.db"), profile="fast")
+            assert await _pragma(db, "synchronous") == 0  # OFF
+            assert await _pragma(db, "wal_autocheckpoint") == 4000
+            await db.close()
+        run_async(_test())
+
+    def test_env_overrides_setting(self, monkeypatch):
+        monkeypatch.setenv("DB_PROFILE", "fast")
+        assert resolve_profile("durable") == "fast"
+        monkeypatch.setenv("DB_PROFILE", "bogus")
+        assert resolve_profile("durable") == "balanced"
+        monkeypatch.delenv("DB_PROFILE")
+        assert resolve_profile(None) == "balanced"
+
+    def test_benchmark_ignores_env_profile(self, tmp_path, monkeypatch):
+        from benchmarks.bench_db_profiles import _run, _workload
+        monkeypatch.setenv("DB_PROFILE", "fast")
+        result = run_async(_run("durable", _workload(20), 10, False, str(tmp_path)))
+        assert result["synchronous"] == 2  # FULL, not the env's OFF
+
+    def test_read_pool_gets_read_pragmas(self, tmp_path):
+        async def _test():
+            path = str(tmp_path / "bot.db")
+            db = await init_db(path)
+            pool = await open_read_pool(path, size=1, profile="fast")
+            async with pool.acquire() as conn:
+                assert await _pragma(conn, "cache_size") == -64000
+                assert await _pragma(conn, "busy_timeout") == 10000
+            await pool.close()
+            await db.close()
+        run_async(_test())
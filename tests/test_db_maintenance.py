@@ -0,0 +1,96 @@
+"""Tests for cogs/db_maintenance.py — checkpoint, optimize, vacuum and integrity jobs."""
+
+import pytest
+
+import bot as shared
+from database import init_db
+from logger import BotLogger
+from tests.conftest import run_async, make_mock_config, make_mock_bot
+
+
+def make_maintenance_cog(bot):
+    """Construct DbMaintenance cog without discord.py internals."""
+    from cogs.db_maintenance import DbMaintenance
+    cog = object.__new__(DbMaintenance)
+    cog.bot = bot
+    cog.sizes = None
+    cog.jobs = {}
+    cog._last_run = {}
+    return cog
+
+
+async def _setup(tmp_path, overrides=None):
+    db = await init_db(str(tmp_path / "bot.db"))
+    shared.config = make_mock_config(overrides)
+    shared.logger = BotLogger(db)
+    return db, make_maintenance_cog(make_mock_bot())
+
+
+@pytest.fixture(autouse=True)
+def _reset_shared():
+    yield
+    shared.config = None
+    shared.logger = None
+
+
+class TestMaintenance:
+    def test_first_pass_analyzes_and_checks_integrity(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path)
+            report = await cog._run_maintenance()
+            assert report["jobs"]["optimize"]["result"] == "analyzed"
+            assert report["jobs"]["integrity"]["result"] == "ok"
+            assert "checkpoint" not in report["jobs"]  # WAL is under the threshold
+            assert report["sizes"]["page_count"] > 0
+            async with db.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'") as cur:
+                assert (await cur.fetchone())[0] == 1
+            await db.close()
+        run_async(_test())
+
+    def test_jobs_wait_for_their_interval(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path)
+            await cog._run_maintenance()
+            first = dict(cog.jobs)
+            await cog._run_maintenance()
+            assert cog.jobs["optimize"] is first["optimize"]
+            assert cog.jobs["integrity"] is first["integrity"]
+            await db.close()
+        run_async(_test())
+
+    def test_checkpoint_truncates_large_wal(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, {"maintenance.wal_checkpoint_mb": 0})
+            await db.executemany(
+                "INSERT INTO activity_log (ts, event_type, description) VALUES (0, 'greeting', ?)",
+                [("x" * 500,)] * 500,
+            )
+            await db.commit()
+            report = await cog._run_maintenance()
+            assert report["jobs"]["checkpoint"]["result"].endswith("truncated")
+            assert report["sizes"]["wal_bytes"] == 0
+            await db.close()
+        run_async(_test())
+
+    def test_vacuum_releases_free_pages(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, {"maintenance.vacuum_freelist_pages": 1})
+            await db.executemany(
+                "INSERT INTO activity_log (ts, event_type, description) VALUES (0, 'greeting', ?)",
+                [("x" * 500,)] * 500,
+            )
+            await db.commit()
+            await db.execute("DELETE FROM activity_log")
+            await db.commit()
+            report = await cog._run_maintenance()
+            assert report["jobs"]["vacuum"]["result"] != "0 bytes reclaimed"
+            assert report["sizes"]["freelist_count"] == 0
+            await db.close()
+        run_async(_test())
+
+    def test_noop_when_disabled(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, {"maintenance.enabled": False})
+            assert await cog._run_maintenance() is None
+            await db.close()
+        run_async(_test())
@@ -0,0 +1,254 @@
+"""Tests for detectors.py — the table-driven message detector pipeline."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import bot as shared
+from detectors import FEATURE_SCAN_CHARS, Detector, DetectorPipeline, MessageContext, MessageFeatures
+from tests.conftest import make_mock_logger, make_mock_message, run_async
+
+
+class AlwaysHit:
+    def random(self):
+        return 0.0
+
+
+def make_ctx(content="hello", excluded=False, **features):
+    cfg = SimpleNamespace(**{
+        name: SimpleNamespace(enabled=True, chance=1.0, **settings) for name, settings in features.items()
+    })
+    return MessageContext(make_mock_message(content=content), MagicMock(), cfg, excluded, MessageFeatures(content), None)
+
+
+def make_detector(name, calls, priority=100, group=None, match=True, respond=None, **kwargs):
+    async def default_respond(ctx, details):
+        calls.append(name)
+    return Detector(
+        name, name.title(), name, lambda ctx: match, respond or default_respond, f"{name}_fires",
+        priority=priority, group=group, **kwargs,
+    )
+
+
+def setup_logger():
+    shared.logger = make_mock_logger()
+    return shared.logger
+
+
+class TestPipelineOrder:
+    def test_runs_in_priority_order(self):
+        setup_logger()
+        calls = []
+        pipeline = DetectorPipeline([
+            make_detector("late", calls, priority=50),
+            make_detector("early", calls, priority=10),
+        ])
+        fired = run_async(pipeline.run(make_ctx(late={}, early={}), rng=AlwaysHit()))
+        assert calls == ["early", "late"]
+        assert fired == ["early", "late"]
+
+    def test_only_first_in_group_responds(self):
+        setup_logger()
+        calls = []
+        pipeline = DetectorPipeline([
+            make_detector("a", calls, priority=1, group="keyword"),
+            make_detector("b", calls, priority=2, group="keyword"),
+            make_detector("c", calls, priority=3),
+        ])
+        run_async(pipeline.run(make_ctx(a={}, b={}, c={}), rng=AlwaysHit()))
+        assert calls == ["a", "c"]
+        assert pipeline.stats["b"].runs == 0
+
+    def test_group_continues_after_a_miss(self):
+        setup_logger()
+        calls = []
+        pipeline = DetectorPipeline([
+            make_detector("a", calls, priority=1, group="keyword", match=False),
+            make_detector("b", calls, priority=2, group="keyword"),
+        ])
+        run_async(pipeline.run(make_ctx(a={}, b={}), rng=AlwaysHit()))
+        assert calls == ["b"]
+
+
+class TestPipelineSkips:
+    def test_disabled_feature(self):
+        setup_logger()
+        calls = []
+        pipeline = DetectorPipeline([make_detector("a", calls)])
+        ctx = make_ctx(a={})
+        ctx.cfg.a.enabled = False
+        run_async(pipeline.run(ctx, rng=AlwaysHit()))
+        assert calls == []
+
+    def test_excluded_channel_unless_allowed(self):
+        setup_logger()
+        calls = []
+        pipeline = DetectorPipeline([
+            make_detector("a", calls),
+            make_detector("b", calls, in_excluded=True),
+        ])
+        run_async(pipeline.run(make_ctx(excluded=True, a={}, b={}), rng=AlwaysHit()))
+        assert calls == ["b"]
+
+    def test_needs_content(self):
+        setup_logger()
+        calls = []
+        pipeline = DetectorPipeline([
+            make_detector("a", calls),
+            make_detector("b", calls, needs_content=False),
+        ])
+        run_async(pipeline.run(make_ctx(content="", a={}, b={}), rng=AlwaysHit()))
+        assert calls == ["b"]
+
+    def test_chance_roll_uses_rng(self):
+        setup_logger()
+        calls = []
+        pipeline = DetectorPipeline([make_detector("a", calls, chance=lambda ctx, s: 0.5)])
+        rng = MagicMock()
+        rng.random.return_value = 0.6
+        run_async(pipeline.run(make_ctx(a={}), rng=rng))
+        assert calls == []
+        assert pipeline.stats["a"].runs == 1
+
+
+class TestPipelineIsolation:
+    def test_match_error_is_counted_and_skipped(self):
+        setup_logger()
+        calls = []
+
+        def broken(ctx):
+            raise ValueError("boom")
+
+        pipeline = DetectorPipeline([
+            Detector("a", "A", "a", broken, None, "a_fires", priority=1),
+            make_detector("b", calls, priority=2),
+        ])
+        run_async(pipeline.run(make_ctx(a={}, b={}), rng=AlwaysHit()))
+        assert calls == ["b"]
+        assert pipeline.stats["a"].errors == 1
+
+    def test_respond_error_still_closes_group(self):
+        logger = setup_logger()
+        calls = []
+
+        async def broken(ctx, details):
+            raise RuntimeError("send failed")
+
+        pipeline = DetectorPipeline([
+            make_detector("a", calls, priority=1, group="troll", respond=broken),
+            make_detector("b", calls, priority=2, group="troll"),
+            make_detector("c", calls, priority=3),
+        ])
+        fired = run_async(pipeline.run(make_ctx(a={}, b={}, c={}), rng=AlwaysHit()))
+        assert calls == ["c"]
+        assert fired == ["c"]
+        assert pipeline.stats["a"].errors == 1
+        assert logger.log_troll.await_count == 1
+
+    def test_respond_timeout_is_counted(self):
+        setup_logger()
+        calls = []
+
+        async def slow(ctx, details):
+            await asyncio.sleep(1)
+
+        pipeline = DetectorPipeline([
+            make_detector("a", calls, priority=1, respond=slow, timeout=0.01),
+            make_detector("b", calls, priority=2),
+        ])
+        run_async(pipeline.run(make_ctx(a={}, b={}), rng=AlwaysHit()))
+        assert calls == ["b"]
+        assert pipeline.stats["a"].timeouts == 1
+        assert pipeline.stats["a"].fired == 0
+
+    def test_avg_respond_time_covers_every_response(self):
+        setup_logger()
+
+        async def slow(ctx, details):
+            await asyncio.sleep(0.05)
+            return False
+
+        pipeline = DetectorPipeline([make_detector("a", [], respond=slow)])
+        run_async(pipeline.run(make_ctx(a={}), rng=AlwaysHit()))
+        report = pipeline.report()[0]
+        assert report["fired"] == 0 and report["responses"] == 1
+        assert report["avg_respond_ms"] >= 50
+
+
+class TestPipelineLogging:
+    def test_logs_and_bumps_stat(self):
+        logger = setup_logger()
+        pipeline = DetectorPipeline([
+            Detector("a", "Alpha", "a", lambda ctx: {"length": 5}, make_detector("a", []).respond, "a_fires"),
+        ])
+        ctx = make_ctx(a={})
+        run_async(pipeline.run(ctx, rng=AlwaysHit()))
+        args, kwargs = logger.log_troll.call_args
+        assert args == ("a", "Alpha")
+        assert kwargs["target_user"] is ctx.message.author
+        assert kwargs["details"] == {"length": 5}
+        logger.increment_stat.assert_awaited_once_with("a_fires")
+
+    def test_respond_can_override_log_type(self):
+        logger = setup_logger()
+
+        async def respond(ctx, details):
+            return "msg_troll_2", "Skull React"
+
+        pipeline = DetectorPipeline([make_detector("a", [], respond=respond, targets_author=False)])
+        run_async(pipeline.run(make_ctx(a={}), rng=AlwaysHit()))
+        args, kwargs = logger.log_troll.call_args
+        assert args == ("msg_troll_2", "Skull React")
+        assert kwargs["target_user"] is None
+        assert kwargs["details"] is None
+
+    def test_report(self):
+        setup_logger()
+        pipeline = DetectorPipeline([
+            make_detector("b", [], priority=2, group="troll"),
+            make_detector("a", [], priority=1, match=False),
+        ])
+        run_async(pipeline.run(make_ctx(a={}, b={}), rng=AlwaysHit()))
+        report = pipeline.report()
+        assert [r["name"] for r in report] == ["a", "b"]
+        assert report[0]["runs"] == 1 and report[0]["fired"] == 0
+        assert report[1]["fired"] == 1 and report[1]["group"] == "troll"
+        assert set(report[1]) >= {"avg_match_us", "max_match_ms", "avg_respond_ms", "max_respond_ms", "timeouts"}
+
+
+class TestMessageFeatures:
+    def test_text_features(self):
+        f = MessageFeatures("  Hello World LAG  ")
+        assert f.length == 19
+        assert f.lower == "  hello world lag  "
+        assert f.stripped == "hello world lag"
+
+    def test_caps_ratio_ignores_spaces(self):
+        assert MessageFeatures("AB cd").caps_ratio == 0.5
+        assert MessageFeatures("").caps_ratio == 0.0
+        assert MessageFeatures("   ").caps_ratio == 0.0
+
+    def test_caps_ratio_non_ascii(self):
+        assert MessageFeatures("ÉCOLE é").caps_ratio == 5 / 6
+
+    def test_caps_ratio_matches_per_character_count(self):
+        for text in ["WHY IS THIS SO BROKEN!!!", "ok fine", "MiXeD\tCaSe 123", "ÀÉ ok", "ΑΒΓ δ"]:
+            expected = sum(1 for c in text if c.isupper()) / max(len(text.replace(" ", "")), 1)
+            assert MessageFeatures(text).caps_ratio == expected
+
+    def test_long_non_ascii_scan_is_capped(self):
+        text = "é" * FEATURE_SCAN_CHARS + "É" * 3000
+        assert MessageFeatures(text).caps_ratio == 0.0
+
+    def test_exclamations_and_phrases(self):
+        f = MessageFeatures("no cap I lost!!")
+        assert f.exclamations == 2
+        assert f.phrases == {"cap", "excuse"}
+        assert MessageFeatures("").phrases == frozenset()
+
+    def test_computed_once(self):
+        f = MessageFeatures("Hello")
+        assert f.lower is f.lower
+        assert "caps_ratio" not in vars(f)
+        f.caps_ratio
+        assert "caps_ratio" in vars(f)
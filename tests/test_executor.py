@@ -0,0 +1,177 @@
+"""Tests for executor.py — the bounded background executor for response plans."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from executor import ActionExecutor, React, Reply, Send, Typing, run_step
+from tests.conftest import make_mock_channel, make_mock_message, run_async
+
+
+async def settle():
+    """Let freshly started plan tasks run up to their first real wait."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+class TestSteps:
+    def test_react_sequence_with_gap(self, monkeypatch):
+        async def _test():
+            sleep = AsyncMock()
+            monkeypatch.setattr("executor.asyncio.sleep", sleep)
+            msg = make_mock_message()
+            await run_step(React(msg, ("a", "b", "c"), gap=2))
+            assert [c.args[0] for c in msg.add_reaction.await_args_list] == ["a", "b", "c"]
+            assert sleep.await_count == 2
+        run_async(_test())
+
+    def test_typing_then_send(self, monkeypatch):
+        async def _test():
+            monkeypatch.setattr("executor.asyncio.sleep", AsyncMock())
+            channel = make_mock_channel()
+            await run_step(Typing(channel, 5))
+            await run_step(Send(channel, "hi"))
+            channel.typing.assert_called_once()
+            channel.send.assert_awaited_once_with("hi")
+        run_async(_test())
+
+    def test_reply(self):
+        async def _test():
+            msg = make_mock_message()
+            await run_step(Reply(msg, "?"))
+            msg.reply.assert_awaited_once_with("?", mention_author=False)
+        run_async(_test())
+
+
+def blocking_message(log, name):
+    """A message whose add_reaction blocks until the returned event is set."""
+    release = asyncio.Event()
+    msg = MagicMock()
+
+    async def add_reaction(emoji):
+        log.append(name)
+        await release.wait()
+    msg.add_reaction = add_reaction
+    return msg, release
+
+
+class TestActionExecutor:
+    def test_submit_returns_immediately(self):
+        async def _test():
+            ex = ActionExecutor()
+            log = []
+            msg, release = blocking_message(log, "a")
+            assert ex.submit("a", [React(msg, ("x",))], key=1) is True
+            assert log == []  # not started until the handler yields
+            await settle()
+            assert log == ["a"]
+            release.set()
+            await ex.join()
+            assert ex.report()["completed"] == 1
+        run_async(_test())
+
+    def test_worker_limit(self):
+        async def _test():
+            ex = ActionExecutor(max_workers=2)
+            log = []
+            gates = []
+            for i in range(4):
+                msg, release = blocking_message(log, i)
+                gates.append(release)
+                ex.submit(str(i), [React(msg, ("x",))], key=i)
+            await settle()
+            assert log == [0, 1]
+            assert ex.report()["queued"] == 2 and ex.report()["running"] == 2
+            gates[0].set()
+            await settle()
+            assert log == [0, 1, 2]
+            for g in gates:
+                g.set()
+            await ex.join()
+            assert ex.report()["completed"] == 4
+            assert ex.report()["max_depth"] == 2
+        run_async(_test())
+
+    def test_per_key_limit_lets_other_keys_through(self):
+        async def _test():
+            ex = ActionExecutor(max_workers=4, per_key=1)
+            log = []
+            a1, r1 = blocking_message(log, "a1")
+            a2, r2 = blocking_message(log, "a2")
+            b1, r3 = blocking_message(log, "b1")
+            ex.submit("a1", [React(a1, ("x",))], key="a")
+            ex.submit("a2", [React(a2, ("x",))], key="a")
+            ex.submit("b1", [React(b1, ("x",))], key="b")
+            await settle()
+            assert log == ["a1", "b1"]
+            r1.set()
+            await settle()
+            assert log == ["a1", "b1", "a2"]
+            r2.set()
+            r3.set()
+            await ex.join()
+        run_async(_test())
+
+    def test_full_queue_drops(self):
+        async def _test():
+            ex = ActionExecutor(max_workers=1, max_queue=1)
+            log = []
+            msg, release = blocking_message(log, "a")
+            assert ex.submit("a", [React(msg, ("x",))])
+            assert ex.submit("b", [Reply(make_mock_message(), "?")])
+            assert ex.submit("c", [Reply(make_mock_message(), "?")]) is False
+            assert ex.report()["dropped"] == 1
+            release.set()
+            await ex.join()
+        run_async(_test())
+
+    def test_cancel_key(self):
+        async def _test():
+            ex = ActionExecutor(per_key=1)
+            log = []
+            msg, _ = blocking_message(log, "a")
+            other = make_mock_message()
+            ex.submit("a", [React(msg, ("x",))], key=1)
+            ex.submit("b", [Reply(other, "?")], key=1)
+            await settle()
+            assert ex.cancel(1) == 2
+            await ex.join()
+            other.reply.assert_not_called()
+            assert ex.report()["cancelled"] == 2
+        run_async(_test())
+
+    def test_timeout_and_failure_are_counted(self):
+        async def _test():
+            ex = ActionExecutor(timeout=0.01)
+            slow, _ = blocking_message([], "slow")
+            broken = make_mock_message()
+            broken.reply = AsyncMock(side_effect=RuntimeError("gone"))
+            ex.submit("slow", [React(slow, ("x",))], key=1)
+            ex.submit("broken", [Reply(broken, "?")], key=2)
+            await ex.join()
+            report = ex.report()
+            assert report["timeouts"] == 1
+            assert report["failed"] == 1
+            assert report["completed"] == 0
+        run_async(_test())
+
+    def test_close_cancels_and_refuses_new_plans(self):
+        async def _test():
+            ex = ActionExecutor(max_workers=1)
+            msg, _ = blocking_message([], "a")
+            ex.submit("a", [React(msg, ("x",))])
+            ex.submit("b", [Reply(make_mock_message(), "?")])
+            await settle()
+            await ex.close()
+            report = ex.report()
+            assert report["running"] == 0 and report["queued"] == 0
+            assert report["cancelled"] == 2
+            assert ex.submit("c", [Reply(make_mock_message(), "?")]) is False
+        run_async(_test())
+
+    def test_empty_plan_is_not_queued(self):
+        async def _test():
+            ex = ActionExecutor()
+            assert ex.submit("nothing", []) is True
+            assert ex.report()["submitted"] == 0 and ex.report()["running"] == 0
+            await ex.join()
+        run_async(_test())
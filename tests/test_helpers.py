@@ -1,5 +1,6 @@
 """Tests for helpers.py — utility functions."""
 
+import asyncio
 from unittest.mock import MagicMock, patch
 from datetime import datetime
 
@@ -14,8 +15,10 @@ from helpers import (
     get_online_members,
     is_late_night,
     get_channel_by_key,
+    interruptible_sleep,
 )
-from tests.conftest import make_mock_config, make_mock_channel, make_mock_member, make_mock_guild
+from config import BotConfig
+from tests.conftest import run_async, make_mock_config, make_mock_channel, make_mock_member, make_mock_guild
 
 
 class TestGetExcludedChannels:
@@ -107,3 +110,38 @@ class TestGetChannelByKey:
         shared.config.get = MagicMock(return_value=None)
         result = get_channel_by_key("channels.general_id")
         assert result is None
+
+
+class TestInterruptibleSleep:
+    def test_shortened_interval_wakes_at_once(self, tmp_path):
+        async def _test():
+            cfg = BotConfig(str(tmp_path / "config.json"))
+            cfg.load()
+            shared.config = cfg
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            sleeper = asyncio.ensure_future(interruptible_sleep(
+                lambda: cfg.get("feature.dead_chat.check_interval_min") * 60, "feature.dead_chat.",
+            ))
+            await asyncio.sleep(0.01)
+            await cfg.set("feature.dead_chat.check_interval_min", 0)
+            await asyncio.wait_for(sleeper, 1)
+            assert loop.time() - started < 1
+            await cfg.flush()
+            shared.config = None
+        run_async(_test())
+
+    def test_unrelated_change_keeps_sleeping(self, tmp_path):
+        async def _test():
+            cfg = BotConfig(str(tmp_path / "config.json"))
+            cfg.load()
+            shared.config = cfg
+            sleeper = asyncio.ensure_future(interruptible_sleep(lambda: 0.2, "feature.dead_chat."))
+            await asyncio.sleep(0.01)
+            await cfg.set("feature.status_rotation.interval_sec", 1)
+            await asyncio.sleep(0.01)
+            assert not sleeper.done()
+            await sleeper
+            await cfg.flush()
+            shared.config = None
+        run_async(_test())
@@ -0,0 +1,348 @@
+"""Tests for logger.py — direct and write-behind logging."""
+
+import asyncio
+
+import pytest
+
+from database import init_db
+from logger import BotLogger, StatCounters
+from tests.conftest import run_async, make_mock_member, make_mock_channel
+
+
+async def _count(db, table):
+    async with db.execute(f"SELECT COUNT(*) FROM {table}") as cur:
+        return (await cur.fetchone())[0]
+
+
+async def _stat(db, key):
+    async with db.execute("SELECT value FROM stats WHERE key = ?", (key,)) as cur:
+        return (await cur.fetchone())[0]
+
+
+class TestDirectMode:
+    def test_log_troll_writes_immediately(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db)
+            await logger.log_troll("gn_police", "GN Police", target_user=make_mock_member(), channel=make_mock_channel())
+            assert await _count(db, "troll_log") == 1
+            await db.close()
+        run_async(_test())
+
+
+class TestRollups:
+    def test_log_insert_updates_rollups(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True)
+            alice = make_mock_member(user_id=7, name="Alice")
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=alice)
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=alice)
+            await logger.log_activity("greeting", "Sent morning greeting")
+            await logger.flush()
+            async with db.execute("SELECT t.type, count FROM troll_daily JOIN troll_types t ON t.id = troll_type_id") as cur:
+                assert await cur.fetchall() == [("cap_alarm", 2)]
+            async with db.execute("SELECT user_id, count FROM troll_targets") as cur:
+                assert await cur.fetchall() == [(7, 2)]
+            async with db.execute("SELECT SUM(count) FROM activity_hourly") as cur:
+                assert (await cur.fetchone())[0] == 1
+            await db.close()
+        run_async(_test())
+
+
+class TestDimensions:
+    def test_rows_reference_interned_dimensions(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True)
+            alice = make_mock_member(user_id=7, name="Alice")
+            general = make_mock_channel(channel_id=100, name="general")
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=alice, channel=general)
+            await logger.log_activity("greeting", "Sent morning greeting", channel=general, user=alice)
+            await logger.flush()
+            async with db.execute("SELECT troll_type_id, target_user_id, channel_id FROM troll_log") as cur:
+                assert await cur.fetchall() == [(1, 7, 100)]
+            async with db.execute("SELECT channel_id, user_id FROM activity_log") as cur:
+                assert await cur.fetchall() == [(100, 7)]
+            async with db.execute("SELECT id, name FROM users") as cur:
+                assert await cur.fetchall() == [(7, "Alice")]
+            async with db.execute("SELECT id, type, name FROM troll_types") as cur:
+                assert await cur.fetchall() == [(1, "cap_alarm", "Cap Alarm")]
+            await db.close()
+        run_async(_test())
+
+    def test_rename_updates_dimension(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db)
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=make_mock_member(user_id=7, name="Alice"))
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=make_mock_member(user_id=7, name="Ally"))
+            async with db.execute("SELECT id, name FROM users") as cur:
+                assert await cur.fetchall() == [(7, "Ally")]
+            await db.close()
+        run_async(_test())
+
+    def test_known_names_are_not_rewritten(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db)
+            alice = make_mock_member(user_id=7, name="Alice")
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=alice)
+            # Edit the row behind the cache: a second upsert would overwrite it
+            await db.execute("UPDATE users SET name = 'sentinel' WHERE id = 7")
+            await db.commit()
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=alice)
+            async with db.execute("SELECT name FROM users WHERE id = 7") as cur:
+                assert (await cur.fetchone())[0] == "sentinel"
+            await db.close()
+        run_async(_test())
+
+    def test_cache_not_updated_on_failed_batch(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True)
+            await logger.log_troll("cap_alarm", "Cap Alarm", target_user=make_mock_member(user_id=7))
+            await db.execute("ALTER TABLE troll_log RENAME TO troll_log_old")
+            await logger.flush()
+            assert 7 not in logger.names.users
+            assert "cap_alarm" not in logger.names.troll_types
+            await db.execute("ALTER TABLE troll_log_old RENAME TO troll_log")
+            await logger.flush()
+            async with db.execute("SELECT COUNT(*) FROM users") as cur:
+                assert (await cur.fetchone())[0] == 1
+            await db.close()
+        run_async(_test())
+
+
+class TestStatCounters:
+    def test_increments_accumulate_in_memory(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db)
+            for _ in range(3):
+                await logger.increment_stat("gn_callouts")
+                await logger.count_message()
+            assert await _stat(db, "gn_callouts") == 0
+            assert logger.counters.pending() == {"gn_callouts": 3, "messages_processed": 3}
+            await db.close()
+        run_async(_test())
+
+    def test_flush_upserts_all_deltas(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db)
+            await logger.increment_stat("gn_callouts", 2)
+            await logger.increment_stat("cap_alarms")
+            await logger.flush_messages()
+            assert await _stat(db, "gn_callouts") == 2
+            assert await _stat(db, "cap_alarms") == 1
+            assert logger.counters.pending() == {}
+            await db.close()
+        run_async(_test())
+
+    def test_merge_adds_pending_to_persisted(self):
+        counters = StatCounters()
+        counters.add("gn_callouts", 2)
+        assert counters.merge({"gn_callouts": 5, "cap_alarms": 1}) == {"gn_callouts": 7, "cap_alarms": 1}
+
+    def test_inflight_deltas_stay_visible_until_commit(self):
+        counters = StatCounters()
+        counters.add("gn_callouts", 2)
+        deltas = counters.drain()
+        counters.add("gn_callouts")
+        assert counters.pending() == {"gn_callouts": 3}
+        counters.commit(deltas)
+        assert counters.pending() == {"gn_callouts": 1}
+
+    def test_restore_returns_deltas_to_pending(self):
+        counters = StatCounters()
+        counters.add("gn_callouts", 2)
+        deltas = counters.drain()
+        counters.restore(deltas)
+        assert counters.drain() == {"gn_callouts": 2}
+
+
+class TestWriteBehindMode:
+    def test_calls_enqueue_without_writing(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True)
+            await logger.log_troll("gn_police", "GN Police")
+            await logger.log_activity("greeting", "Sent morning greeting")
+            assert logger.queue_depth == 2
+            assert await _count(db, "troll_log") == 0
+            await db.close()
+        run_async(_test())
+
+    def test_flush_writes_batch(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True)
+            for _ in range(5):
+                await logger.log_troll("gn_police", "GN Police")
+            await logger.flush()
+            assert logger.queue_depth == 0
+            assert await _count(db, "troll_log") == 5
+            assert await _stat(db, "trolls_triggered") == 5
+            assert logger.flush_count == 1
+            assert logger.rows_flushed == 6  # 5 trolls + 1 stat upsert
+            await db.close()
+        run_async(_test())
+
+    def test_flusher_drains_on_row_threshold(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True, flush_interval=60, flush_max_rows=4)
+            logger.start()
+            for _ in range(4):
+                await logger.log_activity("greeting", "Sent morning greeting")
+            for _ in range(50):
+                await asyncio.sleep(0.01)
+                if logger.queue_depth == 0:
+                    break
+            assert await _count(db, "activity_log") == 4
+            await logger.close()
+            await db.close()
+        run_async(_test())
+
+    def test_close_flushes_everything(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True, flush_interval=60)
+            logger.start()
+            await logger.log_activity("greeting", "Sent morning greeting")
+            await logger.count_message()
+            await logger.close()
+            assert await _count(db, "activity_log") == 1
+            assert await _stat(db, "messages_processed") == 1
+            await db.close()
+        run_async(_test())
+
+    def test_close_during_slow_write_keeps_rows(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True, flush_interval=0.01)
+            write_batch = logger._write_batch
+            writing = asyncio.Event()
+
+            async def slow_write(batch, deltas):
+                writing.set()
+                await asyncio.sleep(0.2)
+                await write_batch(batch, deltas)
+
+            logger._write_batch = slow_write
+            for _ in range(10):
+                await logger.log_troll("cap_alarm", "Cap Alarm")
+            logger.start()
+            await writing.wait()
+            await logger.close()
+            assert await _count(db, "troll_log") == 10
+            assert await _stat(db, "trolls_triggered") == 10
+            assert logger.counters.pending() == {}
+            await db.close()
+        run_async(_test())
+
+    def test_cancelled_flush_rolls_back_and_requeues(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True)
+            for _ in range(10):
+                await logger.log_troll("cap_alarm", "Cap Alarm")
+            executemany = db.executemany
+            calls = 0
+
+            async def stalls_after_first(sql, params):
+                nonlocal calls
+                calls += 1
+                if calls > 1:
+                    await asyncio.sleep(10)
+                return await executemany(sql, params)
+
+            db.executemany = stalls_after_first
+            flush = asyncio.ensure_future(logger.flush())
+            while calls < 2:
+                await asyncio.sleep(0.01)
+            flush.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await flush
+            assert logger.queue_depth == 10
+            assert logger.counters.pending() == {"trolls_triggered": 10}
+
+            db.executemany = executemany
+            await logger.flush()
+            assert await _count(db, "troll_log") == 10
+            async with db.execute("SELECT SUM(count) FROM troll_daily") as cur:
+                assert (await cur.fetchone())[0] == 10
+            assert await _stat(db, "trolls_triggered") == 10
+            await db.close()
+        run_async(_test())
+
+    def test_failed_flush_keeps_records(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True)
+            await logger.log_activity("greeting", "Sent morning greeting")
+            await db.execute("ALTER TABLE activity_log RENAME TO activity_log_old")
+            await logger.flush()
+            assert logger.queue_depth == 1
+            assert logger.flush_errors == 1
+            await db.execute("ALTER TABLE activity_log_old RENAME TO activity_log")
+            await logger.flush()
+            assert logger.queue_depth == 0
+            assert await _count(db, "activity_log") == 1
+            await db.close()
+        run_async(_test())
+
+    def test_bad_record_is_dropped_and_the_rest_written(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True)
+            await logger.log_troll("cap_alarm", "Cap Alarm")
+            await logger.log_troll(None, "bad")  # troll_types.type is NOT NULL
+            await logger.log_troll("k_energy", "K Energy")
+            await logger.log_activity("greeting", "Sent morning greeting")
+            await logger.flush()
+            assert logger.queue_depth == 0
+            assert logger.dropped_rows == 1
+            assert await _count(db, "troll_log") == 2
+            assert await _count(db, "activity_log") == 1
+            assert await _stat(db, "trolls_triggered") == 3
+            await db.close()
+        run_async(_test())
+
+    def test_failing_flushes_back_off(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True, flush_interval=0.01)
+            await logger.log_activity("greeting", "Sent morning greeting")
+            await db.execute("ALTER TABLE activity_log RENAME TO activity_log_old")
+            logger.start()
+            await asyncio.sleep(0.3)
+            assert 1 <= logger.flush_errors <= 6  # 0.01s, 0.02s, 0.04s ... apart, not every tick
+            await db.execute("ALTER TABLE activity_log_old RENAME TO activity_log")
+            await logger.close()
+            assert await _count(db, "activity_log") == 1
+            await db.close()
+        run_async(_test())
+
+    def test_queue_is_capped(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True, max_queue_rows=3)
+            for i in range(5):
+                await logger.log_activity("greeting", f"event {i}")
+            assert logger.queue_depth == 3
+            assert logger.metrics()["dropped_rows"] == 2
+            await db.close()
+        run_async(_test())
+
+    def test_close_reports_rows_left_unwritten(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True)
+            await logger.log_activity("greeting", "Sent morning greeting")
+            await db.execute("ALTER TABLE activity_log RENAME TO activity_log_old")
+            with pytest.raises(RuntimeError, match="1 rows"):
+                await logger.close()
+            await db.close()
+        run_async(_test())
@@ -0,0 +1,74 @@
+"""Tests for matcher.py — single-pass phrase detection for on_message."""
+
+import random
+
+import messages
+from matcher import PhraseMatcher, detect, get_matcher
+
+
+def legacy_detect(content: str) -> set:
+    """The per-detector scans on_message used before the matcher."""
+    found = set()
+    stripped = content.lower().strip()
+    if any(stripped == p or stripped.startswith(p + " ") or stripped.endswith(" " + p) for p in messages.gn_phrases):
+        found.add("gn")
+    lower = content.lower()
+    if any(p in lower for p in messages.loss_phrases):
+        found.add("excuse")
+    if any(p in lower for p in messages.cap_phrases):
+        found.add("cap")
+    if any(p in lower for p in messages.flex_phrases):
+        found.add("flex")
+    if "lag" in lower.split():
+        found.add("lag")
+    return found
+
+
+class TestDetect:
+    def test_gn_only_at_the_edges(self):
+        assert detect("gn") == {"gn"}
+        assert detect("GN everyone") == {"gn"}
+        assert detect("ok good night") == {"gn"}
+        assert detect("  goodnight  ") == {"gn"}
+        assert detect("gnarly play") == set()
+        assert detect("say gn to them") == set()
+
+    def test_substring_detectors(self):
+        assert detect("bro I LOST again") == {"excuse"}
+        assert detect("no cap that was an easy win") == {"cap", "flex"}
+        assert detect("deadass") == {"cap"}
+
+    def test_lag_is_a_whole_word(self):
+        assert detect("so much lag rn") == {"lag"}
+        assert detect("lag\tagain") == {"lag"}
+        assert detect("flagged it") == set()
+
+    def test_every_detector_in_one_message(self):
+        assert detect("i lost to lag no cap im goated gn") == {"excuse", "lag", "cap", "flex", "gn"}
+
+    def test_overlapping_and_prefix_phrases(self):
+        matcher = PhraseMatcher({
+            "a": ("substring", ["no one"]),
+            "b": ("substring", ["no one can"]),
+            "c": ("substring", ["one can"]),
+        })
+        assert matcher.match("no one can stop me") == {"a", "b", "c"}
+        assert matcher.match("no one") == {"a"}
+
+    def test_matches_legacy_scans(self):
+        rng = random.Random(7)
+        words = ["gn", "good", "night", "i", "lost", "no", "cap", "lag", "flag", "easy", "win", "fr", "the",
+                 "game", "deadass", "im", "goated", "trust", "me", "ok", "undefeated", "  ", "GN", "Lag!"]
+        samples = ["", " ", "gn", "good night", "night night gn"]
+        samples += [" ".join(rng.choices(words, k=rng.randint(1, 8))) for _ in range(2000)]
+        for text in samples:
+            assert detect(text) == legacy_detect(text), text
+
+
+class TestRebuild:
+    def test_rebuilt_when_a_list_changes(self, monkeypatch):
+        before = get_matcher()
+        assert get_matcher() is before
+        monkeypatch.setattr(messages, "cap_phrases", messages.cap_phrases + ["on everything"])
+        assert get_matcher() is not before
+        assert detect("on everything") == {"cap"}
@@ -33,6 +33,10 @@ EXPECTED_LISTS = {
     "essay_responses": 5,
     "k_responses": 5,
     "friday_messages": 5,
+    "loss_phrases": 5,
+    "cap_phrases": 5,
+    "flex_phrases": 5,
+    "lag_words": 1,
 }
 
 
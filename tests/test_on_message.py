@@ -1,5 +1,6 @@
 """Tests for cogs/on_message.py — GN police, keyword detectors, trolls."""
 
+import asyncio
 import random
 from collections import deque
 from datetime import datetime, timedelta
@@ -17,12 +18,17 @@ from tests.conftest import (
 
 def make_on_message_cog(bot):
     """Construct OnMessage cog without triggering discord.py internals."""
-    from cogs.on_message import OnMessage
+    from cogs.on_message import DETECTORS, OnMessage
+    from detectors import DetectorPipeline
+    from executor import ActionExecutor
+    from ratecounter import ChannelRates
     cog = object.__new__(OnMessage)
     cog.bot = bot
     cog.gn_watchlist = {}
-    cog.recent_message_times = deque(maxlen=200)
+    cog.message_rates = ChannelRates(60)
     cog.hype_cooldown_until = None
+    cog.pipeline = DetectorPipeline(DETECTORS)
+    cog.executor = ActionExecutor()
     return cog
 
 @pytest.fixture
@@ -240,6 +246,107 @@ class TestKEnergy:
             msg.reply.assert_called()
         run_async(_test())
 
+# ---------------------------------------------------------------------------
+# Hype Detector
+# ---------------------------------------------------------------------------
+
+class TestHypeDetector:
+    def _hype_fires(self, mock_logger):
+        return [c for c in mock_logger.log_troll.call_args_list if c.args[0] == "hype_detector"]
+
+    def test_burst_in_one_channel_triggers(self, setup_cog, mock_logger):
+        async def _test():
+            cog, channel = setup_cog
+            with patch("cogs.on_message.random") as mock_random:
+                mock_random.random.return_value = 0.0
+                mock_random.choice.side_effect = lambda x: x[0]
+                mock_random.randint.return_value = 6
+                for _ in range(15):
+                    await cog.on_message(make_mock_message(content="lets gooo", channel=channel))
+                await cog.executor.join()
+            assert len(self._hype_fires(mock_logger)) == 1
+            assert cog.message_rates.count(channel.id) == 15
+        run_async(_test())
+
+    def test_quiet_channels_do_not_add_up(self, setup_cog, mock_logger):
+        async def _test():
+            cog, _ = setup_cog
+            with patch("cogs.on_message.random") as mock_random:
+                mock_random.random.return_value = 0.0
+                mock_random.choice.side_effect = lambda x: x[0]
+                mock_random.randint.return_value = 6
+                for i in range(15):
+                    channel = make_mock_channel(channel_id=200 + i % 3)
+                    await cog.on_message(make_mock_message(content="lets gooo", channel=channel))
+                await cog.executor.join()
+            assert self._hype_fires(mock_logger) == []
+            assert cog.message_rates.count(200) == 5
+        run_async(_test())
+
+    def test_zero_window_is_clamped(self, setup_cog, mock_logger):
+        async def _test():
+            cog, channel = setup_cog
+            shared.config = make_mock_config({"feature.hype_detector.time_window_sec": 0})
+            with patch("cogs.on_message.random") as mock_random:
+                mock_random.random.return_value = 0.0
+                mock_random.choice.side_effect = lambda x: x[0]
+                mock_random.randint.return_value = 6
+                for _ in range(15):
+                    await cog.on_message(make_mock_message(content="lets gooo", channel=channel))
+                await cog.executor.join()
+            assert cog.pipeline.stats["hype_detector"].errors == 0
+            assert cog.message_rates.count(channel.id) == 15
+        run_async(_test())
+
+# ---------------------------------------------------------------------------
+# Per-message trolls
+# ---------------------------------------------------------------------------
+
+class TestPerMessageTrolls:
+    async def _trigger(self, cog, msg, troll_type):
+        shared.config = make_mock_config({
+            "feature.essay_detector.enabled": False,
+            "feature.k_energy.enabled": False,
+            "feature.late_night.enabled": False,
+            "feature.hype_detector.enabled": False,
+        })
+        with patch("cogs.on_message.random") as mock_random:
+            mock_random.random.return_value = 0.0
+            mock_random.randint.side_effect = lambda a, b: troll_type if (a, b) == (1, 13) else a
+            mock_random.choice.side_effect = lambda x: x[0]
+            await cog.on_message(msg)
+
+    def test_slow_clap_does_not_hold_on_message(self, setup_cog, mock_logger):
+        async def _test():
+            cog, channel = setup_cog
+            msg = make_mock_message(content="watch this", channel=channel)
+            clock = asyncio.Event()
+
+            async def sleep(seconds):
+                await clock.wait()
+
+            with patch("executor.asyncio.sleep", new=sleep):
+                await self._trigger(cog, msg, 4)
+                # on_message is done after the first clap; the rest are still waiting
+                assert msg.add_reaction.await_count == 1
+                assert cog.executor.report()["running"] == 1
+                assert mock_logger.log_troll.call_args.args == ("msg_troll_4", "Slow Clap")
+
+                clock.set()
+                await cog.executor.join()
+            assert msg.add_reaction.await_count == 3
+        run_async(_test())
+
+    def test_dropped_plan_is_not_logged(self, setup_cog, mock_logger):
+        async def _test():
+            cog, channel = setup_cog
+            await cog.executor.close()
+            msg = make_mock_message(content="watch this", channel=channel)
+            await self._trigger(cog, msg, 6)
+            mock_logger.log_troll.assert_not_called()
+            assert cog.executor.report()["dropped"] == 1
+        run_async(_test())
+
 # ---------------------------------------------------------------------------
 # Skip conditions
 # ---------------------------------------------------------------------------
@@ -0,0 +1,98 @@
+"""Tests for ratecounter.py — ring-buffer sliding-window counters and EWMA rates."""
+
+import pytest
+
+from ratecounter import ChannelRates, RateCounter
+
+
+class TestRateCounter:
+    def test_counts_within_window(self):
+        c = RateCounter(60, buckets=60)
+        for t in range(10):
+            c.add(now=1000.0 + t)
+        assert c.count(now=1009.5) == 10
+        assert c.rate(now=1009.5) == pytest.approx(10 / 60)
+
+    def test_old_events_age_out(self):
+        c = RateCounter(60, buckets=60)
+        c.add(now=1000.0)
+        c.add(now=1030.0)
+        assert c.count(now=1059.0) == 2
+        assert c.count(now=1061.0) == 1
+        assert c.count(now=1095.0) == 0
+
+    def test_long_gap_clears_ring(self):
+        c = RateCounter(10, buckets=5)
+        c.add(3, now=0.0)
+        c.add(now=1000.0)
+        assert c.count(now=1000.0) == 1
+
+    def test_matches_naive_window_to_one_bucket(self):
+        c = RateCounter(60, buckets=30)
+        times = [i * 0.7 for i in range(500)]
+        for t in times:
+            c.add(now=t)
+            exact = sum(1 for s in times if s <= t and t - s < 60)
+            bucketed = sum(1 for s in times if s <= t and t - s < 60 - c.bucket_sec)
+            assert bucketed <= c.count(now=t) <= exact
+
+    def test_time_going_backwards_is_ignored(self):
+        c = RateCounter(60)
+        c.add(now=100.0)
+        c.add(now=99.0)
+        assert c.count(now=100.0) == 2
+
+    def test_ewma_converges_to_steady_rate(self):
+        c = RateCounter(60, ewma_sec=10)
+        for i in range(1000):
+            c.add(now=i * 0.5)  # 2 events/sec
+        assert c.ewma(now=499.5) == pytest.approx(2.0, rel=0.05)
+
+    def test_ewma_decays_when_idle(self):
+        c = RateCounter(60, ewma_sec=10)
+        for i in range(100):
+            c.add(now=float(i))
+        before = c.ewma(now=99.0)
+        assert c.ewma(now=109.0) == pytest.approx(before / 2.718281828, rel=1e-6)
+
+    def test_invalid_window(self):
+        with pytest.raises(ValueError):
+            RateCounter(0)
+
+
+class TestChannelRates:
+    def test_channels_are_independent(self):
+        rates = ChannelRates(60)
+        for _ in range(5):
+            rates.add(1, now=10.0)
+        rates.add(2, now=10.0)
+        assert rates.count(1, now=10.0) == 5
+        assert rates.count(2, now=10.0) == 1
+        assert rates.count(3, now=10.0) == 0
+        assert rates.ewma(3, now=10.0) == 0.0
+
+    def test_least_recently_active_dropped(self):
+        rates = ChannelRates(60, max_keys=2)
+        rates.add(1, now=1.0)
+        rates.add(2, now=2.0)
+        rates.add(1, now=3.0)
+        rates.add(3, now=4.0)
+        assert len(rates) == 2
+        assert rates.count(2, now=4.0) == 0
+        assert rates.count(1, now=4.0) == 2
+
+    def test_configure_resets_on_new_window(self):
+        rates = ChannelRates(60)
+        rates.add(1, now=1.0)
+        rates.configure(60)
+        assert rates.count(1, now=1.0) == 1
+        rates.configure(30)
+        assert rates.count(1, now=1.0) == 0
+        assert rates.add(1, now=1.0).window == 30
+
+    def test_report(self):
+        rates = ChannelRates(10)
+        rates.add(7, count=5, now=1.0)
+        report = rates.report(now=1.0)
+        assert report[7]["count"] == 5
+        assert report[7]["rate"] == 0.5
@@ -0,0 +1,151 @@
+"""Tests for cogs/retention.py — compaction of expired log rows."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import bot as shared
+from archive import LogArchive
+from database import init_db
+from logger import BotLogger
+from tests.conftest import run_async, make_mock_config, make_mock_bot
+
+
+def make_retention_cog(bot):
+    """Construct Retention cog without discord.py internals."""
+    from cogs.retention import Retention
+    cog = object.__new__(Retention)
+    cog.bot = bot
+    cog.last_report = None
+    cog.total_rows_compacted = 0
+    cog.total_bytes_reclaimed = 0
+    return cog
+
+
+def _ago(days):
+    """Epoch ms for `days` days ago."""
+    return int((datetime.now(timezone.utc) - timedelta(days=days)).timestamp() * 1000)
+
+
+async def _setup(tmp_path, old_trolls=0, new_trolls=0, old_activity=0, overrides=None):
+    db = await init_db(str(tmp_path / "bot.db"))
+    await db.execute("INSERT INTO troll_types (id, type, name) VALUES (1, 'cap_alarm', 'Cap Alarm')")
+    await db.executemany(
+        "INSERT INTO troll_log (ts, troll_type_id, target_user_id, channel_id) VALUES (?, 1, 7, 100)",
+        [(_ago(100),)] * old_trolls + [(_ago(1),)] * new_trolls,
+    )
+    await db.executemany(
+        "INSERT INTO activity_log (ts, event_type, description) VALUES (?, ?, ?)",
+        [(_ago(100), "greeting", "x" * 500)] * old_activity,
+    )
+    await db.commit()
+    shared.config = make_mock_config(overrides)
+    shared.logger = BotLogger(db)
+    return db, make_retention_cog(make_mock_bot())
+
+
+async def _count(db, table):
+    async with db.execute(f"SELECT COUNT(*) FROM {table}") as cur:
+        return (await cur.fetchone())[0]
+
+
+@pytest.fixture(autouse=True)
+def _reset_shared():
+    yield
+    shared.config = None
+    shared.logger = None
+    shared.archive = None
+
+
+class TestRetention:
+    def test_compacts_only_expired_rows(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, old_trolls=12, new_trolls=3, overrides={"retention.batch_size": 5})
+            report = await cog._run_retention()
+            assert report["troll_rows_compacted"] == 12
+            assert await _count(db, "troll_log") == 3
+            assert await _count(db, "troll_log_fts") == 3
+            async with db.execute("SELECT troll_type_id, target_user_id, channel_id, count FROM troll_log_daily") as cur:
+                assert await cur.fetchall() == [(1, 7, 100, 12)]
+            await db.close()
+        run_async(_test())
+
+    def test_rollups_survive_compaction(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path)
+            await db.execute("INSERT INTO troll_daily (day, troll_type_id, count) VALUES ('2024-01-01', 1, 4)")
+            await db.commit()
+            await cog._run_retention()
+            async with db.execute("SELECT SUM(count) FROM troll_daily") as cur:
+                assert (await cur.fetchone())[0] == 4
+            await db.close()
+        run_async(_test())
+
+    def test_reclaims_space(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, old_activity=2000)
+            report = await cog._run_retention()
+            assert report["activity_rows_compacted"] == 2000
+            assert report["bytes_reclaimed"] > 0
+            async with db.execute("PRAGMA freelist_count") as cur:
+                assert (await cur.fetchone())[0] == 0
+            await db.close()
+        run_async(_test())
+
+    def test_noop_when_disabled(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, old_trolls=3, overrides={"retention.enabled": False})
+            assert await cog._run_retention() is None
+            assert await _count(db, "troll_log") == 3
+            await db.close()
+        run_async(_test())
+
+    def test_totals_accumulate(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, old_trolls=3)
+            await cog._run_retention()
+            report = await cog._run_retention()
+            assert report["troll_rows_compacted"] == 0
+            assert report["total_rows_compacted"] == 3
+            await db.close()
+        run_async(_test())
+
+    def test_archives_rows_before_deleting(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, old_trolls=7, new_trolls=2, overrides={"retention.batch_size": 3})
+            shared.archive = LogArchive(str(tmp_path / "archive"))
+            report = await cog._run_retention()
+            assert report["rows_archived"] == 7
+            rows = shared.archive.read("troll_log", 10)
+            assert [r[0] for r in rows] == [7, 6, 5, 4, 3, 2, 1]
+            assert rows[0][2:4] == ("cap_alarm", "Cap Alarm")
+            await db.close()
+        run_async(_test())
+
+    def test_archive_is_written_outside_the_write_lock(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, old_trolls=3)
+            shared.archive = LogArchive(str(tmp_path / "archive"))
+            append = shared.archive.append
+            locked = []
+
+            def checked_append(table, rows):
+                locked.append(shared.logger._write_lock.locked())
+                return append(table, rows)
+
+            shared.archive.append = checked_append
+            report = await cog._run_retention()
+            assert report["rows_archived"] == 3
+            assert locked == [False]
+            await db.close()
+        run_async(_test())
+
+    def test_archive_can_be_disabled(self, tmp_path):
+        async def _test():
+            db, cog = await _setup(tmp_path, old_trolls=3, overrides={"archive.enabled": False})
+            shared.archive = LogArchive(str(tmp_path / "archive"))
+            report = await cog._run_retention()
+            assert report["rows_archived"] == 0
+            assert report["troll_rows_compacted"] == 3
+            await db.close()
+        run_async(_test())
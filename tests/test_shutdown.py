@@ -0,0 +1,145 @@
+"""Tests for shutdown.py — ordered, time-boxed shutdown pipeline."""
+
+import asyncio
+import json
+import os
+from unittest.mock import AsyncMock, MagicMock
+
+from config import BotConfig
+from database import init_db
+from logger import BotLogger
+from shutdown import ShutdownCoordinator, build_shutdown
+from tests.conftest import run_async
+
+
+class TestCoordinator:
+    def test_steps_run_in_order(self):
+        async def _test():
+            ran = []
+            coordinator = ShutdownCoordinator()
+            for name in ("a", "b", "c"):
+                async def step(name=name):
+                    ran.append(name)
+                coordinator.add_step(name, step)
+            report = await coordinator.run()
+            assert ran == ["a", "b", "c"]
+            assert [s["status"] for s in report] == ["ok"] * 3
+        run_async(_test())
+
+    def test_slow_or_failing_step_does_not_block_the_rest(self):
+        async def _test():
+            ran = []
+            coordinator = ShutdownCoordinator()
+
+            async def hang():
+                await asyncio.sleep(60)
+
+            async def fail():
+                raise RuntimeError("boom")
+
+            async def last():
+                ran.append("last")
+
+            coordinator.add_step("hang", hang, budget=0.05)
+            coordinator.add_step("fail", fail)
+            coordinator.add_step("last", last)
+            report = await coordinator.run()
+            assert report[0]["status"].startswith("timed out")
+            assert report[1]["status"] == "failed: boom"
+            assert ran == ["last"]
+        run_async(_test())
+
+    def test_runs_once(self):
+        async def _test():
+            calls = []
+            coordinator = ShutdownCoordinator()
+
+            async def step():
+                calls.append(1)
+                await asyncio.sleep(0.01)
+
+            coordinator.add_step("step", step)
+            first, second = await asyncio.gather(coordinator.run(), coordinator.run())
+            assert first is second
+            await coordinator.run()
+            assert calls == [1]
+        run_async(_test())
+
+
+class TestPipeline:
+    def test_flushes_checkpoints_and_closes(self, tmp_path):
+        async def _test():
+            path = str(tmp_path / "bot.db")
+            db = await init_db(path)
+            logger = BotLogger(db, write_behind=True, flush_interval=60)
+            logger.start()
+            await logger.log_activity("greeting", "Sent morning greeting")
+            await logger.count_message()
+            client = MagicMock()
+            client.unload_extension = AsyncMock()
+            dashboard = asyncio.create_task(asyncio.sleep(60))
+            config = BotConfig(str(tmp_path / "config.json"))
+            config.load()
+            await config.set("feature.gn_police.chance", 0.5)
+
+            report = await build_shutdown(
+                client, db, logger, extensions=["cogs.retention"], tasks=[dashboard], config=config,
+            ).run()
+            assert [s["status"] for s in report] == ["ok"] * 6
+            assert client.accepting_events is False
+            client.unload_extension.assert_awaited_once_with("cogs.retention")
+            assert dashboard.cancelled()
+            assert json.loads((tmp_path / "config.json").read_text())["feature.gn_police.chance"] == 0.5
+            wal = path + "-wal"
+            assert not os.path.exists(wal) or os.path.getsize(wal) == 0  # all in bot.db
+
+            db = await init_db(path)
+            async with db.execute("SELECT COUNT(*) FROM activity_log") as cur:
+                assert (await cur.fetchone())[0] == 1
+            async with db.execute("SELECT value FROM stats WHERE key = 'messages_processed'") as cur:
+                assert (await cur.fetchone())[0] == 1
+            await db.close()
+        run_async(_test())
+
+    def test_drain_over_budget_leaves_no_half_batch(self, tmp_path, capsys):
+        async def _test():
+            path = str(tmp_path / "bot.db")
+            db = await init_db(path)
+            logger = BotLogger(db, write_behind=True, flush_interval=60)
+            for _ in range(10):
+                await logger.log_troll("cap_alarm", "Cap Alarm")
+            executemany = db.executemany
+            calls = 0
+
+            async def stalls_after_first(sql, params):
+                nonlocal calls
+                calls += 1
+                if calls > 1:
+                    await asyncio.sleep(60)
+                return await executemany(sql, params)
+
+            db.executemany = stalls_after_first
+            coordinator = build_shutdown(MagicMock(), db, logger)
+            coordinator.steps[2] = ("drain_logger", coordinator.steps[2][1], 0.2)
+            report = await coordinator.run()
+            assert report[2]["status"].startswith("timed out")
+            assert report[-1]["status"] == "ok"
+
+            db = await init_db(path)
+            async with db.execute("SELECT COUNT(*) FROM troll_log") as cur:
+                assert (await cur.fetchone())[0] == 0
+            async with db.execute("SELECT COUNT(*) FROM troll_daily") as cur:
+                assert (await cur.fetchone())[0] == 0
+            await db.close()
+        run_async(_test())
+        assert "10 rows and 10 stat increments unwritten" in capsys.readouterr().out
+
+    def test_drain_that_leaves_rows_is_reported_failed(self, tmp_path):
+        async def _test():
+            db = await init_db(str(tmp_path / "bot.db"))
+            logger = BotLogger(db, write_behind=True, flush_interval=60)
+            await logger.log_activity("greeting", "Sent morning greeting")
+            await db.execute("ALTER TABLE activity_log RENAME TO activity_log_old")
+            report = await build_shutdown(MagicMock(), db, logger).run()
+            assert report[2]["status"] == "failed: 1 rows and 0 stat increments left unwritten"
+        run_async(_test())
@@ -37,6 +37,35 @@ class TestModuleImports:
         from logger import BotLogger
         assert BotLogger
 
+    def test_archive_imports(self):
+        from archive import LogArchive
+        assert LogArchive
+
+    def test_shutdown_imports(self):
+        from shutdown import ShutdownCoordinator, build_shutdown
+        assert ShutdownCoordinator
+        assert build_shutdown
+
+    def test_matcher_imports(self):
+        from matcher import PhraseMatcher, detect
+        assert PhraseMatcher
+        assert detect
+
+    def test_detectors_imports(self):
+        from detectors import Detector, DetectorPipeline
+        assert Detector
+        assert DetectorPipeline
+
+    def test_ratecounter_imports(self):
+        from ratecounter import ChannelRates, RateCounter
+        assert ChannelRates
+        assert RateCounter
+
+    def test_executor_imports(self):
+        from executor import ActionExecutor, React, Reply, Send, Typing
+        assert ActionExecutor
+        assert React and Reply and Send and Typing
+
 
 class TestCogSetupFunctions:
     """Every cog has an async setup(bot) function."""
@@ -49,6 +78,9 @@ class TestCogSetupFunctions:
         "cogs.events",
         "cogs.modmail",
         "cogs.on_message",
+        "cogs.retention",
+        "cogs.db_maintenance",
+        "cogs.backup",
     ]
 
     @pytest.mark.parametrize("mod_name", COG_MODULES)
@@ -89,6 +121,10 @@ class TestCogClasses:
         from cogs.on_message import OnMessage
         assert OnMessage
 
+    def test_retention_class(self):
+        from cogs.retention import Retention
+        assert Retention
+
 
 class TestMainEntryPoint:
     """main.py has the expected structure."""
@@ -106,6 +142,7 @@ class TestMainEntryPoint:
             "cogs.events",
             "cogs.modmail",
             "cogs.on_message",
+            "cogs.retention",
         ]
         for cog in expected_cogs:
             assert cog in main_src, f"main.py missing cog: {cog}"
@@ -132,6 +169,12 @@ class TestProjectFileStructure:
         "config.py",
         "database.py",
         "logger.py",
+        "archive.py",
+        "shutdown.py",
+        "matcher.py",
+        "detectors.py",
+        "ratecounter.py",
+        "executor.py",
         "cogs/__init__.py",
         "cogs/background_trolls.py",
         "cogs/dead_chat.py",
@@ -140,6 +183,9 @@ class TestProjectFileStructure:
         "cogs/events.py",
         "cogs/modmail.py",
         "cogs/on_message.py",
+        "cogs/retention.py",
+        "cogs/db_maintenance.py",
+        "cogs/backup.py",
     ]
 
     @pytest.mark.parametrize("filepath", EXPECTED_FILES)
@@ -159,6 +205,9 @@ class TestNoCircularImports:
         "cogs.events",
         "cogs.modmail",
         "cogs.on_message",
+        "cogs.retention",
+        "cogs.db_maintenance",
+        "cogs.backup",
     ]
 
     @pytest.mark.parametrize("mod_name", COG_MODULES)